@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+
+from app.core.admin import require_admin
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+
+logger = setup_logging()
+
+router = APIRouter()
+
+
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics() -> dict:
+    """Return the metrics collected by this worker process.
+
+    Returns:
+        dict: Counters, gauges and summaries keyed by metric name
+    """
+    logger.debug("Metrics requested")
+    return metrics.snapshot()
@@ -0,0 +1,82 @@
+from datetime import UTC, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.core.database import get_read_db
+from app.core.logging_config import setup_logging
+from app.core.rate_limiter import RateLimiter
+from app.schemas.stats import StatsReport
+from app.services.stats_service import STATS_GROUPS, StatsService
+from app.utils.gazetteer import canonical_country
+
+logger = setup_logging()
+
+router = APIRouter()
+
+stats_rate_limiter = RateLimiter(max_requests=30, time_window=60)
+
+
+@router.get("/stats", response_model=StatsReport)
+@stats_rate_limiter
+async def get_stats(
+    request: Request,
+    days: int = Query(7, ge=1, le=366, description="Days to count, up to today"),
+    group_by: str = Query(
+        "origin,destination",
+        description="Comma-separated columns to group by: day, origin, destination",
+    ),
+    origin: str | None = Query(None, description="Only count this origin"),
+    destination: str | None = Query(None, description="Only count this destination"),
+    limit: int = Query(100, ge=1, le=10000, description="Busiest groups to return"),
+    db: Session = Depends(get_read_db),
+) -> JSONResponse:
+    """Return query counts and generation latency per corridor from the rollup.
+
+    For example ``?group_by=destination&limit=10`` lists the top destinations of
+    the past week and ``?group_by=day,origin,destination`` the queries per
+    corridor per day.
+
+    Args:
+        request (Request): FastAPI request object
+        days (int): Number of UTC days to count, ending today
+        group_by (str): Comma-separated names from STATS_GROUPS
+        origin (Optional[str]): Only count queries from this origin
+        destination (Optional[str]): Only count queries to this destination
+        limit (int): Maximum number of groups to return
+        db (Session): Read-only database session dependency
+
+    Returns:
+        JSONResponse: The StatsReport, leaving out columns not grouped by
+
+    Raises:
+        HTTPException: 400 if a group column is unknown
+    """
+    groups = tuple(
+        dict.fromkeys(group.strip() for group in group_by.split(",") if group.strip())
+    )
+    unknown = set(groups).difference(STATS_GROUPS)
+    if unknown or not groups:
+        raise HTTPException(
+            status_code=400,
+            detail=f"group_by must name some of {', '.join(STATS_GROUPS)}",
+        )
+
+    until = datetime.now(UTC).date()
+    since = until - timedelta(days=days - 1)
+    stats = StatsService(db).query(
+        since,
+        until,
+        groups,
+        origin=canonical_country(origin),
+        destination=canonical_country(destination),
+        limit=limit,
+    )
+    logger.debug(f"Served {len(stats)} corridor stats from {since} to {until}")
+    return JSONResponse(
+        jsonable_encoder(
+            {"since": since, "until": until, "group_by": groups, "stats": stats}
+        )
+    )
@@ -1,20 +1,75 @@
-import re
+import time
+from datetime import UTC, datetime
+from typing import Any, Literal, NoReturn
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.admission import AdmissionRejected, Priority
+from app.core.config import get_settings
+from app.core.database import (
+    SessionLocal,
+    engine,
+    get_db,
+    get_read_db,
+    mark_write,
+    read_session_factory,
+)
+from app.core.deadlines import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    request_deadline,
+    request_timeout,
+    run_with_deadline,
+    time_left,
+)
 from app.core.logging_config import setup_logging
 from app.core.rate_limiter import RateLimiter
+from app.core.request_identity import client_id
 from app.models.travel_query import TravelQuery
-from app.schemas.travel_query import TravelQueryCreate, TravelQueryResponse
+from app.schemas.travel_query import (
+    HISTORY_FIELDS,
+    SUMMARY_FIELDS,
+    FollowUpCreate,
+    ItineraryQueryCreate,
+    ItineraryQueryResponse,
+    TravelQueryCreate,
+    TravelQueryResponse,
+)
+from app.services.export_service import EXPORT_FORMATS, ExportService
+from app.services.followup_service import FollowUpContext, FollowUpService
+from app.services.freshness_service import FreshnessService
 from app.services.gemini_service import GeminiService
 from app.services.history_service import HistoryService
+from app.services.idempotency_service import (
+    MAX_KEY_LENGTH,
+    IdempotencyConflict,
+    IdempotencyService,
+    fingerprint,
+)
+from app.services.similarity_service import SimilarityService
+from app.services.stats_service import StatsService
+from app.services.token_budget_service import TokenBudgetExceeded, TokenRequestTooLarge
+from app.services.visa_rules_service import VisaRulesService
+from app.services.write_behind_service import WriteBehindService
+from app.utils.gazetteer import canonical_country, get_gazetteer
 
 logger = setup_logging()
+settings = get_settings()
 
 router = APIRouter()
 gemini_service = GeminiService()
+write_behind_service = WriteBehindService(SessionLocal)
+similarity_service = SimilarityService.from_settings()
+freshness_service = FreshnessService()
+followup_service = FollowUpService.from_settings()
+visa_rules_service = VisaRulesService.from_settings()
+idempotency_service = IdempotencyService.from_settings(SessionLocal)
+
+# Response headers stored with an idempotent result and sent again on replay
+REPLAYED_HEADERS = ("X-Reused-Answer",)
 
 
 query_rate_limiter = RateLimiter(max_requests=5, time_window=60)
@@ -26,10 +81,253 @@ def get_history_service(db: Session = Depends(get_db)) -> HistoryService:
     return HistoryService(db)
 
 
+def get_read_history_service(db: Session = Depends(get_read_db)) -> HistoryService:
+    """Get an instance of HistoryService with a read-only database session."""
+    return HistoryService(db)
+
+
+def get_priority(request: Request) -> Priority:
+    """Get the admission priority requested by the client, interactive by default."""
+    value = request.headers.get(settings.ADMISSION_PRIORITY_HEADER, "")
+    try:
+        return Priority[value.strip().upper()]
+    except KeyError:
+        return Priority.INTERACTIVE
+
+
+def get_fieldset(
+    fields: str | None = Query(
+        None, description="Comma-separated fields to return, e.g. id,destination"
+    ),
+    view: Literal["full", "summary"] = Query(
+        "full", description="summary leaves out the generated answer"
+    ),
+) -> tuple[str, ...] | None:
+    """Get the fields of a travel query the client asked for.
+
+    Args:
+        fields (Optional[str]): Comma-separated names from HISTORY_FIELDS
+        view (str): "full" for complete queries, "summary" for SUMMARY_FIELDS
+
+    Returns:
+        Optional[Tuple[str, ...]]: The requested fields in HISTORY_FIELDS order,
+            always including the ID, or None for complete queries
+
+    Raises:
+        HTTPException: 400 if a field is unknown
+    """
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested.difference(HISTORY_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return tuple(f for f in HISTORY_FIELDS if f in requested or f == "id")
+    if view == "summary":
+        return SUMMARY_FIELDS
+    return None
+
+
+def _sparse(row: dict[str, Any], fieldset: tuple[str, ...]) -> dict[str, Any]:
+    """Reduce a travel query to the requested fields, ready to serialize as JSON."""
+    sparse = {field: row[field] for field in fieldset}
+    if isinstance(sparse.get("created_at"), datetime):
+        sparse["created_at"] = sparse["created_at"].isoformat()
+    return sparse
+
+
+def _raise_generation_error(e: Exception, action: str) -> NoReturn:
+    """Raise the HTTP error for a failure while generating an answer.
+
+    Shared by the routes that call the model, so that budget, admission,
+    deadline and model errors get the same status codes everywhere.
+
+    Args:
+        e (Exception): The error raised while handling the request
+        action (str): What the request was doing, for the logs
+
+    Raises:
+        HTTPException: 413 if the call alone needs more tokens than the whole
+            budget, 429 with Retry-After when the client's token budget is
+            exhausted, 503 with Retry-After when the model is overloaded, 504 if
+            generation misses the request deadline, 499 if the client
+            disconnects, 400 for an invalid model response, 500 otherwise
+    """
+    if isinstance(e, HTTPException):
+        raise e
+    if isinstance(e, TokenRequestTooLarge):
+        raise HTTPException(status_code=413, detail=str(e)) from e
+    if isinstance(e, TokenBudgetExceeded | AdmissionRejected):
+        status_code = 429 if isinstance(e, TokenBudgetExceeded) else 503
+        raise HTTPException(
+            status_code=status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
+    if isinstance(e, DeadlineExceeded):
+        raise HTTPException(status_code=504, detail=str(e)) from e
+    if isinstance(e, ClientDisconnected):
+        # Nobody is listening any more; the status only shows up in access logs
+        raise HTTPException(status_code=499, detail=str(e)) from e
+    if isinstance(e, ValueError):
+        logger.error(f"Error {action}: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    logger.error(f"Unexpected error {action}: {str(e)}", exc_info=True)
+    raise HTTPException(status_code=500, detail="An unexpected error occurred") from e
+
+
+async def _store_queries(
+    db: Session, rows: list[tuple[str, str, str | None, dict[str, Any], int | None]]
+) -> list[TravelQueryResponse]:
+    """Persist answered travel queries, through the write-behind queue if it runs.
+
+    Either way the queries are counted in the corridor_stats rollup as they are
+    committed.
+
+    Args:
+        db (Session): Database session
+        rows (List[Tuple[str, str, Optional[str], Dict[str, Any], Optional[int]]]):
+            Query text, destination, origin, answer and generation milliseconds
+            (None if the answer was not generated) of each travel query
+
+    Returns:
+        List[TravelQueryResponse]: The stored travel queries, in the order given
+    """
+    if write_behind_service.running:
+        results = []
+        for query_text, destination, origin, travel_info, generation_ms in rows:
+            row = {
+                "id": await write_behind_service.next_id(),
+                "query": query_text,
+                "destination": destination,
+                "origin": origin,
+                "response": travel_info,
+                "created_at": datetime.now(UTC),
+                "generation_ms": generation_ms,
+            }
+            await write_behind_service.submit(row)
+            logger.debug(f"Queued query for write-behind with ID: {row['id']}")
+            results.append(TravelQueryResponse(**row))
+        return results
+
+    db_queries = [
+        TravelQuery(
+            query=query_text,
+            destination=destination,
+            origin=origin,
+            response=travel_info,
+            # Set here rather than by the database, to know the day to count it on
+            created_at=datetime.now(UTC),
+            generation_ms=generation_ms,
+        )
+        for query_text, destination, origin, travel_info, generation_ms in rows
+    ]
+    if settings.PARTITIONING_ENABLED:
+        # Partitions cannot hand out IDs unique across all of them
+        for db_query in db_queries:
+            db_query.id = await write_behind_service.next_id()
+    db.add_all(db_queries)
+    StatsService(db).add(db_queries)
+    db.commit()
+    results = []
+    for db_query in db_queries:
+        db.refresh(db_query)
+        logger.debug(f"Saved query to database with ID: {db_query.id}")
+        results.append(
+            TravelQueryResponse(
+                id=db_query.id,
+                query=db_query.query,
+                destination=db_query.destination,
+                origin=db_query.origin,
+                response=db_query.response,
+                created_at=db_query.created_at,
+            )
+        )
+    return results
+
+
+async def _answer_travel_query(
+    request: Request,
+    response: Response,
+    query: TravelQueryCreate,
+    db: Session,
+    deadline: float,
+) -> TravelQueryResponse:
+    """Answer a travel query from the visa rules, a similar answer or the model.
+
+    The answer is stored as a new query in every case. Calls to the model must
+    finish before ``deadline`` (see request_deadline).
+    """
+    logger.info(f"Received travel query: {query.destination} - {query.query}")
+
+    match = None
+    generation_ms = None
+    travel_info = None
+    if settings.VISA_RULES_ENABLED:
+        travel_info = visa_rules_service.answer(
+            query.query, query.destination, query.origin
+        )
+    if travel_info is None and settings.SIMILARITY_ENABLED:
+        match = similarity_service.lookup(query.query, query.destination, query.origin)
+    if travel_info is not None:
+        logger.info(f"Answered {query.destination} query from the visa rules")
+    elif match is not None:
+        logger.info(
+            f"Reusing answer of query {match.query_id} (similarity {match.score:.2f})"
+        )
+        response.headers["X-Reused-Answer"] = str(match.query_id)
+        travel_info = match.answer
+        stale = freshness_service.stale_fields(travel_info)
+        if stale:
+            fresh = await run_with_deadline(
+                request,
+                gemini_service.refresh_fields(
+                    query.query,
+                    query.destination,
+                    query.origin,
+                    travel_info,
+                    stale,
+                    priority=get_priority(request),
+                    client=client_id(request),
+                ),
+                timeout=time_left(deadline),
+            )
+            travel_info = freshness_service.merge(travel_info, fresh)
+    else:
+        started = time.perf_counter()
+        travel_info = await run_with_deadline(
+            request,
+            gemini_service.get_travel_info(
+                query=query.query,
+                destination=query.destination,
+                origin=query.origin,
+                priority=get_priority(request),
+                client=client_id(request),
+            ),
+            timeout=time_left(deadline),
+        )
+        generation_ms = round((time.perf_counter() - started) * 1000)
+        logger.info(f"Successfully generated response for {query.destination}")
+
+    [result] = await _store_queries(
+        db, [(query.query, query.destination, query.origin, travel_info, generation_ms)]
+    )
+    mark_write(request, response)
+
+    if settings.SIMILARITY_ENABLED and generation_ms is not None:
+        similarity_service.add(
+            result.id, query.query, query.destination, query.origin, travel_info
+        )
+    return result
+
+
 @router.post("/query", response_model=TravelQueryResponse)
 @query_rate_limiter
 async def create_travel_query(
     request: Request,
+    response: Response,
     query: TravelQueryCreate,
     db: Session = Depends(get_db),
     history_service: HistoryService = Depends(get_history_service),
@@ -38,69 +336,226 @@ async def create_travel_query(
 
     Args:
         request (Request): FastAPI request object
+        response (Response): FastAPI response object
         query (TravelQueryCreate): The travel query details including destination and origin
         db (Session): Database session dependency
         history_service (HistoryService): History service dependency
 
+    When visa rules are enabled and the question asks nothing but whether a
+    visa is needed for a corridor the rules cover, it is answered from the rules
+    without calling the model, with the response's source set to "rules".
+
+    When similar query reuse is enabled and an earlier query about the same
+    corridor is a close paraphrase, its answer is returned instead of generating
+    a new one, and the X-Reused-Answer header names the earlier query.
+
+    A request with an Idempotency-Key header (IDEMPOTENCY_HEADER) is answered
+    once per key and client: repeating the key returns the stored query, or waits
+    for the request still running with it, with an Idempotent-Replayed header.
+
     Returns:
         TravelQueryResponse: Complete response including AI-generated travel information
 
     Raises:
-        HTTPException: If there's an error processing the query or generating the response
+        HTTPException: If there's an error processing the query or generating the response,
+            429 with Retry-After when the client's token budget is exhausted,
+            413 if the call alone needs more tokens than the whole budget,
+            503 with Retry-After when the model is overloaded, 504 if generation misses
+            the request deadline, 499 if the client disconnects, 422 if the
+            idempotency key was used with a different query
     """
+    idempotency_key = request.headers.get(settings.IDEMPOTENCY_HEADER)
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{settings.IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} "
+            "characters long",
+        )
+    # Waiting for a repeated key and generating share one deadline
+    deadline = request_deadline(request)
     try:
-        logger.info(f"Received travel query: {query.destination} - {query.query}")
+        if idempotency_key is None:
+            return await _answer_travel_query(request, response, query, db, deadline)
+
+        client = client_id(request)
+        replay = await run_with_deadline(
+            request,
+            idempotency_service.claim(
+                client, idempotency_key, fingerprint(query.model_dump())
+            ),
+            timeout=time_left(deadline),
+        )
+        if replay is not None:
+            result = TravelQueryResponse.model_validate(replay["query"])
+            logger.info(f"Replaying query {result.id} for a repeated idempotency key")
+            response.headers.update(replay["headers"])
+            response.headers["Idempotent-Replayed"] = "true"
+            mark_write(request, response)
+            return result
+        try:
+            result = await _answer_travel_query(request, response, query, db, deadline)
+        except BaseException:
+            idempotency_service.abandon(client, idempotency_key)
+            raise
+        replayed_headers = {
+            name: response.headers[name]
+            for name in REPLAYED_HEADERS
+            if name in response.headers
+        }
+        idempotency_service.complete(
+            client,
+            idempotency_key,
+            {"query": result.model_dump(mode="json"), "headers": replayed_headers},
+        )
+        return result
 
-        logger.debug("Initialized Gemini service")
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    except Exception as e:
+        _raise_generation_error(e, "processing query")
 
-        travel_info = await gemini_service.get_travel_info(
-            query=query.query, destination=query.destination, origin=query.origin
-        )
-        logger.info(f"Successfully generated response for {query.destination}")
 
-        db_query = TravelQuery(
-            query=query.query,
-            destination=query.destination,
-            origin=query.origin,
-            response=travel_info,
-        )
-        db.add(db_query)
-        db.commit()
-        db.refresh(db_query)
-        logger.debug(f"Saved query to database with ID: {db_query.id}")
+@router.post("/itinerary", response_model=ItineraryQueryResponse)
+@query_rate_limiter
+async def create_itinerary_query(
+    request: Request,
+    response: Response,
+    itinerary: ItineraryQueryCreate,
+    db: Session = Depends(get_db),
+) -> ItineraryQueryResponse:
+    """Answer a travel question for every destination of a trip at once.
 
-        return TravelQueryResponse(
-            id=db_query.id,
-            query=db_query.query,
-            destination=db_query.destination,
-            origin=db_query.origin,
-            response=db_query.response,
-            created_at=db_query.created_at,
+    The destinations are asked for in as few model calls as the output token
+    limits allow, sharing one prompt, rather than one call each. Every
+    destination is stored as a travel query of its own, so its answer shows up
+    in the history and can be reused by later queries about that destination.
+
+    When visa rules are enabled, destinations whose corridor the rules cover
+    are answered from them if the question is a plain visa question. When
+    similar query reuse is enabled, destinations with a fresh answer to a close
+    paraphrase are not asked for again, and the X-Reused-Answer header lists
+    the earlier queries.
+
+    Args:
+        request (Request): FastAPI request object
+        response (Response): FastAPI response object
+        itinerary (ItineraryQueryCreate): The question, destinations and origin
+        db (Session): Database session dependency
+
+    Returns:
+        ItineraryQueryResponse: One stored travel query per destination
+
+    Raises:
+        HTTPException: As for new travel queries
+    """
+    try:
+        logger.info(
+            f"Received itinerary query: {', '.join(itinerary.destinations)} - "
+            f"{itinerary.query}"
+        )
+        answers: dict[str, dict[str, Any]] = {}
+        if settings.VISA_RULES_ENABLED:
+            for destination in itinerary.destinations:
+                answer = visa_rules_service.answer(
+                    itinerary.query, destination, itinerary.origin
+                )
+                if answer is not None:
+                    answers[destination] = answer
+        if settings.SIMILARITY_ENABLED and len(answers) < len(itinerary.destinations):
+            pending = [d for d in itinerary.destinations if d not in answers]
+            matches = similarity_service.lookup_many(
+                [
+                    (itinerary.query, destination, itinerary.origin)
+                    for destination in pending
+                ]
+            )
+            reused = []
+            for destination, match in zip(pending, matches, strict=True):
+                if match and not freshness_service.stale_fields(match.answer):
+                    answers[destination] = match.answer
+                    reused.append(str(match.query_id))
+            if reused:
+                logger.info(f"Reusing answers of queries {', '.join(reused)}")
+                response.headers["X-Reused-Answer"] = ",".join(reused)
+
+        missing = [d for d in itinerary.destinations if d not in answers]
+        generated = {}
+        generation_ms = None
+        if missing:
+            started = time.perf_counter()
+            generated = await run_with_deadline(
+                request,
+                gemini_service.get_itinerary_info(
+                    itinerary.query,
+                    missing,
+                    itinerary.origin,
+                    priority=get_priority(request),
+                    client=client_id(request),
+                ),
+                timeout=request_timeout(request),
+            )
+            # Destinations are generated together; each row gets an equal share of
+            # the time, so it is not counted once per destination in latency stats
+            generation_ms = round(
+                (time.perf_counter() - started) * 1000 / max(len(generated), 1)
+            )
+            answers.update(generated)
+
+        results = await _store_queries(
+            db,
+            [
+                (
+                    itinerary.query,
+                    destination,
+                    itinerary.origin,
+                    answers[destination],
+                    generation_ms if destination in generated else None,
+                )
+                for destination in itinerary.destinations
+            ],
         )
+        mark_write(request, response)
+
+        if settings.SIMILARITY_ENABLED:
+            for result in results:
+                if result.destination in generated:
+                    similarity_service.add(
+                        result.id,
+                        itinerary.query,
+                        result.destination,
+                        itinerary.origin,
+                        generated[result.destination],
+                    )
+        return ItineraryQueryResponse(queries=results)
 
-    except ValueError as e:
-        logger.error(f"Error processing query: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
-        logger.error(f"Unexpected error processing query: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500, detail="An unexpected error occurred"
-        ) from e
+        _raise_generation_error(e, "processing itinerary query")
 
 
 @router.get("/history", response_model=list[TravelQueryResponse])
 @history_rate_limiter
 async def get_query_history(
     request: Request,
-    db: Session = Depends(get_db),
-    history_service: HistoryService = Depends(get_history_service),
-) -> list[TravelQueryResponse]:
-    """Retrieve the history of all travel queries.
+    history_service: HistoryService = Depends(get_read_history_service),
+    fieldset: tuple[str, ...] | None = Depends(get_fieldset),
+    limit: int | None = Query(None, ge=1, description="Newest queries to return"),
+    since: datetime | None = Query(None, description="Only queries created since"),
+) -> list[TravelQueryResponse] | JSONResponse:
+    """Retrieve the history of all travel queries, newest first.
+
+    With ``fields`` or ``view=summary`` only the requested columns are selected
+    from the database, so listings without the answer never load the large
+    ``response`` column, and the rows are returned as they are stored. With
+    ``limit`` and ``since``, a partitioned table is only read as far back as
+    needed.
 
     Args:
         request (Request): FastAPI request object
-        db (Session): Database session dependency
-        history_service (HistoryService): History service dependency
+        history_service (HistoryService): History service dependency, reading
+            from a replica when configured
+        fieldset (Optional[Tuple[str, ...]]): Fields to return, None for all
+        limit (Optional[int]): Maximum number of queries to return
+        since (Optional[datetime]): Only return queries created at or after this time
 
     Returns:
         List[TravelQueryResponse]: List of all previous travel queries and their responses
@@ -110,7 +565,14 @@ async def get_query_history(
     """
     try:
         logger.info("Fetching query history")
-        queries = db.query(TravelQuery).order_by(TravelQuery.created_at.desc()).all()
+        if fieldset is not None:
+            rows = history_service.list_queries(fieldset, limit=limit, since=since)
+            logger.debug(
+                f"Found {len(rows)} queries in history ({', '.join(fieldset)})"
+            )
+            return JSONResponse([_sparse(row._asdict(), fieldset) for row in rows])
+
+        queries = history_service.list_queries(limit=limit, since=since)
         logger.debug(f"Found {len(queries)} queries in history")
 
         responses = []
@@ -156,15 +618,61 @@ async def get_query_history(
         ) from e
 
 
+@router.get("/history/export")
+@history_rate_limiter
+async def export_history(
+    request: Request,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    destination: str | None = None,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Stream the stored travel queries, oldest first.
+
+    Rows are read through a server-side cursor and sent as they are encoded, so
+    exports of any size run in constant memory.
+
+    Args:
+        request (Request): FastAPI request object
+        export_format (str): "ndjson" (one JSON object per line) or "csv"
+        since (Optional[datetime]): Only queries created at or after this time
+        until (Optional[datetime]): Only queries created before this time
+        destination (Optional[str]): Only queries about this destination
+        gzip (bool): Whether to gzip-compress the export
+
+    Returns:
+        StreamingResponse: The export as a file download
+    """
+    logger.info(f"Exporting query history as {export_format}")
+    export_service = ExportService(read_session_factory(request))
+    filename = f"travel_queries.{export_format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_service.stream(
+            export_format,
+            compress=gzip,
+            since=since,
+            until=until,
+            destination=canonical_country(destination),
+        ),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/history/{query_id}", response_model=TravelQueryResponse)
 async def get_query_by_id(
-    query_id: int, db: Session = Depends(get_db)
-) -> TravelQueryResponse:
+    query_id: int,
+    db: Session = Depends(get_read_db),
+    fieldset: tuple[str, ...] | None = Depends(get_fieldset),
+) -> TravelQueryResponse | JSONResponse:
     """Retrieve a specific travel query by its ID.
 
     Args:
         query_id (int): The ID of the travel query to retrieve
-        db (Session): Database session dependency
+        db (Session): Read-only database session dependency, served by a replica
+            when configured
+        fieldset (Optional[Tuple[str, ...]]): Fields to return, None for all
 
     Returns:
         TravelQueryResponse: The requested travel query and its response
@@ -174,11 +682,30 @@ async def get_query_by_id(
     """
     try:
         logger.info(f"Fetching query with ID: {query_id}")
-        query = db.query(TravelQuery).filter(TravelQuery.id == query_id).first()
+        columns = (
+            [TravelQuery]
+            if fieldset is None
+            else [getattr(TravelQuery, field) for field in fieldset]
+        )
+        query = db.query(*columns).filter(TravelQuery.id == query_id).first()
+        if not query and db.get_bind() is not engine:
+            # The replica may not have caught up with the primary yet
+            with SessionLocal() as primary:
+                query = (
+                    primary.query(*columns).filter(TravelQuery.id == query_id).first()
+                )
         if not query:
+            pending = write_behind_service.get_pending(query_id)
+            if pending:
+                logger.debug(f"Serving query {query_id} from write-behind queue")
+                if fieldset is not None:
+                    return JSONResponse(_sparse(pending, fieldset))
+                return TravelQueryResponse(**pending)
             logger.warning(f"Query with ID {query_id} not found")
             raise HTTPException(status_code=404, detail="Query not found")
         logger.debug(f"Successfully retrieved query with ID: {query_id}")
+        if fieldset is not None:
+            return JSONResponse(_sparse(query._asdict(), fieldset))
         return TravelQueryResponse(
             id=query.id,
             query=query.query,
@@ -192,20 +719,229 @@ async def get_query_by_id(
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+async def _wait_until_stored(query_id: int) -> None:
+    """Wait for a query still queued by write-behind to reach the database.
+
+    Raises:
+        HTTPException: 409 with Retry-After if it is still queued after
+            WRITE_BEHIND_WAIT_TIMEOUT seconds
+    """
+    if write_behind_service.get_pending(query_id) is None:
+        return
+    logger.debug(f"Waiting for queued query {query_id} to be written")
+    if not await write_behind_service.wait_written(
+        query_id, settings.WRITE_BEHIND_WAIT_TIMEOUT
+    ):
+        raise HTTPException(
+            status_code=409,
+            detail="Query is still being stored, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+@router.post("/history/{query_id}/refresh", response_model=TravelQueryResponse)
+@query_rate_limiter
+async def refresh_query(
+    request: Request,
+    response: Response,
+    query_id: int,
+    fields: list[str] | None = Query(None),
+    db: Session = Depends(get_db),
+) -> TravelQueryResponse:
+    """Regenerate the stale fields of a stored answer.
+
+    Only fields whose TTL (FIELD_TTL_HOURS) has expired are regenerated, or the
+    given fields if any are named. They are merged into the stored answer, the
+    rest is kept as it is.
+
+    Args:
+        request (Request): FastAPI request object
+        response (Response): FastAPI response object
+        query_id (int): The ID of the travel query to refresh
+        fields (Optional[List[str]]): Fields to regenerate regardless of their age
+        db (Session): Database session dependency
+
+    Returns:
+        TravelQueryResponse: The travel query with its refreshed answer
+
+    Raises:
+        HTTPException: 404 if the query is not found, 409 if it is still queued
+            for writing, 400 for unknown fields or an invalid model response,
+            413/429/503/504/499 as for new queries
+    """
+    await _wait_until_stored(query_id)
+    db_query = db.query(TravelQuery).filter(TravelQuery.id == query_id).first()
+    if not db_query:
+        raise HTTPException(status_code=404, detail="Query not found")
+
+    try:
+        stale = fields or freshness_service.stale_fields(
+            db_query.response, db_query.created_at
+        )
+        if stale:
+            logger.info(f"Refreshing {', '.join(stale)} of query {query_id}")
+            # Drain the (empty) body so the deadline only waits for disconnects
+            await request.body()
+            fresh = await run_with_deadline(
+                request,
+                gemini_service.refresh_fields(
+                    db_query.query,
+                    db_query.destination,
+                    db_query.origin,
+                    db_query.response,
+                    stale,
+                    priority=get_priority(request),
+                    client=client_id(request),
+                ),
+                timeout=request_timeout(request),
+            )
+            # Statement-level writes also work on the view over SQLite partitions
+            db.execute(
+                update(TravelQuery)
+                .where(TravelQuery.id == query_id)
+                .values(response=freshness_service.merge(db_query.response, fresh))
+            )
+            db.commit()
+            db.refresh(db_query)
+            # Follow-ups must continue from the refreshed answer
+            followup_service.forget(query_id)
+            mark_write(request, response)
+        else:
+            logger.debug(f"Answer of query {query_id} is fresh, nothing to refresh")
+
+        return TravelQueryResponse(
+            id=db_query.id,
+            query=db_query.query,
+            destination=db_query.destination,
+            origin=db_query.origin,
+            response=db_query.response,
+            created_at=db_query.created_at,
+        )
+    except Exception as e:
+        _raise_generation_error(e, "refreshing query")
+
+
+def _followup_context(db: Session, query_id: int) -> FollowUpContext | None:
+    """Get the context of a stored query's answer, cached or from the database."""
+    context = followup_service.get(query_id)
+    if context is not None:
+        return context
+    row = db.query(TravelQuery).filter(TravelQuery.id == query_id).first()
+    if row is not None:
+        return FollowUpContext(row.query, row.destination, row.origin, row.response)
+    pending = write_behind_service.get_pending(query_id)
+    if pending is not None:
+        return FollowUpContext(
+            pending["query"],
+            pending["destination"],
+            pending["origin"],
+            pending["response"],
+        )
+    return None
+
+
+@router.post("/history/{query_id}/followup", response_model=TravelQueryResponse)
+@query_rate_limiter
+async def create_followup_query(
+    request: Request,
+    response: Response,
+    query_id: int,
+    followup: FollowUpCreate,
+    db: Session = Depends(get_db),
+) -> TravelQueryResponse:
+    """Answer a follow-up question on a stored travel query.
+
+    The model gets the earlier answer as compact context and returns only the
+    fields the follow-up changes, which are merged into a copy of that answer.
+    The result is stored as a new travel query; follow up on its ID to continue
+    the conversation. The X-Changed-Fields header lists the changed fields.
+
+    Args:
+        request (Request): FastAPI request object
+        response (Response): FastAPI response object
+        query_id (int): The ID of the travel query to follow up on
+        followup (FollowUpCreate): The follow-up question
+        db (Session): Database session dependency
+
+    Returns:
+        TravelQueryResponse: The stored follow-up with its complete answer
+
+    Raises:
+        HTTPException: 404 if the query is not found, 400 for an invalid model
+            response, 413/429/503/504/499 as for new queries
+    """
+    context = _followup_context(db, query_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail="Query not found")
+
+    try:
+        logger.info(f"Received follow-up on query {query_id}: {followup.query}")
+        started = time.perf_counter()
+        changed = await run_with_deadline(
+            request,
+            gemini_service.answer_followup(
+                followup.query,
+                context.query,
+                context.destination,
+                context.origin,
+                context.answer,
+                context.turns,
+                priority=get_priority(request),
+                client=client_id(request),
+            ),
+            timeout=request_timeout(request),
+        )
+        generation_ms = round((time.perf_counter() - started) * 1000)
+        travel_info = (
+            freshness_service.merge(context.answer, changed)
+            if changed
+            else context.answer
+        )
+        [result] = await _store_queries(
+            db,
+            [
+                (
+                    followup.query,
+                    context.destination,
+                    context.origin,
+                    travel_info,
+                    generation_ms,
+                )
+            ],
+        )
+        mark_write(request, response)
+        followup_service.remember(result.id, context, followup.query, travel_info)
+        response.headers["X-Changed-Fields"] = ",".join(changed)
+        return result
+
+    except Exception as e:
+        _raise_generation_error(e, "processing follow-up")
+
+
 @router.delete("/history/{query_id}")
-async def delete_query(query_id: int, db: Session = Depends(get_db)) -> dict:
+async def delete_query(
+    query_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+) -> dict:
     """Delete a specific travel query from the history.
 
     Args:
         query_id (int): The ID of the travel query to delete
+        request (Request): FastAPI request object
+        response (Response): FastAPI response object
         db (Session): Database session dependency
 
     Returns:
         dict: Success message confirming deletion
 
     Raises:
-        HTTPException: If the query is not found or there's an error deleting it
+        HTTPException: If the query is not found or there's an error deleting it,
+            409 if it is still queued for writing
     """
+    # A queued insert would bring the query back after it is deleted
+    await _wait_until_stored(query_id)
     try:
         logger.info(f"Attempting to delete query with ID: {query_id}")
         query = db.query(TravelQuery).filter(TravelQuery.id == query_id).first()
@@ -213,8 +949,13 @@ async def delete_query(query_id: int, db: Session = Depends(get_db)) -> dict:
             logger.warning(f"Query with ID {query_id} not found for deletion")
             raise HTTPException(status_code=404, detail="Query not found")
 
-        db.delete(query)
+        db.execute(delete(TravelQuery).where(TravelQuery.id == query_id))
+        StatsService(db).remove([query])
         db.commit()
+        followup_service.forget(query_id)
+        if settings.SIMILARITY_ENABLED:
+            similarity_service.remove([query_id])
+        mark_write(request, response)
         logger.info(f"Successfully deleted query with ID: {query_id}")
         return {"message": "Query deleted successfully"}
     except Exception as e:
@@ -222,24 +963,11 @@ async def delete_query(query_id: int, db: Session = Depends(get_db)) -> dict:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
-def extract_travel_info(query: str) -> tuple[str | None, str]:
-    """Extract origin and destination from query text."""
-    origin_destination_regex = r"(?:from|travel(?:ing)? from)\s+([a-zA-Z\s]+)\s+(?:to|visit(?:ing)?)\s+([a-zA-Z\s]+)"
-    destination_regex = r"(?:to|visit(?:ing)?)\s+([a-zA-Z\s]+)"
+def extract_travel_info(query: str) -> tuple[str | None, str | None]:
+    """Extract origin and destination from query text.
 
-    origin = None
-    destination = None
-
-    origin_destination_match = re.search(origin_destination_regex, query, re.IGNORECASE)
-    if origin_destination_match:
-        origin = origin_destination_match.group(1).strip()
-        destination = origin_destination_match.group(2).strip()
-    else:
-        destination_match = re.search(destination_regex, query, re.IGNORECASE)
-        if destination_match:
-            destination = destination_match.group(1).strip()
-
-    if not destination:
-        destination = "Unknown destination"
-
-    return origin, destination
+    Returns:
+        Tuple[Optional[str], Optional[str]]: ISO 3166-1 alpha-2 codes of the
+            origin and destination, None where the query does not name one
+    """
+    return get_gazetteer().extract(query)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+
+from app.core.admin import require_admin
+from app.core.logging_config import setup_logging
+from app.schemas.usage import UsageReport
+from app.services.token_budget_service import token_budget
+
+logger = setup_logging()
+
+router = APIRouter()
+
+
+@router.get("/usage", response_model=UsageReport, dependencies=[Depends(require_admin)])
+async def get_usage() -> UsageReport:
+    """Return the model token usage per client in the current window.
+
+    Returns:
+        UsageReport: Usage of every client seen in the window, heaviest first
+    """
+    logger.debug("Token usage requested")
+    return UsageReport(
+        window_seconds=token_budget.window_seconds, clients=token_budget.usage()
+    )
@@ -0,0 +1,3 @@
+"""
+Command line tools for operating the Travel Query application
+"""
@@ -0,0 +1,94 @@
+"""Serve a local stand-in for the Gemini generateContent endpoint.
+
+Answers generateContent calls with a valid travel answer and its token usage
+after a fixed latency, and model descriptions (used by the warm-up) immediately.
+Point the app at it to exercise the Gemini transport without the real API:
+
+    python -m app.cli.gemini_stub --port 8090 --latency 0.8
+    GEMINI_BASE_URL=http://127.0.0.1:8090 ./run.sh
+
+Usage:
+    python -m app.cli.gemini_stub
+    python -m app.cli.gemini_stub --latency 2 --status 429
+"""
+
+import argparse
+import asyncio
+import json
+import math
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.services.gemini_service import GENERATED_FIELDS
+
+
+def create_app(latency: float, status: int) -> FastAPI:
+    """Build the stub application.
+
+    Args:
+        latency (float): Seconds each generateContent call takes
+        status (int): HTTP status of generateContent responses
+
+    Returns:
+        FastAPI: The stub application
+    """
+    stub = FastAPI(title="Gemini stub")
+    answer = json.dumps(
+        {
+            "destination": "Stub",
+            "origin": "Stub",
+            **{
+                field: json.loads(example)
+                for field, example in GENERATED_FIELDS.items()
+            },
+        }
+    )
+
+    @stub.get("/v1beta/models/{model}")
+    async def get_model(model: str) -> dict:
+        return {"name": f"models/{model}"}
+
+    @stub.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request) -> JSONResponse:
+        body = await request.json()
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        await asyncio.sleep(latency)
+        if status >= 400:
+            return JSONResponse(
+                {"error": {"code": status, "message": "Stubbed error"}},
+                status_code=status,
+            )
+        return JSONResponse(
+            {
+                "candidates": [
+                    {"content": {"role": "model", "parts": [{"text": answer}]}}
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": math.ceil(len(prompt) / 4),
+                    "candidatesTokenCount": math.ceil(len(answer) / 4),
+                },
+            }
+        )
+
+    return stub
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--status", type=int, default=200)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.status), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Partition the travel queries table by month and maintain its partitions.
+
+Usage:
+    python -m app.cli.partitions report
+    python -m app.cli.partitions migrate
+    python -m app.cli.partitions maintain --premake-months 6 --max-age-days 365
+"""
+
+import argparse
+
+from app.core.database import engine
+from app.schemas.partition import PartitionReport
+from app.services.partition_service import PartitionService
+from app.services.schema_service import upgrade_schema
+
+
+def _print_report(report: PartitionReport) -> None:
+    """Print a partition report in a human readable form."""
+    print(f"Partitioned:     {'yes' if report.partitioned else 'no'}")
+    print(f"Partitions:      {len(report.partitions)}")
+    if report.partitions:
+        print(f"Oldest:          {report.partitions[0]}")
+        print(f"Newest:          {report.partitions[-1]}")
+    if report.migrated_rows:
+        print(f"Migrated:        {report.migrated_rows}")
+    if report.created:
+        print(f"Created:         {', '.join(report.created)}")
+    if report.dropped:
+        print(f"Dropped:         {', '.join(report.dropped)}")
+        print(f"Dropped queries: {report.dropped_rows}")
+        if report.archive_path:
+            print(f"Archived to:     {report.archive_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["report", "migrate", "maintain"])
+    parser.add_argument(
+        "--premake-months", type=int, help="override PARTITION_PREMAKE_MONTHS"
+    )
+    parser.add_argument(
+        "--max-age-days", type=int, help="override RETENTION_MAX_AGE_DAYS"
+    )
+    parser.add_argument("--archive-dir", help="override RETENTION_ARCHIVE_DIR")
+    parser.add_argument(
+        "--no-archive", action="store_true", help="drop without archiving"
+    )
+    args = parser.parse_args()
+    upgrade_schema(engine)
+
+    service = PartitionService(
+        engine,
+        premake_months=args.premake_months,
+        max_age_days=args.max_age_days,
+        archive_dir="" if args.no_archive else args.archive_dir,
+    )
+    if args.command == "report":
+        report = service.report()
+    elif args.command == "migrate":
+        report = service.migrate()
+    else:
+        report = service.maintain()
+    _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Replay captured traffic against a running instance and report its performance.
+
+Requests from a capture log (CAPTURE_ENABLED) are re-issued with their
+recorded spacing, divided by ``--speed``, whether or not earlier requests have
+completed. Start the instance under test with REPLAY_FAKE_MODEL=true so that
+model calls take as long as they did when the traffic was captured, without
+calling Gemini:
+
+    REPLAY_FAKE_MODEL=true ./run.sh production
+
+Redacted strings are replaced with filler text of the recorded length. Paths
+naming a stored query use a query created during the replay instead.
+
+Usage:
+    python -m app.cli.replay traffic_capture.ndjson
+    python -m app.cli.replay traffic_capture.ndjson --speed 4 --target http://localhost:8000
+    python -m app.cli.replay capture.ndjson.gz --since 2025-06-10 --until 2025-06-11
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any
+
+import httpx
+
+from app.core.capture import REDACTED_PREFIX
+from app.core.config import get_settings
+
+settings = get_settings()
+
+QUERY_PATH = re.compile(r"^(/api/v1/history/)(\d+)(/.*)?$")
+FILLER_WORDS = (
+    "visa passport travel entry documents embassy tourist business transit "
+    "stay days requirements permit border arrival flight trip country citizens"
+).split()
+
+
+def load(paths: list[str], since: float | None, until: float | None, prefix: str):
+    """Read capture records in arrival order.
+
+    Args:
+        paths (List[str]): Capture logs, gzip-compressed if they end in .gz
+        since (Optional[float]): Skip records that arrived before this epoch time
+        until (Optional[float]): Skip records that arrived at or after this epoch time
+        prefix (str): Only records whose path starts with this prefix
+
+    Returns:
+        List[Dict[str, Any]]: The selected records
+    """
+    records = []
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line of a log still being written
+                if since is not None and record["ts"] < since:
+                    continue
+                if until is not None and record["ts"] >= until:
+                    continue
+                if record["p"].startswith(prefix):
+                    records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+def _filler(length: int, rng: random.Random) -> str:
+    """Return text of the given length made of travel words."""
+    text = ""
+    while len(text) < length:
+        text += rng.choice(FILLER_WORDS) + " "
+    return text[:length].strip() or "visa"
+
+
+def restore(value: Any, rng: random.Random) -> Any:
+    """Replace redacted strings in a sanitized body with filler text."""
+    if isinstance(value, dict):
+        return {k: restore(v, rng) for k, v in value.items()}
+    if isinstance(value, list):
+        return [restore(item, rng) for item in value]
+    if isinstance(value, str) and value.startswith(REDACTED_PREFIX):
+        return _filler(int(value[len(REDACTED_PREFIX) : -1]), rng)
+    return value
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Return a percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Replayer:
+    """Re-issue capture records on their recorded schedule."""
+
+    def __init__(self, target: str, speed: float, timeout: float, seed: int):
+        self.target = target.rstrip("/")
+        self.speed = speed
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.created_ids: list[int] = []
+        self.results: list[tuple[dict, int, float]] = []
+        self.max_lag = 0.0
+
+    def _request(self, record: dict) -> dict:
+        """Build the arguments of the request replaying a record."""
+        path = record["p"]
+        match = QUERY_PATH.match(path)
+        if match and self.created_ids:
+            query_id = self.rng.choice(self.created_ids)
+            path = f"{match.group(1)}{query_id}{match.group(3) or ''}"
+        client = record["c"]
+        headers = {
+            **record.get("h", {}),
+            # One address per captured client, so that rate limits and token
+            # budgets are kept per captured client as they were when captured
+            "X-Forwarded-For": "10.{}.{}.{}".format(*bytes.fromhex(client[:6])),
+        }
+        if record.get("g"):
+            headers[settings.REPLAY_LATENCY_HEADER] = ",".join(map(str, record["g"]))
+        request = {
+            "method": record["m"],
+            "url": f"{self.target}{path}" + (f"?{record['q']}" if record["q"] else ""),
+            "headers": headers,
+        }
+        if record.get("b") is not None:
+            request["json"] = restore(record["b"], self.rng)
+        return request
+
+    async def _send(self, client: httpx.AsyncClient, record: dict) -> None:
+        request = self._request(record)
+        started = time.perf_counter()
+        try:
+            response = await client.request(**request)
+            status = response.status_code
+            if record["p"] == "/api/v1/query" and status == 200:
+                self.created_ids.append(response.json()["id"])
+        except httpx.HTTPError:
+            status = 0
+        self.results.append((record, status, time.perf_counter() - started))
+
+    async def run(self, records: list[dict]) -> float:
+        """Replay the records and return the time it took in seconds."""
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            first = records[0]["ts"]
+            start = time.perf_counter()
+            tasks = []
+            for record in records:
+                due = start + (record["ts"] - first) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+                tasks.append(asyncio.create_task(self._send(client, record)))
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> None:
+        """Print throughput, status codes and latency percentiles."""
+        replayed = sorted(latency * 1000 for _, _, latency in self.results)
+        recorded = sorted(record["d"] for record, _, _ in self.results)
+        statuses = Counter(status for _, status, _ in self.results)
+        rate = len(self.results) / elapsed if elapsed else 0.0
+        print(f"requests:   {len(self.results)} in {elapsed:.1f}s ({rate:.1f} req/s)")
+        print(
+            "status:     "
+            + ", ".join(
+                f"{status or 'error'}: {count}"
+                for status, count in sorted(statuses.items())
+            )
+        )
+        print(f"{'latency ms':<12}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+        for label, values in (("replayed", replayed), ("recorded", recorded)):
+            print(
+                f"{label:<12}"
+                + "".join(
+                    f"{_percentile(values, fraction):>9.1f}"
+                    for fraction in (0.5, 0.9, 0.99, 1.0)
+                )
+            )
+        if self.max_lag > 0.1:
+            print(f"warning: requests were sent up to {self.max_lag:.2f}s late")
+
+
+def _timestamp(value: str | None) -> float | None:
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", nargs="+", help="capture log files")
+    parser.add_argument(
+        "--target",
+        default=f"http://127.0.0.1:{settings.PORT}",
+        help="instance to replay against",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="time compression, 2 replays twice as fast",
+    )
+    parser.add_argument("--since", help="ISO time of the first request to replay")
+    parser.add_argument("--until", help="ISO time to stop replaying at")
+    parser.add_argument("--path-prefix", default="/", help="only replay these paths")
+    parser.add_argument("--limit", type=int, help="replay at most this many requests")
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    records = load(
+        args.capture, _timestamp(args.since), _timestamp(args.until), args.path_prefix
+    )[: args.limit]
+    if not records:
+        print("No captured requests to replay", file=sys.stderr)
+        sys.exit(1)
+
+    duration = (records[-1]["ts"] - records[0]["ts"]) / args.speed
+    print(
+        f"Replaying {len(records)} requests over {duration:.1f}s against {args.target}"
+    )
+    replayer = Replayer(args.target, args.speed, args.timeout, args.seed)
+    elapsed = asyncio.run(replayer.run(records))
+    replayer.report(elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Copy the SQLite primary database to SQLite read replicas for local testing.
+
+SQLite has no replication, so this stands in for it during development: it
+copies the primary to every SQLite URL in DATABASE_REPLICA_URLS (or the given
+targets) once, or every few seconds to simulate replication lag.
+
+Usage:
+    python -m app.cli.replica_sync --once
+    python -m app.cli.replica_sync --interval 5
+    python -m app.cli.replica_sync --target ./travel_queries_replica.db
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import get_settings
+
+
+def _sqlite_path(url: str) -> str | None:
+    """Return the database file of a SQLite URL, or None for other databases."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or not parsed.database:
+        return None
+    return parsed.database
+
+
+def sync(source: str, targets: list[str]) -> None:
+    """Copy the source database into each target with the SQLite backup API.
+
+    Args:
+        source (str): Path of the primary database file
+        targets (List[str]): Paths of the replica database files
+    """
+    with sqlite3.connect(source) as primary:
+        for target in targets:
+            with sqlite3.connect(target) as replica:
+                primary.backup(replica)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--target",
+        action="append",
+        help="replica database file, defaults to the SQLite DATABASE_REPLICA_URLS",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=5.0, help="seconds between copies"
+    )
+    parser.add_argument("--once", action="store_true", help="copy once and exit")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    source = _sqlite_path(settings.DATABASE_URL)
+    if source is None:
+        sys.exit("The primary database is not SQLite; use native replication")
+    targets = args.target or [
+        path
+        for path in map(_sqlite_path, settings.replica_urls_list)
+        if path is not None
+    ]
+    if not targets:
+        sys.exit("No SQLite replicas configured in DATABASE_REPLICA_URLS")
+
+    while True:
+        sync(source, targets)
+        print(f"Copied {source} to {', '.join(targets)}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Report on and enforce the travel query retention policy.
+
+Usage:
+    python -m app.cli.retention report
+    python -m app.cli.retention run --dry-run
+    python -m app.cli.retention run --max-age-days 90 --max-rows 100000
+"""
+
+import argparse
+
+from app.core.database import SessionLocal, engine
+from app.schemas.retention import RetentionReport
+from app.services.retention_service import RetentionService
+from app.services.schema_service import upgrade_schema
+
+
+def _print_report(report: RetentionReport) -> None:
+    """Print a retention report in a human readable form."""
+    print(f"Total queries:        {report.total_rows}")
+    print(f"Oldest query:         {report.oldest or '-'}")
+    print(f"Newest query:         {report.newest or '-'}")
+    print(f"Expired by age:       {report.expired_by_age}")
+    print(f"Beyond max rows:      {report.excess_rows}")
+    print(f"Eligible for removal: {report.eligible}")
+    if report.dry_run:
+        print("Dry run, nothing was removed")
+    elif report.removed:
+        print(f"Removed:              {report.removed}")
+        if report.archive_path:
+            print(f"Archived to:          {report.archive_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["report", "run"])
+    parser.add_argument("--dry-run", action="store_true", help="only report")
+    parser.add_argument(
+        "--max-age-days", type=int, help="override RETENTION_MAX_AGE_DAYS"
+    )
+    parser.add_argument("--max-rows", type=int, help="override RETENTION_MAX_ROWS")
+    parser.add_argument("--chunk-size", type=int, help="override RETENTION_CHUNK_SIZE")
+    parser.add_argument("--archive-dir", help="override RETENTION_ARCHIVE_DIR")
+    parser.add_argument(
+        "--no-archive", action="store_true", help="delete without archiving"
+    )
+    args = parser.parse_args()
+    upgrade_schema(engine)
+
+    with SessionLocal() as db:
+        service = RetentionService(
+            db,
+            max_age_days=args.max_age_days,
+            max_rows=args.max_rows,
+            chunk_size=args.chunk_size,
+            archive_dir="" if args.no_archive else args.archive_dir,
+        )
+        if args.command == "report":
+            report = service.report()
+        else:
+            report = service.enforce(dry_run=args.dry_run)
+    _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Rebuild and show the corridor statistics rollup.
+
+Usage:
+    python -m app.cli.stats rebuild
+    python -m app.cli.stats show --days 7 --group-by destination --limit 10
+"""
+
+import argparse
+from datetime import UTC, datetime, timedelta
+
+from app.core.database import SessionLocal, engine
+from app.services.schema_service import upgrade_schema
+from app.services.stats_service import STATS_GROUPS, StatsService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["rebuild", "show"])
+    parser.add_argument("--days", type=int, default=7, help="days to show")
+    parser.add_argument(
+        "--group-by",
+        default="origin,destination",
+        help=f"comma-separated columns out of {', '.join(STATS_GROUPS)}",
+    )
+    parser.add_argument("--limit", type=int, default=20, help="groups to show")
+    args = parser.parse_args()
+    upgrade_schema(engine)
+
+    with SessionLocal() as db:
+        service = StatsService(db)
+        if args.command == "rebuild":
+            print(f"Rebuilt corridor stats: {service.rebuild()} rows")
+            return
+
+        groups = tuple(group.strip() for group in args.group_by.split(","))
+        if not set(groups) <= set(STATS_GROUPS):
+            parser.error(f"--group-by must name some of {', '.join(STATS_GROUPS)}")
+        until = datetime.now(UTC).date()
+        since = until - timedelta(days=args.days - 1)
+        stats = service.query(since, until, groups, limit=args.limit)
+    print(f"Queries from {since} to {until}")
+    for entry in stats:
+        group = " / ".join(str(entry[g] or "-") for g in groups)
+        latency = entry["avg_generation_ms"]
+        print(
+            f"{group:<48}{entry['queries']:>8}"
+            + (f"{latency:>10.0f} ms" if latency is not None else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
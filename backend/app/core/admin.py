@@ -0,0 +1,33 @@
+import hmac
+
+from fastapi import HTTPException, Request
+
+from .config import get_settings
+from .logging_config import setup_logging
+
+logger = setup_logging()
+settings = get_settings()
+
+
+def require_admin(request: Request) -> None:
+    """Only let requests carrying the admin token through.
+
+    Use as a route dependency for endpoints that expose other clients' data,
+    such as metrics and token usage. The token is sent in ADMIN_HEADER and
+    compared with ADMIN_TOKEN; without ADMIN_TOKEN these endpoints are disabled.
+
+    Args:
+        request (Request): FastAPI request object
+
+    Raises:
+        HTTPException: 403 if ADMIN_TOKEN is not set, 401 if the token is missing
+            or wrong
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN"
+        )
+    token = request.headers.get(settings.ADMIN_HEADER, "")
+    if not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        logger.warning(f"Rejected admin request to {request.url.path}")
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from .config import get_settings
+from .logging_config import setup_logging
+from .metrics import metrics
+
+logger = setup_logging()
+settings = get_settings()
+
+
+class Priority(IntEnum):
+    """Admission priority classes, lower values are served first."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+    PREGENERATION = 2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a call is shed because the wait queue is full.
+
+    Attributes:
+        retry_after (int): Seconds after which the caller should retry
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server is overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Check whether an upstream error is a 429 Too Many Requests."""
+    if getattr(error, "code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+class AdmissionController:
+    """Bound the number of concurrent upstream calls and queue or shed the rest.
+
+    The concurrency limit adapts with AIMD: it grows by one per ``limit``
+    successful calls that finish within ``target_latency`` while the limit is
+    in use, is multiplied by 0.9 when calls run slower than that, and by
+    ``backoff`` when upstream answers 429. Calls over the limit wait in a
+    priority queue of at most ``max_queue`` entries; when it is full, a new call
+    either displaces the lowest-priority waiter or is rejected with a
+    ``Retry-After`` estimate based on the recent drain rate.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        target_latency: float,
+        backoff: float = 0.5,
+        name: str = "gemini",
+    ):
+        """Initialize the admission controller.
+
+        Args:
+            initial_limit (int): Starting concurrency limit
+            min_limit (int): Lowest the limit can shrink to
+            max_limit (int): Highest the limit can grow to
+            max_queue (int): Maximum number of waiting calls
+            target_latency (float): Call latency in seconds above which the limit shrinks
+            backoff (float): Factor applied to the limit on upstream 429s. Defaults to 0.5.
+            name (str): Name used in metric labels. Defaults to "gemini".
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.name = name
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._completions: deque[float] = deque(maxlen=64)
+
+    @classmethod
+    def from_settings(cls, name: str = "gemini") -> "AdmissionController":
+        """Create a controller configured from the application settings."""
+        return cls(
+            initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            max_limit=settings.ADMISSION_MAX_LIMIT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            target_latency=settings.ADMISSION_TARGET_LATENCY,
+            backoff=settings.ADMISSION_BACKOFF,
+            name=name,
+        )
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        """Hold one unit of upstream concurrency for the duration of a call.
+
+        Args:
+            priority (Priority): Priority class of the call. Defaults to INTERACTIVE.
+
+        Raises:
+            AdmissionRejected: If the call is shed because the queue is full
+        """
+        await self._acquire(priority)
+        start = time.monotonic()
+        rate_limited = False
+        try:
+            yield
+        except Exception as e:
+            rate_limited = is_rate_limited(e)
+            raise
+        finally:
+            self._release(time.monotonic() - start, rate_limited)
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds the current queue needs to drain."""
+        now = time.monotonic()
+        recent = [t for t in self._completions if now - t < 60]
+        if len(recent) >= 2 and now > recent[0]:
+            drain_rate = len(recent) / (now - recent[0])
+        else:
+            drain_rate = self.limit / self.target_latency
+        return max(1, min(60, math.ceil((self._queued + 1) / drain_rate)))
+
+    async def _acquire(self, priority: Priority) -> None:
+        """Wait until a call of the given priority may start."""
+        if self.in_flight < int(self.limit) and self._queued == 0:
+            self.in_flight += 1
+            self._publish()
+            return
+
+        if self._queued >= self.max_queue and not self._displace(priority):
+            retry_after = self.retry_after()
+            metrics.increment(
+                "admission_shed_total", controller=self.name, priority=priority.name
+            )
+            logger.warning(
+                f"Shedding {priority.name.lower()} call, {self._queued} calls queued"
+            )
+            raise AdmissionRejected(retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued += 1
+        self._publish()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+                self._queued -= 1
+                self._publish()
+            elif not future.cancelled() and future.exception() is None:
+                # The slot was granted just as the caller gave up
+                self._release(0.0, False, record=False)
+            # A waiter displaced just before it gave up holds no slot and was
+            # already taken off the queue
+            raise
+
+    def _displace(self, priority: Priority) -> bool:
+        """Reject the lowest-priority waiter to make room for a more urgent call."""
+        live = [entry for entry in self._waiters if not entry[2].done()]
+        if not live:
+            return False
+        victim = max(live, key=lambda entry: (entry[0], entry[1]))
+        if victim[0] <= priority:
+            return False
+        victim[2].set_exception(AdmissionRejected(self.retry_after()))
+        self._queued -= 1
+        metrics.increment(
+            "admission_shed_total", controller=self.name, priority=victim[0].name
+        )
+        return True
+
+    def _release(self, latency: float, rate_limited: bool, record: bool = True) -> None:
+        """Return a slot, adapt the limit and wake up waiters."""
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        if record:
+            self._completions.append(time.monotonic())
+            if rate_limited:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                logger.warning(f"Upstream rate limited, limit now {self.limit:.1f}")
+            elif latency > self.target_latency:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            elif saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            metrics.observe("admission_call_seconds", latency, controller=self.name)
+
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._queued -= 1
+            self.in_flight += 1
+            future.set_result(None)
+        self._publish()
+
+    def _publish(self) -> None:
+        """Expose the controller state as gauges."""
+        metrics.set_gauge("admission_limit", self.limit, controller=self.name)
+        metrics.set_gauge("admission_in_flight", self.in_flight, controller=self.name)
+        metrics.set_gauge("admission_queued", self._queued, controller=self.name)
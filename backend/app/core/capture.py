@@ -0,0 +1,179 @@
+import hashlib
+import json
+import random
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any
+
+from fastapi import Request, Response
+
+from .config import get_settings
+from .logging_config import setup_logging
+from .request_identity import client_id
+
+logger = setup_logging()
+settings = get_settings()
+
+# Body fields that are kept verbatim; every other string is replaced by its length
+KEPT_BODY_FIELDS = frozenset({"destination", "origin"})
+# Request headers that change how a request is served
+KEPT_HEADERS = (settings.ADMISSION_PRIORITY_HEADER, settings.QUERY_DEADLINE_HEADER)
+REDACTED_PREFIX = "<redacted:"
+
+# Model call durations of the current request, in seconds
+_model_times: ContextVar[list[float] | None] = ContextVar("model_times", default=None)
+# Model latencies a replayed request asks the fake model for, in seconds
+_replay_latencies: ContextVar[list[float] | None] = ContextVar(
+    "replay_latencies", default=None
+)
+
+
+def sanitize(value: Any, key: str | None = None) -> Any:
+    """Reduce a JSON request body to its shape.
+
+    Strings are replaced by ``<redacted:LENGTH>`` except in KEPT_BODY_FIELDS;
+    numbers, booleans and the structure of objects and lists are kept.
+
+    Args:
+        value (Any): Decoded JSON value
+        key (Optional[str]): Name of the field holding the value
+
+    Returns:
+        Any: The value with free text removed
+    """
+    if isinstance(value, dict):
+        return {k: sanitize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item, key) for item in value]
+    if isinstance(value, str) and key not in KEPT_BODY_FIELDS:
+        return f"{REDACTED_PREFIX}{len(value)}>"
+    return value
+
+
+def record_model_time(seconds: float) -> None:
+    """Add the duration of a model call to the capture of the current request."""
+    model_times = _model_times.get()
+    if model_times is not None:
+        model_times.append(seconds)
+
+
+def next_replay_latency() -> float:
+    """Return the recorded duration of the next model call of a replayed request.
+
+    Returns:
+        float: Seconds the fake model should take, 0 if none was recorded
+    """
+    latencies = _replay_latencies.get()
+    return latencies.pop(0) if latencies else 0.0
+
+
+def use_replay_latencies(request: Request) -> None:
+    """Take the model latencies to replay from the REPLAY_LATENCY_HEADER header."""
+    header = request.headers.get(settings.REPLAY_LATENCY_HEADER)
+    if not header:
+        return
+    try:
+        _replay_latencies.set([float(ms) / 1000 for ms in header.split(",")])
+    except ValueError:
+        logger.warning(f"Ignoring invalid {settings.REPLAY_LATENCY_HEADER}: {header}")
+
+
+class TrafficCapture:
+    """Append sanitized request shapes and timings to a capture log.
+
+    Each captured request becomes one compact JSON line with its arrival time
+    (``ts``), method (``m``), path (``p``), query string (``q``), a hash of the
+    client identity (``c``), the headers in KEPT_HEADERS (``h``), the sanitized
+    JSON body (``b``), the response status (``s``), the time to the response
+    headers in milliseconds (``d``) and the duration of each model call made
+    for it in milliseconds (``g``). Lines are written with a single append each,
+    so several worker processes can share one log. ``python -m app.cli.replay``
+    re-issues captured traffic.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, max_body_bytes: int = 0):
+        """Initialize the capture.
+
+        Args:
+            path (str): File the capture is appended to
+            sample_rate (float): Fraction of requests captured
+            max_body_bytes (int): Larger bodies are captured without their shape
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        self._file = None
+
+    @classmethod
+    def from_settings(cls) -> "TrafficCapture":
+        """Create a capture configured from the CAPTURE_* settings."""
+        return cls(
+            settings.CAPTURE_PATH,
+            settings.CAPTURE_SAMPLE_RATE,
+            settings.CAPTURE_MAX_BODY_BYTES,
+        )
+
+    def sampled(self) -> bool:
+        """Decide whether to capture the next request."""
+        return random.random() < self.sample_rate
+
+    async def record(self, request: Request, call_next: Callable) -> Response:
+        """Serve a request and append its capture record.
+
+        Args:
+            request (Request): The request to serve
+            call_next (Callable): The next handler in the middleware chain
+
+        Returns:
+            Response: The response of the next handler
+        """
+        arrived = time.time()
+        body = await self._body_shape(request)
+        model_times: list[float] = []
+        _model_times.set(model_times)
+        started = time.perf_counter()
+        response = await call_next(request)
+        duration = time.perf_counter() - started
+
+        client = hashlib.sha256(client_id(request).encode()).hexdigest()[:12]
+        record = {
+            "ts": round(arrived, 3),
+            "m": request.method,
+            "p": request.url.path,
+            "q": request.url.query,
+            "c": client,
+            "h": {h: request.headers[h] for h in KEPT_HEADERS if h in request.headers},
+            "b": body,
+            "s": response.status_code,
+            "d": round(duration * 1000, 1),
+            "g": [round(seconds * 1000, 1) for seconds in model_times],
+        }
+        self._write(json.dumps(record, separators=(",", ":")))
+        return response
+
+    async def _body_shape(self, request: Request) -> Any:
+        """Read and sanitize a JSON request body, None if there is none to keep."""
+        if request.method not in ("POST", "PUT", "PATCH"):
+            return None
+        if "json" not in request.headers.get("content-type", ""):
+            return None
+        try:
+            if int(request.headers.get("content-length", 0)) > self.max_body_bytes:
+                return None
+            return sanitize(json.loads(await request.body()))
+        except ValueError:
+            return None
+
+    def _write(self, line: str) -> None:
+        """Append a line, opening the log on first use in this process."""
+        try:
+            if self._file is None:
+                # Line buffering turns every record into a single append
+                self._file = open(self.path, "a", buffering=1, encoding="utf-8")
+            self._file.write(line + "\n")
+        except OSError as e:
+            logger.error(f"Failed to write traffic capture: {str(e)}")
+
+
+traffic_capture = TrafficCapture.from_settings()
@@ -18,6 +18,21 @@ class DatabaseType(str, Enum):
 class Settings(BaseSettings):
     # Gemini Configuration
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "your_gemini_api_key_here")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
+    GEMINI_BASE_URL: str = os.getenv(
+        "GEMINI_BASE_URL", "https://generativelanguage.googleapis.com"
+    )
+    GEMINI_CONNECT_TIMEOUT: float = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+    GEMINI_READ_TIMEOUT: float = float(os.getenv("GEMINI_READ_TIMEOUT", "120"))
+    GEMINI_MAX_CONNECTIONS: int = int(os.getenv("GEMINI_MAX_CONNECTIONS", "64"))
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "16")
+    )
+    GEMINI_KEEPALIVE_EXPIRY: float = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "120"))
+    GEMINI_WARMUP_CONNECTIONS: int = int(os.getenv("GEMINI_WARMUP_CONNECTIONS", "2"))
+    GEMINI_KEEP_WARM_INTERVAL: float = float(
+        os.getenv("GEMINI_KEEP_WARM_INTERVAL", "0")
+    )
 
     # Database Type
     DB_TYPE: DatabaseType = DatabaseType(os.getenv("DB_TYPE", "sqlite"))
@@ -38,18 +53,218 @@ class Settings(BaseSettings):
     POSTGRES_DATABASE: str = os.getenv("POSTGRES_DATABASE", "travel_queries")
     POSTGRES_SSL_MODE: str = os.getenv("POSTGRES_SSL_MODE", "prefer")
 
+    # Read Replica Configuration
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+    READ_YOUR_WRITES_COOKIE: str = os.getenv(
+        "READ_YOUR_WRITES_COOKIE", "read_primary_until"
+    )
+
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
 
+    # Production Server Configuration
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "0"))
+    SERVER_KEEPALIVE: int = int(os.getenv("SERVER_KEEPALIVE", "5"))
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "1000"))
+    SERVER_MAX_REQUESTS_JITTER: int = int(
+        os.getenv("SERVER_MAX_REQUESTS_JITTER", "100")
+    )
+    SERVER_TIMEOUT: int = int(os.getenv("SERVER_TIMEOUT", "150"))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+
     # CORS Configuration
     ALLOWED_ORIGINS: str = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
 
+    # Request Deadline Configuration
+    QUERY_DEADLINE_SECONDS: float = float(os.getenv("QUERY_DEADLINE_SECONDS", "30"))
+    QUERY_DEADLINE_MAX_SECONDS: float = float(
+        os.getenv("QUERY_DEADLINE_MAX_SECONDS", "120")
+    )
+    QUERY_DEADLINE_HEADER: str = os.getenv("QUERY_DEADLINE_HEADER", "X-Request-Timeout")
+
+    # Admission Control Configuration
+    ADMISSION_INITIAL_LIMIT: int = int(os.getenv("ADMISSION_INITIAL_LIMIT", "8"))
+    ADMISSION_MIN_LIMIT: int = int(os.getenv("ADMISSION_MIN_LIMIT", "1"))
+    ADMISSION_MAX_LIMIT: int = int(os.getenv("ADMISSION_MAX_LIMIT", "64"))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+    ADMISSION_TARGET_LATENCY: float = float(os.getenv("ADMISSION_TARGET_LATENCY", "10"))
+    ADMISSION_BACKOFF: float = float(os.getenv("ADMISSION_BACKOFF", "0.5"))
+    ADMISSION_PRIORITY_HEADER: str = os.getenv(
+        "ADMISSION_PRIORITY_HEADER", "X-Request-Priority"
+    )
+
+    # Token Budget Configuration
+    TOKEN_BUDGET_PER_WINDOW: int = int(os.getenv("TOKEN_BUDGET_PER_WINDOW", "0"))
+    TOKEN_BUDGET_WINDOW_SECONDS: int = int(
+        os.getenv("TOKEN_BUDGET_WINDOW_SECONDS", "3600")
+    )
+    TOKEN_BUDGET_BUCKETS: int = int(os.getenv("TOKEN_BUDGET_BUCKETS", "60"))
+    TOKEN_BUDGET_OVERRIDES: str = os.getenv("TOKEN_BUDGET_OVERRIDES", "")
+    TOKEN_CLIENT_HEADER: str = os.getenv("TOKEN_CLIENT_HEADER", "X-API-Key")
+    TOKEN_CLIENT_KEYS: str = os.getenv("TOKEN_CLIENT_KEYS", "")
+    TOKEN_CHARS_PER_TOKEN: float = float(os.getenv("TOKEN_CHARS_PER_TOKEN", "4"))
+    GEMINI_MAX_OUTPUT_TOKENS: int = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "1024"))
+
+    # Idempotency Configuration
+    IDEMPOTENCY_HEADER: str = os.getenv("IDEMPOTENCY_HEADER", "Idempotency-Key")
+    IDEMPOTENCY_TTL_SECONDS: float = float(
+        os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")
+    )
+
+    # Itinerary Configuration
+    ITINERARY_MAX_OUTPUT_TOKENS: int = int(
+        os.getenv("ITINERARY_MAX_OUTPUT_TOKENS", "2048")
+    )
+    ITINERARY_TOKENS_PER_DESTINATION: int = int(
+        os.getenv("ITINERARY_TOKENS_PER_DESTINATION", "512")
+    )
+
+    # Similar Query Reuse Configuration
+    SIMILARITY_ENABLED: bool = (
+        os.getenv("SIMILARITY_ENABLED", "false").lower() == "true"
+    )
+    SIMILARITY_THRESHOLD: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
+    SIMILARITY_MAX_AGE_HOURS: float = float(os.getenv("SIMILARITY_MAX_AGE_HOURS", "24"))
+    SIMILARITY_DIMENSIONS: int = int(os.getenv("SIMILARITY_DIMENSIONS", "4096"))
+    SIMILARITY_MAX_PER_PARTITION: int = int(
+        os.getenv("SIMILARITY_MAX_PER_PARTITION", "500")
+    )
+    SIMILARITY_INDEX_PATH: str = os.getenv(
+        "SIMILARITY_INDEX_PATH", "similarity_index.npz"
+    )
+    SIMILARITY_SAVE_INTERVAL: int = int(os.getenv("SIMILARITY_SAVE_INTERVAL", "300"))
+
+    # Field Freshness Configuration
+    FIELD_TTL_HOURS: str = os.getenv(
+        "FIELD_TTL_HOURS",
+        "advisories=72,estimatedProcessingTime=168,visaRequirements=720,"
+        "documents=720,embassyInformation=2160",
+    )
+    FIELD_REFRESH_TOKENS_PER_FIELD: int = int(
+        os.getenv("FIELD_REFRESH_TOKENS_PER_FIELD", "256")
+    )
+
+    # Follow-up Configuration
+    FOLLOWUP_MAX_SESSIONS: int = int(os.getenv("FOLLOWUP_MAX_SESSIONS", "1000"))
+    FOLLOWUP_SESSION_TTL_SECONDS: float = float(
+        os.getenv("FOLLOWUP_SESSION_TTL_SECONDS", "1800")
+    )
+    FOLLOWUP_MAX_TURNS: int = int(os.getenv("FOLLOWUP_MAX_TURNS", "5"))
+    FOLLOWUP_MAX_OUTPUT_TOKENS: int = int(
+        os.getenv("FOLLOWUP_MAX_OUTPUT_TOKENS", "512")
+    )
+
+    # Visa Rules Configuration
+    VISA_RULES_ENABLED: bool = (
+        os.getenv("VISA_RULES_ENABLED", "false").lower() == "true"
+    )
+    VISA_RULES_PATH: str = os.getenv("VISA_RULES_PATH", "")
+    VISA_RULES_RELOAD_INTERVAL: float = float(
+        os.getenv("VISA_RULES_RELOAD_INTERVAL", "30")
+    )
+
+    # Export Configuration
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    EXPORT_CHUNK_BYTES: int = int(os.getenv("EXPORT_CHUNK_BYTES", "65536"))
+
+    # Traffic Capture Configuration
+    CAPTURE_ENABLED: bool = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+    CAPTURE_PATH: str = os.getenv("CAPTURE_PATH", "traffic_capture.ndjson")
+    CAPTURE_SAMPLE_RATE: float = float(os.getenv("CAPTURE_SAMPLE_RATE", "1.0"))
+    CAPTURE_MAX_BODY_BYTES: int = int(os.getenv("CAPTURE_MAX_BODY_BYTES", "65536"))
+    REPLAY_FAKE_MODEL: bool = os.getenv("REPLAY_FAKE_MODEL", "false").lower() == "true"
+    REPLAY_LATENCY_HEADER: str = os.getenv(
+        "REPLAY_LATENCY_HEADER", "X-Replay-Model-Latency"
+    )
+
+    # Admin Configuration
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    ADMIN_HEADER: str = os.getenv("ADMIN_HEADER", "X-Admin-Token")
+
+    # Profiling Configuration
+    PROFILING_ADMIN_TOKEN: str = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    PROFILING_HEADER: str = os.getenv("PROFILING_HEADER", "X-Profile-Token")
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_INTERVAL: float = float(os.getenv("PROFILING_INTERVAL", "0.001"))
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "profiles")
+
+    # Write-behind Persistence Configuration
+    WRITE_BEHIND_ENABLED: bool = (
+        os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+    )
+    WRITE_BEHIND_QUEUE_SIZE: int = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "1000"))
+    WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+    WRITE_BEHIND_FLUSH_INTERVAL: float = float(
+        os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.05")
+    )
+    WRITE_BEHIND_ENQUEUE_TIMEOUT: float = float(
+        os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT", "0.5")
+    )
+    WRITE_BEHIND_DRAIN_TIMEOUT: float = float(
+        os.getenv("WRITE_BEHIND_DRAIN_TIMEOUT", "10")
+    )
+    WRITE_BEHIND_WAIT_TIMEOUT: float = float(
+        os.getenv("WRITE_BEHIND_WAIT_TIMEOUT", "2")
+    )
+    WRITE_BEHIND_SPOOL_DIR: str = os.getenv("WRITE_BEHIND_SPOOL_DIR", "write_behind")
+    WRITE_BEHIND_FSYNC: bool = (
+        os.getenv("WRITE_BEHIND_FSYNC", "false").lower() == "true"
+    )
+    WRITE_BEHIND_ID_BLOCK_SIZE: int = int(
+        os.getenv("WRITE_BEHIND_ID_BLOCK_SIZE", "100")
+    )
+
+    # Retention Configuration
+    RETENTION_ENABLED: bool = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+    RETENTION_MAX_AGE_DAYS: int = int(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+    RETENTION_MAX_ROWS: int = int(os.getenv("RETENTION_MAX_ROWS", "0"))
+    RETENTION_CHUNK_SIZE: int = int(os.getenv("RETENTION_CHUNK_SIZE", "500"))
+    RETENTION_CHUNK_PAUSE: float = float(os.getenv("RETENTION_CHUNK_PAUSE", "0.1"))
+    RETENTION_INTERVAL_SECONDS: int = int(
+        os.getenv("RETENTION_INTERVAL_SECONDS", "3600")
+    )
+    RETENTION_ARCHIVE: bool = os.getenv("RETENTION_ARCHIVE", "true").lower() == "true"
+    RETENTION_ARCHIVE_DIR: str = os.getenv("RETENTION_ARCHIVE_DIR", "archive")
+
+    # Partitioning Configuration
+    PARTITIONING_ENABLED: bool = (
+        os.getenv("PARTITIONING_ENABLED", "false").lower() == "true"
+    )
+    PARTITION_PREMAKE_MONTHS: int = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+    PARTITION_INTERVAL_SECONDS: int = int(
+        os.getenv("PARTITION_INTERVAL_SECONDS", "21600")
+    )
+
     @property
     def allowed_origins_list(self) -> list[str]:
         """Convert ALLOWED_ORIGINS string to list."""
         return self.ALLOWED_ORIGINS.split(",")
 
+    @property
+    def worker_count(self) -> int:
+        """Number of server workers, one per available CPU unless WEB_CONCURRENCY is set."""
+        if self.WEB_CONCURRENCY > 0:
+            return self.WEB_CONCURRENCY
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except AttributeError:
+            return os.cpu_count() or 1
+
+    @property
+    def replica_urls_list(self) -> list[str]:
+        """Convert DATABASE_REPLICA_URLS string to list."""
+        return [
+            url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()
+        ]
+
+    @property
+    def client_keys_list(self) -> list[str]:
+        """Convert TOKEN_CLIENT_KEYS string to list."""
+        return [key.strip() for key in self.TOKEN_CLIENT_KEYS.split(",") if key.strip()]
+
     @property
     def DATABASE_URL(self) -> str:
         if self.DB_TYPE == DatabaseType.SQLITE:
@@ -1,9 +1,15 @@
+import itertools
+import time
+
+from fastapi import Request, Response
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from .config import get_settings
 from .logging_config import setup_logging
+from .metrics import metrics
+from .request_identity import client_id
 
 logger = setup_logging()
 settings = get_settings()
@@ -12,6 +18,20 @@ logger.info(f"Creating database engine with URL: {settings.DATABASE_URL}")
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engines = []
+for replica_url in settings.replica_urls_list:
+    logger.info(f"Creating read replica engine with URL: {replica_url}")
+    replica_engines.append(create_engine(replica_url, pool_pre_ping=True))
+ReplicaSessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    for replica_engine in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessions)
+
+# Clients that wrote recently, mapped to the time until which they read from the
+# primary. The cookie set by mark_write covers requests served by other workers.
+_recent_writers: dict[str, float] = {}
+
 Base = declarative_base()
 
 
@@ -27,3 +47,82 @@ def get_db():
     finally:
         logger.debug("Closing database session")
         db.close()
+
+
+def mark_write(request: Request, response: Response) -> None:
+    """Route the client's reads to the primary for READ_YOUR_WRITES_SECONDS.
+
+    Call this after a request changed data, so that the client sees its own
+    change even while the replicas are lagging behind.
+
+    Args:
+        request (Request): FastAPI request that changed data
+        response (Response): Response the read-your-writes cookie is set on
+    """
+    if not ReplicaSessions:
+        return
+    now = time.time()
+    until = now + settings.READ_YOUR_WRITES_SECONDS
+    if len(_recent_writers) > 10000:
+        for client, expires in list(_recent_writers.items()):
+            if expires <= now:
+                del _recent_writers[client]
+    _recent_writers[client_id(request)] = until
+    response.set_cookie(
+        settings.READ_YOUR_WRITES_COOKIE,
+        f"{until:.3f}",
+        max_age=int(settings.READ_YOUR_WRITES_SECONDS) + 1,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _wrote_recently(request: Request) -> bool:
+    """Check whether the client changed data within the read-your-writes window."""
+    now = time.time()
+    if _recent_writers.get(client_id(request), 0) > now:
+        return True
+    try:
+        return float(request.cookies.get(settings.READ_YOUR_WRITES_COOKIE, 0)) > now
+    except ValueError:
+        return False
+
+
+def read_session_factory(request: Request) -> sessionmaker:
+    """Pick the session factory for read-only work on behalf of a request.
+
+    Replicas are used in turn when DATABASE_REPLICA_URLS is set, except for
+    clients that wrote within the read-your-writes window, which read from the
+    primary.
+
+    Args:
+        request (Request): FastAPI request the reads are made for
+
+    Returns:
+        sessionmaker: Factory for sessions on a replica or on the primary
+    """
+    if ReplicaSessions and not _wrote_recently(request):
+        session_factory, target = next(_replica_cycle), "replica"
+    else:
+        session_factory, target = SessionLocal, "primary"
+    metrics.increment("db_read_sessions_total", target=target)
+    logger.debug(f"Reading from {target}")
+    return session_factory
+
+
+def get_read_db(request: Request):
+    """Get a database session for read-only work.
+
+    Sessions come from read_session_factory, so from the read replicas unless
+    the client wrote recently.
+    """
+    db = read_session_factory(request)()
+    try:
+        logger.debug("Read session created")
+        yield db
+    except Exception as e:
+        logger.error(f"Database error: {str(e)}", exc_info=True)
+        raise
+    finally:
+        logger.debug("Closing read session")
+        db.close()
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections.abc import Coroutine
+from typing import Any
+
+from fastapi import Request
+
+from .config import get_settings
+from .logging_config import setup_logging
+from .metrics import metrics
+
+logger = setup_logging()
+settings = get_settings()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work for a request does not finish before its deadline."""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away while work for its request is running."""
+
+
+def request_timeout(request: Request) -> float:
+    """Return the time budget in seconds for a request.
+
+    Clients can lower or raise the default QUERY_DEADLINE_SECONDS through the
+    QUERY_DEADLINE_HEADER header, up to QUERY_DEADLINE_MAX_SECONDS.
+
+    Args:
+        request (Request): FastAPI request object
+
+    Returns:
+        float: Time budget in seconds
+    """
+    header = request.headers.get(settings.QUERY_DEADLINE_HEADER)
+    if header:
+        try:
+            timeout = float(header)
+            if timeout > 0:
+                return min(timeout, settings.QUERY_DEADLINE_MAX_SECONDS)
+        except ValueError:
+            pass
+        logger.warning(f"Ignoring invalid {settings.QUERY_DEADLINE_HEADER}: {header}")
+    return settings.QUERY_DEADLINE_SECONDS
+
+
+def request_deadline(request: Request) -> float:
+    """Return the moment by which all work for a request must be done.
+
+    Taken once when the request is handled, so that steps run one after another
+    (e.g. waiting for an idempotency key, then generating) share one budget.
+
+    Args:
+        request (Request): FastAPI request object
+
+    Returns:
+        float: Deadline on the ``time.monotonic`` clock
+    """
+    return time.monotonic() + request_timeout(request)
+
+
+def time_left(deadline: float) -> float:
+    """Return the seconds left before a deadline from :func:`request_deadline`."""
+    return max(0.0, deadline - time.monotonic())
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """Return once the client has closed the connection."""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_with_deadline(
+    request: Request, coro: Coroutine[Any, Any, Any], timeout: float
+) -> Any:
+    """Run a coroutine, cancelling it on deadline or client disconnect.
+
+    The request body must already have been read, so that the only message left
+    to receive from the client is ``http.disconnect``.
+
+    Args:
+        request (Request): FastAPI request the work belongs to
+        coro (Coroutine): The work to run
+        timeout (float): Time budget in seconds
+
+    Returns:
+        Any: Result of the coroutine
+
+    Raises:
+        DeadlineExceeded: If the coroutine does not finish within the timeout
+        ClientDisconnected: If the client disconnects before it finishes
+    """
+    task = asyncio.create_task(coro)
+    disconnect = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {task, disconnect}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        if task in done:
+            return task.result()
+        if disconnect in done:
+            metrics.increment("generation_cancelled_total", reason="disconnect")
+            logger.info("Client disconnected, cancelling generation")
+            raise ClientDisconnected("Client closed the connection")
+        metrics.increment("generation_cancelled_total", reason="deadline")
+        logger.warning(f"Deadline of {timeout:.1f}s exceeded, cancelling generation")
+        raise DeadlineExceeded(f"Request exceeded its {timeout:.1f}s deadline")
+    finally:
+        for pending in (task, disconnect):
+            if not pending.done():
+                pending.cancel()
+        await asyncio.gather(task, disconnect, return_exceptions=True)
@@ -0,0 +1,111 @@
+import threading
+from collections import defaultdict
+from typing import Any
+
+from .logging_config import setup_logging
+
+logger = setup_logging()
+
+
+def _label_key(labels: dict[str, Any]) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """In-process registry of counters, gauges and summaries.
+
+    Metrics are identified by name plus an optional set of labels, e.g.
+    ``metrics.increment("generation_cancelled_total", reason="deadline")``.
+    The registry is per process; each worker reports its own values.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = defaultdict(dict)
+        self._gauges: dict[str, dict[tuple, float]] = defaultdict(dict)
+        self._summaries: dict[str, dict[tuple, list[float]]] = defaultdict(dict)
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Add to a counter.
+
+        Args:
+            name (str): Metric name
+            value (float): Amount to add. Defaults to 1.
+            **labels: Label values identifying the series
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to the current value.
+
+        Args:
+            name (str): Metric name
+            value (float): Current value
+            **labels: Label values identifying the series
+        """
+        with self._lock:
+            self._gauges[name][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record an observation, e.g. a latency, in a summary.
+
+        Args:
+            name (str): Metric name
+            value (float): Observed value
+            **labels: Label values identifying the series
+        """
+        key = _label_key(labels)
+        with self._lock:
+            summary = self._summaries[name].setdefault(key, [0, 0.0, value, value])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = min(summary[2], value)
+            summary[3] = max(summary[3], value)
+
+    def get(self, name: str, **labels: Any) -> float:
+        """Return the current value of a counter or gauge, 0 if unset."""
+        key = _label_key(labels)
+        with self._lock:
+            if key in self._counters.get(name, {}):
+                return self._counters[name][key]
+            return self._gauges.get(name, {}).get(key, 0)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as a JSON-serializable dictionary."""
+
+        def series(values: dict[tuple, Any], render) -> list[dict[str, Any]]:
+            return [
+                {"labels": dict(key), **render(value)} for key, value in values.items()
+            ]
+
+        with self._lock:
+            return {
+                "counters": {
+                    name: series(values, lambda v: {"value": v})
+                    for name, values in self._counters.items()
+                },
+                "gauges": {
+                    name: series(values, lambda v: {"value": v})
+                    for name, values in self._gauges.items()
+                },
+                "summaries": {
+                    name: series(
+                        values,
+                        lambda v: {
+                            "count": v[0],
+                            "sum": v[1],
+                            "avg": v[1] / v[0],
+                            "min": v[2],
+                            "max": v[3],
+                        },
+                    )
+                    for name, values in self._summaries.items()
+                },
+            }
+
+
+metrics = MetricsRegistry()
@@ -4,9 +4,13 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from .capture import traffic_capture, use_replay_latencies
+from .config import get_settings
 from .logging_config import setup_logging
+from .profiling import request_profiler
 
 logger = setup_logging()
+settings = get_settings()
 
 
 def setup_cors(app: FastAPI, allowed_origins: list[str]) -> None:
@@ -22,10 +26,25 @@ def setup_cors(app: FastAPI, allowed_origins: list[str]) -> None:
 
 
 async def request_validation_middleware(request: Request, call_next: Callable):
-    """Middleware for request validation and logging."""
+    """Middleware for request validation and logging.
+
+    Profiles requests asked for by an admin or sampled by PROFILING_SAMPLE_RATE,
+    captures a sample of the traffic when CAPTURE_ENABLED is set, and hands the
+    model latencies of replayed requests to the fake model when REPLAY_FAKE_MODEL
+    is set.
+    """
     try:
         logger.debug(f"Received request: {request.method} {request.url}")
-        response = await call_next(request)
+        if settings.REPLAY_FAKE_MODEL:
+            use_replay_latencies(request)
+        profile, requested = request_profiler.wanted(request)
+        if profile:
+            # Profiled requests are left out of captures, their timings are skewed
+            response = await request_profiler.profile(request, call_next, requested)
+        elif settings.CAPTURE_ENABLED and traffic_capture.sampled():
+            response = await traffic_capture.record(request, call_next)
+        else:
+            response = await call_next(request)
         logger.debug(
             f"Request completed: {request.method} {request.url} - Status: {response.status_code}"
         )
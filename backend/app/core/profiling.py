@@ -0,0 +1,191 @@
+import asyncio
+import hmac
+import json
+import random
+import re
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from pathlib import Path
+
+from fastapi import Request, Response
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import get_settings
+from .logging_config import setup_logging
+from .metrics import metrics
+
+logger = setup_logging()
+settings = get_settings()
+
+# SQL statements of the request being profiled, as (statement, seconds)
+_sql_timings: ContextVar[list[tuple[str, float]] | None] = ContextVar(
+    "sql_timings", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql_timings.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _sql_timings.get()
+    if timings is not None and conn.info.get("profile_started"):
+        started = conn.info["profile_started"].pop()
+        timings.append((statement, time.perf_counter() - started))
+
+
+class RequestProfiler:
+    """Run single requests under a sampling profiler and save speedscope files.
+
+    A request is profiled when it carries PROFILING_HEADER with the value of
+    PROFILING_ADMIN_TOKEN, and a PROFILING_SAMPLE_RATE fraction of all requests
+    is profiled continuously. Profiles are written to PROFILING_DIR in the
+    speedscope format (https://www.speedscope.app), with the SQL statements run
+    for the request and their durations as a second profile. Admin requests get
+    the file name in the X-Profile-File response header.
+
+    Nothing is installed when both triggers are off, so requests pay no cost.
+    Only one request per worker is profiled at a time.
+    """
+
+    def __init__(
+        self,
+        admin_token: str,
+        sample_rate: float,
+        interval: float,
+        directory: str,
+    ):
+        """Initialize the profiler.
+
+        Args:
+            admin_token (str): Token that enables profiling of a request, empty to
+                disable on-demand profiling
+            sample_rate (float): Fraction of requests profiled without asking
+            interval (float): Seconds between stack samples
+            directory (str): Directory the profiles are written to
+        """
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = Path(directory)
+        self.enabled = bool(admin_token) or sample_rate > 0
+        self._active = False
+        if self.enabled:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @classmethod
+    def from_settings(cls) -> "RequestProfiler":
+        """Create a profiler configured from the PROFILING_* settings."""
+        return cls(
+            settings.PROFILING_ADMIN_TOKEN,
+            settings.PROFILING_SAMPLE_RATE,
+            settings.PROFILING_INTERVAL,
+            settings.PROFILING_DIR,
+        )
+
+    def requested(self, request: Request) -> bool:
+        """Check whether the request carries a valid admin profiling token."""
+        token = request.headers.get(settings.PROFILING_HEADER)
+        return bool(
+            token
+            and self.admin_token
+            and hmac.compare_digest(token.encode(), self.admin_token.encode())
+        )
+
+    def wanted(self, request: Request) -> tuple[bool, bool]:
+        """Decide whether to profile a request.
+
+        Returns:
+            Tuple[bool, bool]: Whether to profile it, and whether an admin asked
+        """
+        if not self.enabled:
+            return False, False
+        if self.requested(request):
+            return True, True
+        return random.random() < self.sample_rate, False
+
+    async def profile(
+        self, request: Request, call_next: Callable, requested: bool
+    ) -> Response:
+        """Serve a request under the profiler and save its profile.
+
+        Args:
+            request (Request): The request to serve
+            call_next (Callable): The next handler in the middleware chain
+            requested (bool): Whether an admin asked for the profile
+
+        Returns:
+            Response: The response of the next handler
+        """
+        if self._active:
+            logger.info("Another request is being profiled, serving without profile")
+            return await call_next(request)
+
+        self._active = True
+        timings: list[tuple[str, float]] = []
+        _sql_timings.set(timings)
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        try:
+            profiler.start()
+            try:
+                response = await call_next(request)
+            finally:
+                profiler.stop()
+        finally:
+            self._active = False
+            _sql_timings.set(None)
+
+        name = self._file_name(request)
+        speedscope = profiler.output(SpeedscopeRenderer())
+        await asyncio.to_thread(self._write, name, speedscope, timings)
+        metrics.increment("profiles_total", trigger="admin" if requested else "sample")
+        sql_seconds = sum(seconds for _, seconds in timings)
+        logger.info(
+            f"Profiled {request.method} {request.url.path}: {name}, "
+            f"{len(timings)} SQL statements in {sql_seconds * 1000:.1f}ms"
+        )
+        if requested:
+            response.headers["X-Profile-File"] = name
+        return response
+
+    def _file_name(self, request: Request) -> str:
+        path = re.sub(r"[^A-Za-z0-9]+", "-", request.url.path).strip("-") or "root"
+        return (
+            f"{datetime.now(UTC):%Y%m%dT%H%M%S%f}-{request.method.lower()}-{path}"
+            ".speedscope.json"
+        )
+
+    def _write(
+        self, name: str, speedscope: str, timings: list[tuple[str, float]]
+    ) -> None:
+        """Write a speedscope file with the SQL statements added as a profile."""
+        document = json.loads(speedscope)
+        frames = document["shared"]["frames"]
+        samples, weights = [], []
+        for statement, seconds in timings:
+            frames.append({"name": " ".join(statement.split())[:300]})
+            samples.append([len(frames) - 1])
+            weights.append(seconds)
+        document["profiles"].append(
+            {
+                "type": "sampled",
+                "name": "SQL statements",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / name).write_text(json.dumps(document), encoding="utf-8")
+
+
+request_profiler = RequestProfiler.from_settings()
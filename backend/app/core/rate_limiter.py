@@ -25,6 +25,10 @@ class RateLimiter:
             f"Rate limiter initialized with {max_requests} requests per {time_window} seconds"
         )
 
+    def reset(self) -> None:
+        """Forget all recorded requests, e.g. in a freshly forked worker."""
+        self.requests.clear()
+
     def _get_client_id(self, request: Request) -> str:
         """Get client identifier from request.
 
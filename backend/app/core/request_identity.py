@@ -0,0 +1,39 @@
+import hashlib
+
+from fastapi import Request
+
+from .config import get_settings
+
+settings = get_settings()
+
+
+def _key_hash(api_key: str) -> str:
+    """Short hash identifying an API key without revealing it."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+# Hashes of the API keys clients are accounted by. Any other header value is
+# ignored, since a caller could otherwise send a fresh value with every request.
+_known_keys = frozenset(_key_hash(key) for key in settings.client_keys_list)
+
+
+def client_id(request: Request) -> str:
+    """Identify the client a request is accounted to.
+
+    Requests carrying one of the TOKEN_CLIENT_KEYS in TOKEN_CLIENT_HEADER are
+    accounted to that key, under a short hash so that keys never show up in
+    usage reports or metrics. Other requests, including those with an unknown
+    key, are accounted to the client address.
+
+    Args:
+        request (Request): FastAPI request object
+
+    Returns:
+        str: Client identifier such as ``key:3f2a9c1b0d4e`` or ``ip:10.0.0.7``
+    """
+    api_key = request.headers.get(settings.TOKEN_CLIENT_HEADER)
+    if api_key:
+        key_hash = _key_hash(api_key)
+        if key_hash in _known_keys:
+            return "key:" + key_hash
+    return "ip:" + (request.client.host if request.client else "unknown")
@@ -1,23 +1,96 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
-from app.api.v1.endpoints import travel
+from app.api.v1.endpoints import metrics, stats, travel, usage
 from app.core.config import get_settings
-from app.core.database import Base, engine
+from app.core.database import Base, SessionLocal, engine, replica_engines
 from app.core.logging_config import setup_logging
 from app.core.middleware import request_validation_middleware, setup_cors
+from app.services.partition_service import run_partition_job
+from app.services.retention_service import run_retention_job
+from app.services.schema_service import upgrade_schema
 
 # Configure logging
 logger = setup_logging()
 settings = get_settings()
 
-# Create database tables
+# Create database tables, and add columns missing from tables created earlier
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+
+def reset_after_fork() -> None:
+    """Reset per-process state inherited from a preloading server master.
+
+    Database connections opened while the app was imported, the Gemini client
+    and the rate limiter counters must not be shared between worker processes.
+    """
+    engine.dispose(close=False)
+    for replica_engine in replica_engines:
+        replica_engine.dispose(close=False)
+    travel.gemini_service.reset_client()
+    travel.query_rate_limiter.reset()
+    travel.history_rate_limiter.reset()
+    stats.stats_rate_limiter.reset()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the application."""
+    await travel.gemini_service.warm_up()
+    keep_warm_job = None
+    if settings.GEMINI_KEEP_WARM_INTERVAL > 0:
+        keep_warm_job = asyncio.create_task(travel.gemini_service.keep_warm())
+    if settings.WRITE_BEHIND_ENABLED:
+        await travel.write_behind_service.start()
+    # Queries purged by the background jobs are removed from the similarity index
+    on_removed = on_dropped = None
+    if settings.SIMILARITY_ENABLED:
+        on_removed = travel.similarity_service.remove
+        on_dropped = travel.similarity_service.remove_created_before
+    partition_job = None
+    if settings.PARTITIONING_ENABLED:
+        partition_job = asyncio.create_task(run_partition_job(engine, on_dropped))
+    retention_job = None
+    if settings.RETENTION_ENABLED:
+        retention_job = asyncio.create_task(run_retention_job(SessionLocal, on_removed))
+    similarity_save_job = None
+    if settings.SIMILARITY_ENABLED:
+        await asyncio.to_thread(travel.similarity_service.load_or_rebuild, SessionLocal)
+        similarity_save_job = asyncio.create_task(
+            travel.similarity_service.run_save_job()
+        )
+    visa_rules_job = None
+    if settings.VISA_RULES_ENABLED:
+        await asyncio.to_thread(travel.visa_rules_service.load)
+        if settings.VISA_RULES_RELOAD_INTERVAL > 0:
+            visa_rules_job = asyncio.create_task(
+                travel.visa_rules_service.run_reload_job()
+            )
+    yield
+    if visa_rules_job is not None:
+        visa_rules_job.cancel()
+    if partition_job is not None:
+        partition_job.cancel()
+    if retention_job is not None:
+        retention_job.cancel()
+    if similarity_save_job is not None:
+        similarity_save_job.cancel()
+        travel.similarity_service.save()
+    await travel.write_behind_service.stop()
+    if keep_warm_job is not None:
+        keep_warm_job.cancel()
+    await travel.gemini_service.aclose()
+
 
 app = FastAPI(
     title="Travel Query API",
     description="API for getting travel-related information using AI",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Setup middleware
@@ -26,6 +99,9 @@ app.middleware("http")(request_validation_middleware)
 
 # Include routers
 app.include_router(travel.router, prefix="/api/v1", tags=["travel"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
+app.include_router(usage.router, prefix="/api/v1", tags=["usage"])
+app.include_router(stats.router, prefix="/api/v1", tags=["stats"])
 
 
 @app.get("/")
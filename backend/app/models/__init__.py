@@ -4,8 +4,20 @@ Data models package for the Travel Query application
 
 # This file is intentionally empty to make the directory a Python package
 
+from .corridor_stat import CorridorStat
+from .id_allocation import IdAllocation
+from .idempotency_key import IdempotencyKey
 from .query_history import QueryHistory
+from .token_usage import TokenUsage
 from .travel_query import TravelQuery
 from .travel_response import TravelResponse
 
-__all__ = ["TravelQuery", "QueryHistory", "TravelResponse"]
+__all__ = [
+    "TravelQuery",
+    "QueryHistory",
+    "TravelResponse",
+    "IdAllocation",
+    "CorridorStat",
+    "IdempotencyKey",
+    "TokenUsage",
+]
@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, Column, Date, Integer, String
+
+from app.core.database import Base
+
+
+class CorridorStat(Base):
+    """Database model for daily query counts per travel corridor.
+
+    A rollup of travel_queries, kept up to date on every insert and delete so
+    that statistics never scan the queries themselves. Queries without an origin
+    are counted under an empty origin.
+
+    Attributes:
+        day (Date): UTC day the queries were created on
+        origin (str): The origin country, empty if none was given
+        destination (str): The destination country
+        queries (int): Number of queries
+        generated (int): Number of queries with a recorded generation latency
+        generation_ms_total (int): Sum of their generation latencies in milliseconds
+    """
+
+    __tablename__ = "corridor_stats"
+
+    day = Column(Date, primary_key=True)
+    origin = Column(String, primary_key=True)
+    destination = Column(String, primary_key=True)
+    queries = Column(Integer, nullable=False, default=0)
+    generated = Column(Integer, nullable=False, default=0)
+    generation_ms_total = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String
+
+from app.core.database import Base
+
+
+class IdAllocation(Base):
+    """Database model for reserving blocks of primary keys ahead of insertion.
+
+    Each row tracks the next free ID for a table. Workers reserve a whole block
+    of IDs in one update so that records can be given their final ID before
+    they are written to the database.
+
+    Attributes:
+        name (str): Name of the table the IDs are reserved for
+        next_value (int): First ID that has not been handed out yet
+    """
+
+    __tablename__ = "id_allocations"
+
+    name = Column(String(64), primary_key=True)
+    next_value = Column(Integer, nullable=False)
@@ -0,0 +1,27 @@
+from sqlalchemy import JSON, Column, DateTime, String
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """Database model for requests sent with an idempotency key.
+
+    The row is inserted when a request claims its key, so a second request with
+    the same key fails to insert it, whichever worker it reaches. It holds the
+    result once the request completed.
+
+    Attributes:
+        key (str): SHA-256 of the client and the idempotency key
+        fingerprint (str): Fingerprint of the request body
+        result (JSON): Result to replay, None while the request is running
+        created_at (DateTime): When the key was claimed
+        completed_at (DateTime): When the result was stored, None while running
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True, index=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Index, Integer, String
+
+from app.core.database import Base
+
+
+class TokenUsage(Base):
+    """Database model for the model tokens of one call, shared by all workers.
+
+    The row is inserted when tokens are reserved for the call, and holds the
+    actual usage once the call is done.
+
+    Attributes:
+        id (int): Unique identifier of the call
+        client (str): Client the call is accounted to
+        slot (int): Time slot of the token budget window the call fell in
+        prompt_tokens (int): Prompt tokens used, 0 while the call runs
+        completion_tokens (int): Completion tokens used, 0 while the call runs
+        reserved_tokens (int): Tokens set aside while the call runs, then 0
+        calls (int): 1 once the call is done, 0 while it runs
+    """
+
+    __tablename__ = "token_usage"
+    __table_args__ = (Index("ix_token_usage_client_slot", "client", "slot"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    client = Column(String(64), nullable=False)
+    slot = Column(Integer, nullable=False, index=True)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    reserved_tokens = Column(Integer, nullable=False, default=0)
+    calls = Column(Integer, nullable=False, default=0)
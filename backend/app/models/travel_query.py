@@ -18,6 +18,9 @@ class TravelQuery(Base):
         origin (str): The origin country (optional)
         response (JSON): AI-generated response containing travel information
         created_at (DateTime): Timestamp of when the query was created
+        generation_ms (int): Milliseconds the model took to generate the answer,
+            None for answers that were reused rather than generated. Answers
+            generated together for an itinerary share the call's time equally.
     """
 
     __tablename__ = "travel_queries"
@@ -27,7 +30,8 @@ class TravelQuery(Base):
     destination = Column(String, nullable=False)
     origin = Column(String, nullable=True)
     response = Column(JSON, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    generation_ms = Column(Integer, nullable=True)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
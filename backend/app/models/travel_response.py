@@ -16,6 +16,11 @@ class TravelResponse(BaseModel):
         estimatedProcessingTime (str): Estimated time for processing
         embassyInformation (str): Embassy contact information
         timestamp (str): Response timestamp
+        fieldTimestamps (Optional[Dict[str, str]]): When each generated field was
+            last generated, as ISO timestamps
+        source (str): How the answer was first produced, "model" or "rules"
+        rulesVersion (Optional[str]): Version of the visa rules dataset a
+            "rules" answer came from
     """
 
     destination: str
@@ -26,3 +31,6 @@ class TravelResponse(BaseModel):
     estimatedProcessingTime: str
     embassyInformation: str
     timestamp: str
+    fieldTimestamps: dict[str, str] | None = None
+    source: str = "model"
+    rulesVersion: str | None = None
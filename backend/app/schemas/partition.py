@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+
+
+class PartitionReport(BaseModel):
+    """Schema describing the monthly partitions of the travel queries table.
+
+    Attributes:
+        partitioned (bool): Whether travel_queries is split into monthly partitions
+        partitions (List[str]): Monthly partitions after the run, oldest first
+        created (List[str]): Partitions created by the run
+        dropped (List[str]): Expired partitions dropped by the run
+        dropped_rows (int): Queries removed with the dropped partitions
+        migrated_rows (int): Queries moved into partitions by a migration
+        archive_path (Optional[str]): File the dropped queries were archived to
+    """
+
+    partitioned: bool
+    partitions: list[str] = []
+    created: list[str] = []
+    dropped: list[str] = []
+    dropped_rows: int = 0
+    migrated_rows: int = 0
+    archive_path: str | None = None
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class RetentionReport(BaseModel):
+    """Schema describing the state of the travel query retention policy.
+
+    Attributes:
+        total_rows (int): Number of stored travel queries
+        oldest (Optional[datetime]): Creation time of the oldest stored query
+        newest (Optional[datetime]): Creation time of the newest stored query
+        expired_by_age (int): Queries older than the configured maximum age
+        excess_rows (int): Queries beyond the configured maximum row count
+        eligible (int): Queries the policy removes, oldest first
+        removed (int): Queries actually removed by the run
+        archive_path (Optional[str]): File the removed queries were archived to
+        dry_run (bool): Whether the run only reported without removing anything
+    """
+
+    total_rows: int
+    oldest: datetime | None = None
+    newest: datetime | None = None
+    expired_by_age: int = 0
+    excess_rows: int = 0
+    eligible: int = 0
+    removed: int = 0
+    archive_path: str | None = None
+    dry_run: bool = False
@@ -0,0 +1,41 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class CorridorStats(BaseModel):
+    """Schema for the query counts of one group of the corridor statistics.
+
+    Columns that are not grouped by are left out.
+
+    Attributes:
+        day (Optional[date]): UTC day, when grouped by day
+        origin (Optional[str]): Origin country, when grouped by origin; None for
+            queries without an origin
+        destination (Optional[str]): Destination country, when grouped by destination
+        queries (int): Number of queries
+        avg_generation_ms (Optional[float]): Average generation latency of the
+            generated answers in milliseconds, None if all answers were reused
+    """
+
+    day: date | None = None
+    origin: str | None = None
+    destination: str | None = None
+    queries: int
+    avg_generation_ms: float | None = None
+
+
+class StatsReport(BaseModel):
+    """Schema for corridor statistics over a range of days, busiest group first.
+
+    Attributes:
+        since (date): First day counted
+        until (date): Last day counted
+        group_by (List[str]): Columns the counts are grouped by
+        stats (List[CorridorStats]): Counts per group
+    """
+
+    since: date
+    until: date
+    group_by: list[str]
+    stats: list[CorridorStats]
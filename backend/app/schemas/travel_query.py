@@ -1,8 +1,16 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 from app.models.travel_response import TravelResponse
+from app.utils.gazetteer import canonical_country, country_code, get_gazetteer
+
+# Fields of a TravelQueryResponse that history listings can be narrowed to
+HISTORY_FIELDS = ("id", "query", "destination", "origin", "created_at", "response")
+# Fields of the summary view, everything but the generated answer
+SUMMARY_FIELDS = ("id", "query", "destination", "origin", "created_at")
+# Most destinations one itinerary question can ask about
+MAX_ITINERARY_DESTINATIONS = 10
 
 
 class TravelQueryBase(BaseModel):
@@ -19,12 +27,48 @@ class TravelQueryBase(BaseModel):
     origin: str | None = None
 
 
-class TravelQueryCreate(TravelQueryBase):
+class OriginFromQuery(BaseModel):
+    """Mixin for schemas of new questions, taking a missing origin from the text.
+
+    Only places the text marks as the origin count, such as "from Kenya",
+    "Kenyan citizens" or "citizen of Kenya". Schemas using it declare the query
+    and origin fields.
+    """
+
+    @model_validator(mode="after")
+    def fill_origin_from_query(self) -> "OriginFromQuery":
+        """Take the origin from the query text if it was not given."""
+        if not self.origin:
+            origin, _ = get_gazetteer().extract(self.query)
+            if origin:
+                self.origin = get_gazetteer().countries[origin].name
+        return self
+
+
+class TravelQueryCreate(TravelQueryBase, OriginFromQuery):
     """Schema for creating a new travel query.
     Inherits all fields from TravelQueryBase.
+
+    Destination and origin are normalized to canonical country names through the
+    gazetteer ("japan", "JPN" and "Tokyo" all become "Japan"), and a missing origin
+    is taken from the query text when it names one.
     """
 
-    pass
+    @field_validator("destination", "origin")
+    @classmethod
+    def normalize_country(cls, value: str | None) -> str | None:
+        """Replace a recognised place with its canonical country name."""
+        return canonical_country(value)
+
+    @property
+    def destination_code(self) -> str | None:
+        """ISO 3166-1 alpha-2 code of the destination, if recognised."""
+        return country_code(self.destination)
+
+    @property
+    def origin_code(self) -> str | None:
+        """ISO 3166-1 alpha-2 code of the origin, if recognised."""
+        return country_code(self.origin)
 
 
 class TravelQueryResponse(TravelQueryBase):
@@ -42,3 +86,53 @@ class TravelQueryResponse(TravelQueryBase):
 
     class Config:
         from_attributes = True
+
+
+class ItineraryQueryCreate(OriginFromQuery):
+    """Schema for a travel question about a trip through several countries.
+
+    Destinations and origin are normalized like those of TravelQueryCreate, and
+    repeated destinations are asked for once.
+
+    Attributes:
+        query (str): The user's travel-related question
+        destinations (List[str]): The destination countries, in travel order
+        origin (Optional[str]): The origin country, if specified
+    """
+
+    query: str
+    destinations: list[str] = Field(min_length=1, max_length=MAX_ITINERARY_DESTINATIONS)
+    origin: str | None = None
+
+    @field_validator("destinations")
+    @classmethod
+    def normalize_destinations(cls, value: list[str]) -> list[str]:
+        """Replace recognised places with canonical country names, dropping repeats."""
+        return list(dict.fromkeys(canonical_country(place) for place in value))
+
+    @field_validator("origin")
+    @classmethod
+    def normalize_origin(cls, value: str | None) -> str | None:
+        """Replace a recognised place with its canonical country name."""
+        return canonical_country(value)
+
+
+class ItineraryQueryResponse(BaseModel):
+    """Schema for the answers to an itinerary question.
+
+    Attributes:
+        queries (List[TravelQueryResponse]): One stored query per destination,
+            in the order of the destinations
+    """
+
+    queries: list[TravelQueryResponse]
+
+
+class FollowUpCreate(BaseModel):
+    """Schema for a follow-up question on a stored travel query.
+
+    Attributes:
+        query (str): The follow-up question, e.g. "What about a business trip?"
+    """
+
+    query: str = Field(min_length=1)
@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+
+
+class ClientUsage(BaseModel):
+    """Schema for the token usage of one client in the current window.
+
+    Attributes:
+        client (str): Client identifier, a hashed API key or the client address
+        prompt_tokens (int): Prompt tokens used in the window
+        completion_tokens (int): Completion tokens used in the window
+        total_tokens (int): Prompt and completion tokens used in the window
+        calls (int): Model calls made in the window
+        reserved_tokens (int): Tokens set aside for calls still in progress
+        budget (Optional[int]): Token budget per window, None if unlimited
+        remaining (Optional[int]): Tokens left in the window, None if unlimited
+    """
+
+    client: str
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    calls: int
+    reserved_tokens: int
+    budget: int | None = None
+    remaining: int | None = None
+
+
+class UsageReport(BaseModel):
+    """Schema for the token usage of all clients, heaviest first.
+
+    Attributes:
+        window_seconds (int): Length of the rolling window in seconds
+        clients (List[ClientUsage]): Usage per client
+    """
+
+    window_seconds: int
+    clients: list[ClientUsage]
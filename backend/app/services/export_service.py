@@ -0,0 +1,159 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.models import TravelQuery
+from app.utils.dates import as_utc
+
+logger = setup_logging()
+settings = get_settings()
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_COLUMNS = ("id", "query", "destination", "origin", "created_at", "response")
+
+
+class ExportService:
+    """Service streaming stored travel queries as NDJSON or CSV.
+
+    Rows are fetched in batches of ``batch_size`` through a server-side cursor
+    (``yield_per``), encoded, and handed out in chunks of about ``chunk_bytes``,
+    optionally gzip-compressed on the fly. Only one batch and one chunk are held
+    in memory at a time, whatever the number of rows exported.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        batch_size: int | None = None,
+        chunk_bytes: int | None = None,
+    ):
+        """Initialize the export service.
+
+        Args:
+            session_factory (sessionmaker): Factory for the session the export reads
+                with. The export owns its session because it outlives the request
+                handler.
+            batch_size (Optional[int]): Rows fetched per round trip.
+                Defaults to EXPORT_BATCH_SIZE.
+            chunk_bytes (Optional[int]): Approximate size of the chunks handed out.
+                Defaults to EXPORT_CHUNK_BYTES.
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+        self.chunk_bytes = chunk_bytes or settings.EXPORT_CHUNK_BYTES
+
+    def rows(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        destination: str | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield stored queries oldest first.
+
+        Args:
+            since (Optional[datetime]): Only queries created at or after this time
+            until (Optional[datetime]): Only queries created before this time
+            destination (Optional[str]): Only queries about this destination
+
+        Yields:
+            Dict[str, Any]: One record per query with the EXPORT_COLUMNS keys
+        """
+        statement = select(
+            TravelQuery.id,
+            TravelQuery.query,
+            TravelQuery.destination,
+            TravelQuery.origin,
+            TravelQuery.created_at,
+            TravelQuery.response,
+        ).order_by(TravelQuery.created_at, TravelQuery.id)
+        if since is not None:
+            statement = statement.where(TravelQuery.created_at >= as_utc(since))
+        if until is not None:
+            statement = statement.where(TravelQuery.created_at < as_utc(until))
+        if destination is not None:
+            statement = statement.where(TravelQuery.destination == destination)
+
+        with self.session_factory() as session:
+            result = session.execute(
+                statement.execution_options(yield_per=self.batch_size)
+            )
+            for row in result:
+                record = row._asdict()
+                if record["created_at"] is not None:
+                    record["created_at"] = record["created_at"].isoformat()
+                yield record
+
+    def stream(
+        self,
+        export_format: str = "ndjson",
+        compress: bool = False,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        destination: str | None = None,
+    ) -> Iterator[bytes]:
+        """Yield an export of the stored queries in chunks.
+
+        Args:
+            export_format (str): One of EXPORT_FORMATS
+            compress (bool): Whether to gzip the output
+            since (Optional[datetime]): Only queries created at or after this time
+            until (Optional[datetime]): Only queries created before this time
+            destination (Optional[str]): Only queries about this destination
+
+        Yields:
+            bytes: The next chunk of the export
+
+        Raises:
+            ValueError: If the format is not supported
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        buffer = io.StringIO()
+        writer = None
+        if export_format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+
+        exported = 0
+        for record in self.rows(since, until, destination):
+            if writer is None:
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write("\n")
+            else:
+                record["response"] = json.dumps(record["response"], ensure_ascii=False)
+                writer.writerow([record[column] for column in EXPORT_COLUMNS])
+            exported += 1
+            if buffer.tell() >= self.chunk_bytes:
+                chunk = _drain(buffer)
+                yield compressor.compress(chunk) if compressor else chunk
+
+        chunk = _drain(buffer)
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush()
+        if chunk:
+            yield chunk
+        metrics.increment("export_rows_total", exported, format=export_format)
+        logger.info(f"Exported {exported} queries as {export_format}")
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    """Return the encoded contents of a buffer and empty it."""
+    data = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    return data
@@ -0,0 +1,109 @@
+from typing import Any, NamedTuple
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.utils.ttl_cache import TTLCache
+
+logger = setup_logging()
+settings = get_settings()
+
+
+class FollowUpContext(NamedTuple):
+    """What the model needs to know to answer a follow-up question.
+
+    Attributes:
+        query (str): The question the conversation started with
+        destination (str): The destination country
+        origin (Optional[str]): The origin country
+        answer (Dict[str, Any]): The latest answer of the conversation, as stored
+        turns (Tuple[str, ...]): Follow-up questions asked so far, oldest first
+    """
+
+    query: str
+    destination: str
+    origin: str | None
+    answer: dict[str, Any]
+    turns: tuple[str, ...] = ()
+
+
+class FollowUpService:
+    """Service keeping the context of recent answers for follow-up questions.
+
+    A follow-up continues from a stored query and is stored as a query of its
+    own; the conversation goes on from that one. The context of each answer is
+    cached under the ID of its query, with least-recently-used eviction beyond
+    ``max_sessions`` conversations and expiry ``ttl_seconds`` after the last
+    follow-up. When the context is missing (expired, evicted, or cached by
+    another worker) it is rebuilt from the stored query, without the earlier
+    follow-up questions. The context of an answer that is changed or deleted is
+    dropped with :meth:`forget`, so the next follow-up reads the stored answer.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: float, max_turns: int):
+        """Initialize the follow-up service.
+
+        Args:
+            max_sessions (int): Maximum number of cached conversations
+            ttl_seconds (float): Seconds a conversation is kept after its last turn
+            max_turns (int): Earlier follow-up questions kept as context
+        """
+        self.contexts = TTLCache("followup_contexts", max_sessions, ttl_seconds)
+        self.max_turns = max_turns
+
+    @classmethod
+    def from_settings(cls) -> "FollowUpService":
+        """Create a service configured from the FOLLOWUP_* settings."""
+        return cls(
+            settings.FOLLOWUP_MAX_SESSIONS,
+            settings.FOLLOWUP_SESSION_TTL_SECONDS,
+            settings.FOLLOWUP_MAX_TURNS,
+        )
+
+    def get(self, query_id: int) -> FollowUpContext | None:
+        """Return the cached context of a query's answer, if any.
+
+        Args:
+            query_id (int): ID of the query being followed up on
+
+        Returns:
+            Optional[FollowUpContext]: The context, or None if it is not cached
+        """
+        context = self.contexts.get(query_id)
+        metrics.increment(
+            "followup_context_total", source="cache" if context else "database"
+        )
+        return context
+
+    def remember(
+        self,
+        query_id: int,
+        context: FollowUpContext,
+        question: str,
+        answer: dict[str, Any],
+    ) -> FollowUpContext:
+        """Cache the context of a follow-up answer for the next follow-up.
+
+        Args:
+            query_id (int): ID the follow-up answer was stored under
+            context (FollowUpContext): Context the follow-up was answered in
+            question (str): The follow-up question
+            answer (Dict[str, Any]): The follow-up answer
+
+        Returns:
+            FollowUpContext: The context of the follow-up answer
+        """
+        turns = (*context.turns, question)[-self.max_turns :] if self.max_turns else ()
+        followed = context._replace(answer=answer, turns=turns)
+        self.contexts.set(query_id, followed)
+        logger.debug(f"Cached follow-up context of query {query_id}")
+        return followed
+
+    def forget(self, query_id: int) -> None:
+        """Drop the cached context of a query whose stored answer changed.
+
+        Args:
+            query_id (int): ID of the changed or deleted query
+        """
+        if self.contexts.pop(query_id) is not None:
+            logger.debug(f"Dropped follow-up context of query {query_id}")
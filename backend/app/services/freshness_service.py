@@ -0,0 +1,117 @@
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+
+logger = setup_logging()
+settings = get_settings()
+
+
+def parse_ttls(value: str) -> dict[str, float]:
+    """Parse ``field=hours`` pairs separated by commas.
+
+    Args:
+        value (str): TTL specification, e.g. "advisories=72,documents=720"
+
+    Returns:
+        Dict[str, float]: TTL in hours per field name
+    """
+    ttls = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        field, _, hours = item.partition("=")
+        try:
+            ttls[field.strip()] = float(hours)
+        except ValueError:
+            logger.warning(f"Ignoring invalid field TTL: {item}")
+    return ttls
+
+
+def _parse_time(value: Any) -> datetime | None:
+    """Parse an ISO timestamp, assuming UTC when it has no timezone."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+class FreshnessService:
+    """Track how old each field of a stored answer is and merge partial refreshes.
+
+    Each generated field has its own time-to-live: visa requirements change
+    rarely while advisories go stale within days. A field's age is taken from
+    ``fieldTimestamps`` in the stored answer, falling back to the answer's
+    ``timestamp`` for answers generated before per-field timestamps existed.
+    """
+
+    def __init__(self, ttls: dict[str, float] | None = None):
+        """Initialize the service.
+
+        Args:
+            ttls (Optional[Dict[str, float]]): TTL in hours per field; fields without
+                a TTL never go stale. Defaults to FIELD_TTL_HOURS.
+        """
+        self.ttls = parse_ttls(settings.FIELD_TTL_HOURS) if ttls is None else ttls
+
+    def stale_fields(
+        self,
+        response: dict[str, Any],
+        created_at: datetime | None = None,
+        now: datetime | None = None,
+    ) -> list[str]:
+        """Return the fields of a stored answer whose TTL has expired.
+
+        Args:
+            response (Dict[str, Any]): The stored answer
+            created_at (Optional[datetime]): When the answer was stored, used if it
+                carries no timestamps
+            now (Optional[datetime]): Reference time. Defaults to the current time.
+
+        Returns:
+            List[str]: Names of the stale fields, in TTL order
+        """
+        now = now or datetime.now(UTC)
+        field_times = response.get("fieldTimestamps") or {}
+        fallback = _parse_time(response.get("timestamp")) or _parse_time(created_at)
+        stale = []
+        for field, hours in sorted(self.ttls.items(), key=lambda item: item[1]):
+            generated = _parse_time(field_times.get(field)) or fallback
+            if generated is None or now - generated > timedelta(hours=hours):
+                stale.append(field)
+        return stale
+
+    def merge(
+        self,
+        response: dict[str, Any],
+        fresh: dict[str, Any],
+        now: datetime | None = None,
+    ) -> dict[str, Any]:
+        """Merge regenerated fields into a stored answer.
+
+        Args:
+            response (Dict[str, Any]): The stored answer
+            fresh (Dict[str, Any]): Regenerated values by field name
+            now (Optional[datetime]): Generation time. Defaults to the current time.
+
+        Returns:
+            Dict[str, Any]: A new answer with the fresh fields and their timestamps
+        """
+        generated_at = (now or datetime.now(UTC)).isoformat()
+        fallback = response.get("timestamp", generated_at)
+        field_times = {field: fallback for field in self.ttls if field in response} | (
+            response.get("fieldTimestamps") or {}
+        )
+
+        merged = {**response, **fresh}
+        merged["fieldTimestamps"] = field_times | dict.fromkeys(fresh, generated_at)
+        merged["timestamp"] = generated_at
+        for field in fresh:
+            metrics.increment("field_refresh_total", field=field)
+        return merged
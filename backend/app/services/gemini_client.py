@@ -0,0 +1,251 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+
+logger = setup_logging()
+settings = get_settings()
+
+# Names the service passes in generation_config, mapped to the REST API names
+_GENERATION_CONFIG_NAMES = {
+    "temperature": "temperature",
+    "top_p": "topP",
+    "top_k": "topK",
+    "max_output_tokens": "maxOutputTokens",
+}
+# Transport events marking the setup of a new connection (TCP, then TLS)
+_CONNECT_EVENTS = frozenset(
+    {
+        "connection.connect_tcp.started",
+        "connection.connect_tcp.complete",
+        "connection.start_tls.complete",
+    }
+)
+
+
+class GeminiAPIError(Exception):
+    """Raised when the Gemini API answers with an error status.
+
+    Attributes:
+        code (int): HTTP status code of the response
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"Gemini API error {code}: {message}")
+        self.code = code
+
+
+class UsageMetadata:
+    """Token counts the API reports for a call, as the SDK response exposes them.
+
+    Attributes:
+        prompt_token_count (int): Tokens in the prompt
+        candidates_token_count (int): Tokens in the generated response
+    """
+
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class GenerateContentResponse:
+    """Text and token usage of a generateContent response, as the SDK exposes them.
+
+    Attributes:
+        text (str): The generated text
+        usage_metadata (Optional[UsageMetadata]): Token counts of the call, None
+            if the API did not report them
+    """
+
+    def __init__(self, text: str, usage_metadata: UsageMetadata | None = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class GeminiClient:
+    """Client for the Gemini generateContent REST endpoint over a pooled transport.
+
+    Calls share one HTTP client with a bounded pool of keep-alive connections,
+    so the TCP and TLS handshakes are paid once per connection rather than per
+    call. ``warm_up`` opens connections ahead of the first calls. The time spent
+    setting up connections is recorded per call in the ``gemini_connect_seconds``
+    summary and ``gemini_connections_total{reused}`` counter. Point ``base_url``
+    at ``python -m app.cli.gemini_stub`` to run without the real API.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+    ):
+        """Initialize the client.
+
+        Args:
+            api_key (str): Gemini API key
+            model (str): Model name, e.g. "gemini-1.5-pro"
+            base_url (str): Root URL of the API
+            connect_timeout (float): Seconds allowed to open a connection, and to
+                wait for a free connection from the pool
+            read_timeout (float): Seconds allowed between bytes of a response
+            max_connections (int): Maximum number of open connections
+            max_keepalive_connections (int): Idle connections kept open for reuse
+            keepalive_expiry (float): Seconds an idle connection is kept open
+        """
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"x-goog-api-key": api_key},
+            timeout=httpx.Timeout(
+                connect=connect_timeout,
+                read=read_timeout,
+                write=connect_timeout,
+                pool=connect_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self.last_used = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "GeminiClient":
+        """Create a client configured from the GEMINI_* settings."""
+        return cls(
+            api_key=settings.GEMINI_API_KEY,
+            model=settings.GEMINI_MODEL,
+            base_url=settings.GEMINI_BASE_URL,
+            connect_timeout=settings.GEMINI_CONNECT_TIMEOUT,
+            read_timeout=settings.GEMINI_READ_TIMEOUT,
+            max_connections=settings.GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.GEMINI_KEEPALIVE_EXPIRY,
+        )
+
+    async def generate_content_async(
+        self, prompt: str, generation_config: dict[str, Any] | None = None
+    ) -> GenerateContentResponse:
+        """Generate a response to a prompt.
+
+        Args:
+            prompt (str): The prompt
+            generation_config (Optional[Dict[str, Any]]): Sampling parameters
+                (temperature, top_p, top_k, max_output_tokens)
+
+        Returns:
+            GenerateContentResponse: The generated text, empty if the model
+                returned none, and the token counts from usageMetadata
+
+        Raises:
+            GeminiAPIError: If the API answers with an error status
+            httpx.HTTPError: If the API cannot be reached in time
+        """
+        body = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                _GENERATION_CONFIG_NAMES.get(name, name): value
+                for name, value in (generation_config or {}).items()
+            },
+        }
+        data = await self._request(
+            "POST", f"/v1beta/models/{self.model}:generateContent", json=body
+        )
+        candidates = data.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts", [])
+        usage = data.get("usageMetadata")
+        return GenerateContentResponse(
+            "".join(part.get("text", "") for part in parts),
+            (
+                UsageMetadata(
+                    usage.get("promptTokenCount", 0),
+                    usage.get("candidatesTokenCount", 0),
+                )
+                if usage
+                else None
+            ),
+        )
+
+    async def warm_up(self, connections: int = 1) -> None:
+        """Open connections to the API ahead of the first calls.
+
+        Fetches the model description over ``connections`` concurrent requests,
+        which leaves that many connections in the pool. Failures are logged but
+        not raised, so an unreachable API does not prevent startup.
+
+        Args:
+            connections (int): Number of connections to open
+        """
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                self._request("GET", f"/v1beta/models/{self.model}")
+                for _ in range(connections)
+            ),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning(f"Gemini warm-up failed: {failures[0]}")
+        else:
+            logger.info(
+                f"Warmed up {connections} Gemini connection(s) in "
+                f"{time.perf_counter() - started:.2f}s"
+            )
+
+    async def keep_warm(self, interval: float) -> None:
+        """Re-open connections whenever no call was made for ``interval`` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            if time.monotonic() - self.last_used >= interval:
+                await self.warm_up()
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        await self._client.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> dict:
+        """Send a request and return its JSON body, timing connection setup."""
+        timings: dict[str, float] = {}
+
+        async def trace(event: str, info: dict) -> None:
+            if event in _CONNECT_EVENTS:
+                timings[event] = time.perf_counter()
+
+        self.last_used = time.monotonic()
+        response = await self._client.request(
+            method, path, extensions={"trace": trace}, **kwargs
+        )
+        started = timings.get("connection.connect_tcp.started")
+        if started is not None:
+            finished = timings.get(
+                "connection.start_tls.complete",
+                timings.get("connection.connect_tcp.complete", started),
+            )
+            metrics.observe("gemini_connect_seconds", finished - started)
+            metrics.increment("gemini_connections_total", reused="false")
+            logger.debug(
+                f"Opened Gemini connection in {(finished - started) * 1000:.1f}ms"
+            )
+        else:
+            metrics.increment("gemini_connections_total", reused="true")
+
+        if response.is_error:
+            try:
+                message = response.json()["error"]["message"]
+            except (ValueError, KeyError, TypeError):
+                message = response.text[:200]
+            raise GeminiAPIError(response.status_code, message)
+        return response.json()
@@ -1,27 +1,75 @@
+import asyncio
 import json
+import time
 from datetime import UTC
 from typing import Any
 
-import google.generativeai as genai
-
+from app.core.admission import AdmissionController, Priority
+from app.core.capture import next_replay_latency, record_model_time
 from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.services.gemini_client import GeminiClient, GenerateContentResponse
+from app.services.token_budget_service import estimate_tokens, token_budget
 
 from ..core.config import get_settings
 
 logger = setup_logging()
 settings = get_settings()
 
+# Generated fields of a TravelResponse with the example value shown to the model
+GENERATED_FIELDS = {
+    "visaRequirements": '"detailed visa requirements"',
+    "documents": '["list", "of", "required", "documents"]',
+    "advisories": '["list", "of", "travel", "advisories"]',
+    "estimatedProcessingTime": '"estimated processing time"',
+    "embassyInformation": '"embassy contact information"',
+}
+LIST_FIELDS = frozenset({"documents", "advisories"})
+
+
+class ReplayModel:
+    """Stand-in for the Gemini model when replaying captured traffic.
+
+    Each call takes as long as the model call recorded for the replayed request
+    (see app.core.capture) and answers with the example values of every field.
+    No token usage is reported, so replayed calls are accounted with estimates.
+    """
+
+    answer = json.dumps(
+        {
+            "destination": "Replay",
+            "origin": "Replay",
+            **{
+                field: json.loads(example)
+                for field, example in GENERATED_FIELDS.items()
+            },
+        }
+    )
+
+    async def generate_content_async(
+        self, prompt: str, generation_config: dict | None = None
+    ) -> GenerateContentResponse:
+        await asyncio.sleep(next_replay_latency())
+        return GenerateContentResponse(self.answer)
+
 
 class GeminiService:
     """Service for interacting with Google's Gemini AI model to generate travel information.
 
     This service handles the generation of travel-related information including visa requirements,
     required documents, travel advisories, and other relevant details for international travel.
-    It uses Google's Gemini 1.5 Flash model for generating responses.
+    It uses the Gemini model named by GEMINI_MODEL for generating responses.
+
+    Calls to the model go through an admission controller that bounds upstream
+    concurrency, queues calls by priority and sheds load when the queue is full.
+    Token usage of every call is accounted to the calling client and checked
+    against its token budget before the call is made.
 
     Attributes:
         api_key (str): Gemini API key from environment variables
-        model: Configured Gemini model instance
+        model (GeminiClient): Client of the Gemini API, with pooled connections
+        admission (AdmissionController): Admission control for model calls
+        token_budget (TokenBudgetService): Per-client token accounting and budgets
     """
 
     def __init__(self):
@@ -35,8 +83,9 @@ class GeminiService:
         """
         try:
             logger.info("Initializing Gemini service")
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel("gemini-1.5-pro")
+            self.model = self._create_model()
+            self.admission = AdmissionController.from_settings()
+            self.token_budget = token_budget
             logger.info("Gemini service initialized successfully")
         except Exception as e:
             logger.error(
@@ -44,8 +93,45 @@ class GeminiService:
             )
             raise
 
+    def reset_client(self) -> None:
+        """Re-create the model client, e.g. in a worker forked from a preloaded app.
+
+        Pooled connections must not be shared across processes, so each worker
+        builds its own.
+        """
+        self.model = self._create_model()
+        logger.debug("Gemini client re-created")
+
+    @staticmethod
+    def _create_model() -> "GeminiClient | ReplayModel":
+        """Create the model client, or the replay stand-in if REPLAY_FAKE_MODEL is set."""
+        if settings.REPLAY_FAKE_MODEL:
+            logger.warning("Using the replay model instead of Gemini")
+            return ReplayModel()
+        return GeminiClient.from_settings()
+
+    async def warm_up(self) -> None:
+        """Open GEMINI_WARMUP_CONNECTIONS connections to the API before serving."""
+        if isinstance(self.model, GeminiClient) and settings.GEMINI_WARMUP_CONNECTIONS:
+            await self.model.warm_up(settings.GEMINI_WARMUP_CONNECTIONS)
+
+    async def keep_warm(self) -> None:
+        """Keep a connection open through idle periods, every GEMINI_KEEP_WARM_INTERVAL."""
+        if isinstance(self.model, GeminiClient):
+            await self.model.keep_warm(settings.GEMINI_KEEP_WARM_INTERVAL)
+
+    async def aclose(self) -> None:
+        """Close the connections of the model client."""
+        if isinstance(self.model, GeminiClient):
+            await self.model.aclose()
+
     async def get_travel_info(
-        self, query: str, destination: str, origin: str = None
+        self,
+        query: str,
+        destination: str,
+        origin: str = None,
+        priority: Priority = Priority.INTERACTIVE,
+        client: str = "anonymous",
     ) -> dict[str, Any]:
         """Generate travel information using the Gemini AI model.
 
@@ -56,6 +142,10 @@ class GeminiService:
             query (str): The user's travel-related question
             destination (str): The destination country
             origin (str, optional): The origin country. Defaults to None.
+            priority (Priority, optional): Admission priority of the call.
+                Defaults to Priority.INTERACTIVE.
+            client (str, optional): Client the token usage is accounted to.
+                Defaults to "anonymous".
 
         Returns:
             Dict[str, Any]: Generated travel information including:
@@ -70,6 +160,8 @@ class GeminiService:
 
         Raises:
             ValueError: If the API response is invalid or missing required fields
+            AdmissionRejected: If the call is shed because too many calls are waiting
+            TokenBudgetExceeded: If the call would take the client over its token budget
             Exception: If there's an error communicating with the AI model
         """
         try:
@@ -79,7 +171,9 @@ class GeminiService:
             prompt = self._format_prompt(query, destination, origin)
             logger.debug("Generated prompt for Gemini model")
 
-            response = await self._make_api_request(prompt)
+            response = await self._generate(
+                prompt, priority, client, settings.GEMINI_MAX_OUTPUT_TOKENS
+            )
             logger.info(f"Successfully generated response for {destination}")
 
             parsed_response = self._parse_response(response)
@@ -90,6 +184,258 @@ class GeminiService:
             logger.error(f"Error in Gemini service: {str(e)}", exc_info=True)
             raise
 
+    async def get_itinerary_info(
+        self,
+        query: str,
+        destinations: list[str],
+        origin: str | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+        client: str = "anonymous",
+    ) -> dict[str, dict[str, Any]]:
+        """Generate travel information for several destinations of one trip.
+
+        Destinations are asked for together, sharing one prompt, in groups small
+        enough for ITINERARY_TOKENS_PER_DESTINATION output tokens each to fit in
+        ITINERARY_MAX_OUTPUT_TOKENS. Groups are generated in parallel. Destinations
+        missing from a combined answer, e.g. because it was cut off, are asked for
+        one by one.
+
+        Args:
+            query (str): The user's travel-related question
+            destinations (List[str]): The destination countries
+            origin (Optional[str]): The origin country. Defaults to None.
+            priority (Priority, optional): Admission priority of the calls.
+                Defaults to Priority.INTERACTIVE.
+            client (str, optional): Client the token usage is accounted to.
+                Defaults to "anonymous".
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Travel information as returned by
+                get_travel_info, by destination
+
+        Raises:
+            ValueError: If the answer for a destination is invalid
+            AdmissionRejected: If a call is shed because too many calls are waiting
+            TokenBudgetExceeded: If a call would take the client over its token budget
+        """
+        per_call = max(
+            1,
+            settings.ITINERARY_MAX_OUTPUT_TOKENS
+            // settings.ITINERARY_TOKENS_PER_DESTINATION,
+        )
+        groups = [
+            destinations[i : i + per_call]
+            for i in range(0, len(destinations), per_call)
+        ]
+        logger.info(
+            f"Generating travel info for {len(destinations)} destinations "
+            f"in {len(groups)} call(s)"
+        )
+        answers: dict[str, dict[str, Any]] = {}
+        for group_answers in await asyncio.gather(
+            *(
+                self._get_itinerary_group(query, group, origin, priority, client)
+                for group in groups
+            )
+        ):
+            answers.update(group_answers)
+
+        missing = [
+            destination for destination in destinations if destination not in answers
+        ]
+        if missing:
+            logger.warning(f"Combined answer lacks {', '.join(missing)}, asking singly")
+            metrics.increment("itinerary_fallback_total", len(missing))
+            singles = await asyncio.gather(
+                *(
+                    self.get_travel_info(query, destination, origin, priority, client)
+                    for destination in missing
+                )
+            )
+            answers.update(zip(missing, singles, strict=True))
+        return {destination: answers[destination] for destination in destinations}
+
+    async def _get_itinerary_group(
+        self,
+        query: str,
+        destinations: list[str],
+        origin: str | None,
+        priority: Priority,
+        client: str,
+    ) -> dict[str, dict[str, Any]]:
+        """Generate travel information for a group of destinations in one call.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The valid answers in the response, by
+                destination; destinations without one are left out
+        """
+        if len(destinations) == 1:
+            answer = await self.get_travel_info(
+                query, destinations[0], origin, priority, client
+            )
+            return {destinations[0]: answer}
+
+        prompt = self._format_itinerary_prompt(query, destinations, origin)
+        response = await self._generate(
+            prompt,
+            priority,
+            client,
+            settings.ITINERARY_TOKENS_PER_DESTINATION * len(destinations),
+        )
+        return self._parse_itinerary_response(response, destinations, origin)
+
+    async def refresh_fields(
+        self,
+        query: str,
+        destination: str,
+        origin: str | None,
+        current: dict[str, Any],
+        fields: list[str],
+        priority: Priority = Priority.INTERACTIVE,
+        client: str = "anonymous",
+    ) -> dict[str, Any]:
+        """Regenerate only some fields of a stored answer.
+
+        The model is asked for the given fields alone, with the rest of the
+        stored answer as context, so a refresh costs a fraction of the output
+        tokens of a full answer.
+
+        Args:
+            query (str): The user's travel-related question
+            destination (str): The destination country
+            origin (Optional[str]): The origin country
+            current (Dict[str, Any]): The stored answer
+            fields (List[str]): Names of the fields to regenerate
+            priority (Priority, optional): Admission priority of the call.
+                Defaults to Priority.INTERACTIVE.
+            client (str, optional): Client the token usage is accounted to.
+                Defaults to "anonymous".
+
+        Returns:
+            Dict[str, Any]: The regenerated fields only
+
+        Raises:
+            ValueError: If a field is unknown or the response lacks a requested field
+            AdmissionRejected: If the call is shed because too many calls are waiting
+            TokenBudgetExceeded: If the call would take the client over its token budget
+        """
+        unknown = set(fields) - GENERATED_FIELDS.keys()
+        if unknown:
+            raise ValueError(f"Cannot regenerate fields: {', '.join(sorted(unknown))}")
+        try:
+            logger.info(f"Regenerating {', '.join(fields)} for {destination}")
+            prompt = self._format_refresh_prompt(
+                query, destination, origin, current, fields
+            )
+            max_output_tokens = min(
+                settings.GEMINI_MAX_OUTPUT_TOKENS,
+                settings.FIELD_REFRESH_TOKENS_PER_FIELD * len(fields),
+            )
+            response = await self._generate(prompt, priority, client, max_output_tokens)
+            return self._parse_partial_response(response, fields)
+        except Exception as e:
+            logger.error(f"Error refreshing fields: {str(e)}", exc_info=True)
+            raise
+
+    async def answer_followup(
+        self,
+        question: str,
+        query: str,
+        destination: str,
+        origin: str | None,
+        answer: dict[str, Any],
+        turns: tuple[str, ...] = (),
+        priority: Priority = Priority.INTERACTIVE,
+        client: str = "anonymous",
+    ) -> dict[str, Any]:
+        """Answer a follow-up question as a change to an earlier answer.
+
+        The earlier answer is sent as compact context and the model returns only
+        the fields the follow-up changes, so a follow-up costs a fraction of the
+        prompt and output tokens of a new query.
+
+        Args:
+            question (str): The follow-up question
+            query (str): The question the conversation started with
+            destination (str): The destination country
+            origin (Optional[str]): The origin country
+            answer (Dict[str, Any]): The latest answer of the conversation
+            turns (Tuple[str, ...], optional): Earlier follow-up questions, oldest
+                first. Defaults to ().
+            priority (Priority, optional): Admission priority of the call.
+                Defaults to Priority.INTERACTIVE.
+            client (str, optional): Client the token usage is accounted to.
+                Defaults to "anonymous".
+
+        Returns:
+            Dict[str, Any]: The changed fields only, possibly none
+
+        Raises:
+            ValueError: If the response is invalid
+            AdmissionRejected: If the call is shed because too many calls are waiting
+            TokenBudgetExceeded: If the call would take the client over its token budget
+        """
+        try:
+            logger.info(f"Answering follow-up for {destination}: {question}")
+            prompt = self._format_followup_prompt(
+                question, query, destination, origin, answer, turns
+            )
+            max_output_tokens = min(
+                settings.GEMINI_MAX_OUTPUT_TOKENS, settings.FOLLOWUP_MAX_OUTPUT_TOKENS
+            )
+            response = await self._generate(prompt, priority, client, max_output_tokens)
+            return self._parse_followup_response(response)
+        except Exception as e:
+            logger.error(f"Error answering follow-up: {str(e)}", exc_info=True)
+            raise
+
+    async def _generate(
+        self, prompt: str, priority: Priority, client: str, max_output_tokens: int
+    ) -> str:
+        """Call the model within the client's token budget and admission control.
+
+        Args:
+            prompt (str): The formatted prompt to send to the API
+            priority (Priority): Admission priority of the call
+            client (str): Client the token usage is accounted to
+            max_output_tokens (int): Maximum length of the response
+
+        The reservation is replaced by the token counts the API reports, or by
+        estimates from the text length if it reports none.
+
+        Returns:
+            str: Raw response from the API
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        reservation = self.token_budget.reserve(
+            client, prompt_tokens, max_output_tokens
+        )
+        started = None
+        try:
+            async with self.admission.slot(priority):
+                started = time.perf_counter()
+                try:
+                    response = await self._make_api_request(prompt, max_output_tokens)
+                finally:
+                    record_model_time(time.perf_counter() - started)
+        except BaseException:
+            # A call that reached the model is charged for its prompt
+            if started is not None:
+                self.token_budget.commit(reservation, prompt_tokens, 0)
+            else:
+                self.token_budget.release(reservation)
+            raise
+        usage = response.usage_metadata
+        if usage is not None:
+            self.token_budget.commit(
+                reservation, usage.prompt_token_count, usage.candidates_token_count
+            )
+        else:
+            self.token_budget.commit(
+                reservation, prompt_tokens, estimate_tokens(response.text)
+            )
+        return response.text
+
     def _format_prompt(self, query: str, destination: str, origin: str = None) -> str:
         """Format the prompt for the Gemini AI model.
 
@@ -132,16 +478,138 @@ class GeminiService:
 
         return base_prompt
 
-    async def _make_api_request(self, prompt: str) -> str:
+    def _format_itinerary_prompt(
+        self, query: str, destinations: list[str], origin: str | None
+    ) -> str:
+        """Format a prompt asking for travel information on several destinations.
+
+        Args:
+            query (str): The user's travel-related question
+            destinations (List[str]): The destination countries
+            origin (Optional[str]): The origin country
+
+        Returns:
+            str: Formatted prompt for the AI model
+        """
+        keys = ",\n".join(
+            f'                "{field}": {example}'
+            for field, example in GENERATED_FIELDS.items()
+        )
+        return f"""You are a travel advisor specializing in international travel requirements.
+        Please provide detailed information about travel requirements from {origin or 'any country'} to each of these destinations: {', '.join(destinations)}.
+
+        Query: {query}
+
+        For every destination, provide visa requirements, required documents,
+        travel advisories, estimated processing time and embassy information.
+
+        Format your response as a JSON object with one key per destination, named
+        exactly as above, each holding an object with these exact keys:
+        {{
+            "{destinations[0]}": {{
+{keys}
+            }}
+        }}"""
+
+    def _format_refresh_prompt(
+        self,
+        query: str,
+        destination: str,
+        origin: str | None,
+        current: dict[str, Any],
+        fields: list[str],
+    ) -> str:
+        """Format a prompt asking the model for some fields of an answer only.
+
+        Args:
+            query (str): The user's travel-related question
+            destination (str): The destination country
+            origin (Optional[str]): The origin country
+            current (Dict[str, Any]): The stored answer, given as context
+            fields (List[str]): Names of the fields to regenerate
+
+        Returns:
+            str: Formatted prompt for the AI model
+        """
+        context = {
+            key: value
+            for key, value in current.items()
+            if key in GENERATED_FIELDS and key not in fields
+        }
+        keys = ",\n".join(
+            f'            "{field}": {GENERATED_FIELDS[field]}' for field in fields
+        )
+        return f"""You are a travel advisor specializing in international travel requirements.
+        Travel from {origin or 'any country'} to {destination}.
+
+        Query: {query}
+
+        This is the current information, which is still valid:
+        {json.dumps(context, ensure_ascii=False)}
+
+        Provide up-to-date values for the following fields only, as a JSON object
+        with exactly these keys:
+        {{
+{keys}
+        }}"""
+
+    def _format_followup_prompt(
+        self,
+        question: str,
+        query: str,
+        destination: str,
+        origin: str | None,
+        answer: dict[str, Any],
+        turns: tuple[str, ...],
+    ) -> str:
+        """Format a prompt asking the model how a follow-up changes an answer.
+
+        Args:
+            question (str): The follow-up question
+            query (str): The question the conversation started with
+            destination (str): The destination country
+            origin (Optional[str]): The origin country
+            answer (Dict[str, Any]): The latest answer, given as compact context
+            turns (Tuple[str, ...]): Earlier follow-up questions, oldest first
+
+        Returns:
+            str: Formatted prompt for the AI model
+        """
+        context = {
+            key: value for key, value in answer.items() if key in GENERATED_FIELDS
+        }
+        earlier = "".join(f"\n        Then: {turn}" for turn in turns)
+        keys = ", ".join(f'"{field}"' for field in GENERATED_FIELDS)
+        return f"""You are a travel advisor specializing in international travel requirements.
+        Travel from {origin or 'any country'} to {destination}.
+
+        Query: {query}{earlier}
+
+        Current answer:
+        {json.dumps(context, ensure_ascii=False, separators=(",", ":"))}
+
+        Follow-up: {question}
+
+        Answer the follow-up as a JSON object holding only the fields of the
+        current answer that change, with their complete new values. Allowed keys
+        are {keys}; "documents" and "advisories" are lists of strings, the others
+        strings. Reply with {{}} if nothing changes."""
+
+    async def _make_api_request(
+        self, prompt: str, max_output_tokens: int | None = None
+    ) -> GenerateContentResponse:
         """Make an API request to the Gemini service.
 
         Sends the formatted prompt to the Gemini API and retrieves the response.
 
         Args:
             prompt (str): The formatted prompt to send to the API
+            max_output_tokens (Optional[int]): Maximum length of the response.
+                Defaults to GEMINI_MAX_OUTPUT_TOKENS.
 
         Returns:
-            str: Raw response from the API
+            GenerateContentResponse: Raw response from the API, with the token
+                usage the API reported
 
         Raises:
             ValueError: If the API response is empty or invalid
@@ -149,13 +617,14 @@ class GeminiService:
         """
         try:
             logger.debug("Making API request to Gemini")
-            response = self.model.generate_content(
+            response = await self.model.generate_content_async(
                 prompt,
                 generation_config={
                     "temperature": 0.7,
                     "top_p": 0.8,
                     "top_k": 40,
-                    "max_output_tokens": 1024,
+                    "max_output_tokens": max_output_tokens
+                    or settings.GEMINI_MAX_OUTPUT_TOKENS,
                 },
             )
 
@@ -164,7 +633,7 @@ class GeminiService:
                 raise Exception("Empty response from Gemini API")
 
             logger.debug("Successfully received response from Gemini API")
-            return response.text
+            return response
         except Exception as e:
             logger.error(f"API request failed: {str(e)}", exc_info=True)
             raise
@@ -189,6 +658,7 @@ class GeminiService:
                 - estimatedProcessingTime (str): Estimated visa processing time
                 - embassyInformation (str): Embassy contact information
                 - timestamp (str): ISO format timestamp
+                - source (str): "model"
 
         Raises:
             ValueError: If the response is missing required fields or is invalid JSON
@@ -196,14 +666,7 @@ class GeminiService:
         """
         try:
             logger.debug("Starting to parse Gemini response")
-            cleaned_text = response_text.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:]
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]
-            cleaned_text = cleaned_text.strip()
-
-            response_data = json.loads(cleaned_text)
+            response_data = json.loads(self._strip_code_fence(response_text))
             logger.debug("Successfully parsed JSON response")
 
             required_fields = [
@@ -237,6 +700,12 @@ class GeminiService:
                     )
                     response_data["timestamp"] = datetime.now(UTC).isoformat()
 
+            generated_at = datetime.now(UTC).isoformat()
+            response_data["fieldTimestamps"] = dict.fromkeys(
+                GENERATED_FIELDS, generated_at
+            )
+            response_data["source"] = "model"
+
             logger.debug("Successfully validated and formatted response data")
             return response_data
 
@@ -246,3 +715,117 @@ class GeminiService:
         except Exception as e:
             logger.error(f"Error parsing response: {str(e)}", exc_info=True)
             raise ValueError("Invalid JSON response from AI model") from e
+
+    def _parse_itinerary_response(
+        self, response_text: str, destinations: list[str], origin: str | None
+    ) -> dict[str, dict[str, Any]]:
+        """Split a response to an itinerary prompt into answers per destination.
+
+        Args:
+            response_text (str): Raw response from the AI model
+            destinations (List[str]): The destinations that were asked for
+            origin (Optional[str]): The origin country
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Answers in the format of _parse_response by
+                destination, leaving out destinations without a valid answer
+        """
+        try:
+            response_data = json.loads(self._strip_code_fence(response_text))
+        except json.JSONDecodeError:
+            logger.error("Itinerary response is not valid JSON, possibly cut off")
+            return {}
+        if not isinstance(response_data, dict):
+            return {}
+
+        by_name = {key.casefold(): value for key, value in response_data.items()}
+        answers = {}
+        for destination in destinations:
+            entry = by_name.get(destination.casefold())
+            if not isinstance(entry, dict):
+                continue
+            entry = {
+                **entry,
+                "destination": destination,
+                "origin": origin or "any country",
+            }
+            try:
+                answers[destination] = self._parse_response(json.dumps(entry))
+            except ValueError:
+                logger.warning(f"Invalid answer for {destination} in itinerary")
+        return answers
+
+    def _parse_partial_response(
+        self, response_text: str, fields: list[str]
+    ) -> dict[str, Any]:
+        """Parse a response to a partial regeneration prompt.
+
+        Args:
+            response_text (str): Raw response from the AI model
+            fields (List[str]): Names of the fields that were requested
+
+        Returns:
+            Dict[str, Any]: The requested fields and nothing else
+
+        Raises:
+            ValueError: If the response is invalid JSON or lacks a requested field
+        """
+        try:
+            response_data = json.loads(self._strip_code_fence(response_text))
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse response as JSON: {response_text}")
+            raise ValueError("Invalid JSON response from AI model") from e
+
+        fresh = {}
+        for field in fields:
+            value = (
+                response_data.get(field) if isinstance(response_data, dict) else None
+            )
+            if value is None or isinstance(value, list) != (field in LIST_FIELDS):
+                logger.error(f"Missing or malformed field in response: {field}")
+                raise ValueError(f"Missing required field: {field}")
+            fresh[field] = value
+        return fresh
+
+    def _parse_followup_response(self, response_text: str) -> dict[str, Any]:
+        """Parse a response to a follow-up prompt.
+
+        Unknown keys and malformed values are dropped, so the earlier answer
+        stands for those fields.
+
+        Args:
+            response_text (str): Raw response from the AI model
+
+        Returns:
+            Dict[str, Any]: The changed fields, possibly none
+
+        Raises:
+            ValueError: If the response is not a JSON object
+        """
+        try:
+            response_data = json.loads(self._strip_code_fence(response_text))
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse response as JSON: {response_text}")
+            raise ValueError("Invalid JSON response from AI model") from e
+        if not isinstance(response_data, dict):
+            raise ValueError("Invalid JSON response from AI model")
+
+        changed = {}
+        for field, value in response_data.items():
+            if field not in GENERATED_FIELDS or value is None:
+                logger.warning(f"Ignoring unexpected field in follow-up: {field}")
+            elif isinstance(value, list) != (field in LIST_FIELDS):
+                logger.warning(f"Ignoring malformed field in follow-up: {field}")
+            else:
+                changed[field] = value
+        return changed
+
+    @staticmethod
+    def _strip_code_fence(response_text: str) -> str:
+        """Remove a Markdown code fence around a JSON response."""
+        cleaned_text = response_text.strip()
+        if cleaned_text.startswith("```json"):
+            cleaned_text = cleaned_text[7:]
+        if cleaned_text.endswith("```"):
+            cleaned_text = cleaned_text[:-3]
+        return cleaned_text.strip()
@@ -1,10 +1,22 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import Row, Table, select
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
 from app.core.logging_config import setup_logging
 from app.models import TravelQuery, TravelResponse
-from app.schemas.travel_query import TravelQueryCreate
+from app.schemas.travel_query import HISTORY_FIELDS, TravelQueryCreate
+from app.services.partition_service import (
+    DEFAULT_PARTITION,
+    list_partitions,
+    partition_table,
+)
+from app.services.stats_service import StatsService
+from app.utils.dates import as_utc
 
 logger = setup_logging()
+settings = get_settings()
 
 
 class HistoryService:
@@ -68,6 +80,74 @@ class HistoryService:
             logger.error(f"Error retrieving history: {str(e)}", exc_info=True)
             raise
 
+    def list_queries(
+        self,
+        fields: tuple[str, ...] = HISTORY_FIELDS,
+        limit: int | None = None,
+        since: datetime | None = None,
+    ) -> list[Row]:
+        """Retrieve stored travel queries, newest first.
+
+        When the table is partitioned by month, partitions are read newest first
+        until ``limit`` queries are found, and months before ``since`` are not
+        read at all, so neither the scan nor the sort covers the whole table.
+
+        Args:
+            fields (Tuple[str, ...]): Columns to select. Defaults to all of HISTORY_FIELDS.
+            limit (Optional[int]): Maximum number of queries to return. Defaults to all.
+            since (Optional[datetime]): Only return queries created at or after this time
+
+        Returns:
+            List[Row]: Rows with the selected columns (and created_at) as attributes
+        """
+        if since is not None:
+            since = as_utc(since)
+        columns = fields if "created_at" in fields else (*fields, "created_at")
+        partitions = list_partitions(self.db) if settings.PARTITIONING_ENABLED else []
+        if not partitions:
+            return self._newest(TravelQuery.__table__, columns, limit, since)
+
+        rows = []
+        for partition in reversed(partitions):
+            if limit is not None and len(rows) >= limit:
+                break
+            if since is not None and partition.end <= since:
+                break
+            remaining = None if limit is None else limit - len(rows)
+            rows.extend(
+                self._newest(partition_table(partition.name), columns, remaining, since)
+            )
+        logger.debug(f"Read {len(rows)} queries from {len(partitions)} partitions")
+
+        # Rows outside every month can sort anywhere among the others
+        outliers = self._newest(
+            partition_table(DEFAULT_PARTITION), columns, limit, since
+        )
+        if outliers:
+            rows = sorted(
+                rows + outliers,
+                key=lambda row: (row.created_at is not None, str(row.created_at)),
+                reverse=True,
+            )[:limit]
+        return rows
+
+    def _newest(
+        self,
+        table: Table,
+        columns: tuple[str, ...],
+        limit: int | None,
+        since: datetime | None,
+    ) -> list[Row]:
+        """Select the newest rows of one table."""
+        statement = select(*(table.c[column] for column in columns)).order_by(
+            table.c.created_at.desc()
+        )
+        if since is not None:
+            statement = statement.where(table.c.created_at >= since)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return self.db.execute(statement).all()
+
     async def get_query_by_id(self, db: Session, query_id: int) -> TravelQuery | None:
         """Get a specific travel query by ID."""
         try:
@@ -106,8 +186,10 @@ class HistoryService:
                 destination=query.destination,
                 origin=query.origin,
                 response=response.dict(),
+                created_at=datetime.now(UTC),
             )
             db.add(db_query)
+            StatsService(db).add([db_query])
             db.commit()
             db.refresh(db_query)
             logger.info(f"Successfully created query with ID: {db_query.id}")
@@ -162,6 +244,7 @@ class HistoryService:
                 return False
 
             db.delete(query)
+            StatsService(db).remove([query])
             db.commit()
             logger.info(f"Successfully deleted query with ID: {query_id}")
             return True
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.models import IdempotencyKey
+
+logger = setup_logging()
+settings = get_settings()
+
+# Longest idempotency key accepted from a client
+MAX_KEY_LENGTH = 255
+# Seconds between two checks of a key claimed by a running request, at most
+_MAX_POLL_INTERVAL = 0.5
+# Seconds between two purges of expired keys
+_PURGE_INTERVAL = 60
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused for a different request."""
+
+
+def fingerprint(payload: dict[str, Any]) -> str:
+    """Return a digest identifying a request body, whatever its key order."""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _row_key(client: str, key: str) -> str:
+    """Primary key of the row of a client's idempotency key."""
+    return hashlib.sha256(f"{client}\n{key}".encode()).hexdigest()
+
+
+class IdempotencyService:
+    """Results of requests by idempotency key, so retries are answered once.
+
+    Keys are kept in the ``idempotency_keys`` table, shared by all workers. The
+    first request with a key claims it by inserting its row and runs; requests
+    repeating the key while it runs wait for its result, whichever worker they
+    reach, and later ones get the stored result. Results are kept for
+    ``ttl_seconds``. A request that fails frees its key, and one waiting request
+    runs in its place, so a retry after a timeout still gets an answer. A key
+    claimed longer than ``claim_timeout`` seconds ago without a result belongs
+    to a worker that died, and is freed as well.
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker, ttl_seconds: float, claim_timeout: float
+    ):
+        """Initialize the service.
+
+        Args:
+            session_factory (sessionmaker): Factory used to open database sessions
+            ttl_seconds (float): Seconds a result is kept after it was stored
+            claim_timeout (float): Seconds after which a claim without a result
+                is considered abandoned
+        """
+        self.session_factory = session_factory
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.claim_timeout = timedelta(seconds=claim_timeout)
+        self._purged = 0.0
+
+    @classmethod
+    def from_settings(cls, session_factory: sessionmaker) -> "IdempotencyService":
+        """Create a service configured from the IDEMPOTENCY_* settings.
+
+        Claims are kept for the longest a request may run, plus a margin.
+        """
+        return cls(
+            session_factory,
+            settings.IDEMPOTENCY_TTL_SECONDS,
+            settings.QUERY_DEADLINE_MAX_SECONDS + 30,
+        )
+
+    async def claim(self, client: str, key: str, fingerprint: str) -> Any | None:
+        """Claim a key for a request, or get the result of an earlier request.
+
+        Args:
+            client (str): Client the key is scoped to
+            key (str): The idempotency key
+            fingerprint (str): Fingerprint of the request body
+
+        Returns:
+            Optional[Any]: The result of an earlier request with the key, or None
+                if the caller claimed the key and must call complete or abandon
+
+        Raises:
+            IdempotencyConflict: If the key was used with a different body
+        """
+        row_key = _row_key(client, key)
+        delay = 0.05
+        waited = False
+        while True:
+            outcome, result = await asyncio.to_thread(
+                self._try_claim, row_key, fingerprint
+            )
+            if outcome == "claimed":
+                metrics.increment("idempotency_requests_total", outcome="new")
+                return None
+            if outcome == "conflict":
+                metrics.increment("idempotency_requests_total", outcome="conflict")
+                raise IdempotencyConflict(
+                    "Idempotency key was already used for a different request"
+                )
+            if outcome == "replayed":
+                metrics.increment("idempotency_requests_total", outcome="replayed")
+                return result
+            if outcome == "running":
+                if not waited:
+                    logger.debug("Waiting for the running request with the same key")
+                    metrics.increment("idempotency_waits_total")
+                    waited = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _MAX_POLL_INTERVAL)
+            # "freed": the key was released in between, try to claim it again
+
+    def complete(self, client: str, key: str, result: Any) -> None:
+        """Store the result of a claimed key for later requests.
+
+        Args:
+            client (str): Client the key is scoped to
+            key (str): The claimed idempotency key
+            result (Any): JSON-serializable result to replay for the key, not None
+        """
+        now = datetime.now(UTC)
+        with self.session_factory() as db:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == _row_key(client, key))
+                .values(result=result, completed_at=now)
+            )
+            if time.monotonic() - self._purged > _PURGE_INTERVAL:
+                self._purged = time.monotonic()
+                purged = db.execute(delete(IdempotencyKey).where(self._expired(now)))
+                logger.debug(f"Purged {purged.rowcount} expired idempotency keys")
+            db.commit()
+
+    def abandon(self, client: str, key: str) -> None:
+        """Free a claimed key after its request failed."""
+        with self.session_factory() as db:
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == _row_key(client, key),
+                    IdempotencyKey.completed_at.is_(None),
+                )
+            )
+            db.commit()
+
+    def _expired(self, now: datetime):
+        """Condition matching expired results and abandoned claims."""
+        return or_(
+            IdempotencyKey.completed_at < now - self.ttl,
+            and_(
+                IdempotencyKey.completed_at.is_(None),
+                IdempotencyKey.created_at < now - self.claim_timeout,
+            ),
+        )
+
+    def _try_claim(self, row_key: str, fingerprint: str) -> tuple[str, Any]:
+        """Insert the row of a key, or report what holds it.
+
+        Returns:
+            Tuple[str, Any]: "claimed", "conflict", "replayed" with the stored
+                result, "running", or "freed" if the row vanished meanwhile
+        """
+        now = datetime.now(UTC)
+        with self.session_factory() as db:
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == row_key, self._expired(now)
+                )
+            )
+            db.add(IdempotencyKey(key=row_key, fingerprint=fingerprint, created_at=now))
+            try:
+                db.commit()
+                return "claimed", None
+            except IntegrityError:
+                db.rollback()
+            row = db.get(IdempotencyKey, row_key)
+            if row is None:
+                return "freed", None
+            if row.fingerprint != fingerprint:
+                return "conflict", None
+            if row.completed_at is not None:
+                return "replayed", row.result
+            return "running", None
@@ -0,0 +1,635 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+from collections.abc import Callable
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from functools import cache
+from pathlib import Path
+from typing import NamedTuple
+
+from sqlalchemy import Column, MetaData, Table, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.models import CorridorStat, TravelQuery
+from app.schemas.partition import PartitionReport
+from app.services.retention_service import archive_record
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = setup_logging()
+settings = get_settings()
+
+PARENT_TABLE = TravelQuery.__tablename__
+# Catch-all partition for rows outside every monthly range
+DEFAULT_PARTITION = f"{PARENT_TABLE}_pdefault"
+_PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})(\d{{2}})$")
+_COLUMNS = [column.name for column in TravelQuery.__table__.columns]
+# Key of the PostgreSQL advisory lock serializing partition DDL
+_ADVISORY_LOCK_KEY = 0x7472_6176
+# Key of the PostgreSQL advisory lock held for a whole maintenance run
+_MAINTENANCE_LOCK_KEY = _ADVISORY_LOCK_KEY + 1
+
+
+class Partition(NamedTuple):
+    """A monthly partition, holding the queries created in [start, end)."""
+
+    name: str
+    start: datetime
+    end: datetime
+
+
+def month_partition(moment: datetime) -> Partition:
+    """Return the partition holding queries created at ``moment``."""
+    start = datetime(moment.year, moment.month, 1, tzinfo=UTC)
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return Partition(f"{PARENT_TABLE}_p{start:%Y%m}", start, end)
+
+
+@cache
+def partition_table(name: str) -> Table:
+    """Table object for one partition, with the columns of travel_queries."""
+    return TravelQuery.__table__.to_metadata(MetaData(), name=name)
+
+
+def is_partitioned(db: Session) -> bool:
+    """Check whether travel_queries is split into monthly partitions.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        bool: True for a partitioned PostgreSQL table or a SQLite partition view
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        kind = db.scalar(
+            text("SELECT type FROM sqlite_master WHERE name = :name"),
+            {"name": PARENT_TABLE},
+        )
+        return kind == "view"
+    if dialect == "postgresql":
+        kind = db.scalar(
+            text("SELECT relkind FROM pg_class WHERE relname = :name"),
+            {"name": PARENT_TABLE},
+        )
+        return kind == "p"
+    return False
+
+
+def list_partitions(db: Session) -> list[Partition]:
+    """List the monthly partitions of travel_queries, oldest first.
+
+    The default partition is not included.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        List[Partition]: The monthly partitions, empty if the table is not partitioned
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        names = db.scalars(
+            text("SELECT name FROM sqlite_master WHERE type = 'table'")
+        ).all()
+    elif dialect == "postgresql":
+        names = db.scalars(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "WHERE parent.relname = :name"
+            ),
+            {"name": PARENT_TABLE},
+        ).all()
+    else:
+        return []
+    partitions = [
+        month_partition(datetime(int(match[1]), int(match[2]), 1, tzinfo=UTC))
+        for match in map(_PARTITION_NAME.match, names)
+        if match
+    ]
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def max_query_id(db: Session) -> int | None:
+    """Return the highest travel query ID.
+
+    On a partitioned table the maximum is taken per partition, through the
+    primary key index of each, instead of scanning the SQLite view.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        Optional[int]: The highest ID, or None if there are no queries
+    """
+    partitions = list_partitions(db)
+    if not partitions:
+        return db.scalar(select(func.max(TravelQuery.id)))
+    tables = [partition.name for partition in partitions] + [DEFAULT_PARTITION]
+    highest = [
+        db.scalar(select(func.max(partition_table(name).c.id))) for name in tables
+    ]
+    return max((value for value in highest if value is not None), default=None)
+
+
+class PartitionService:
+    """Service managing monthly partitions of the travel queries table.
+
+    On PostgreSQL, travel_queries becomes a declaratively partitioned table with
+    one partition per month of ``created_at``. SQLite has no partitioning, so
+    every month gets a table of its own and travel_queries becomes a view over
+    all of them, with triggers routing inserts, updates and deletes. Either way
+    the application keeps reading and writing travel_queries, while whole months
+    can be dropped at once and history listings only scan the months they need.
+    Rows outside every month go to a default partition.
+
+    Partitions for the current month and the next ``premake_months`` months are
+    created ahead of time. Months older than RETENTION_MAX_AGE_DAYS are dropped
+    whole, after archiving their rows like the retention job does, and their
+    days are dropped from the corridor_stats rollup along with them. A run holds
+    a lock from listing the partitions to dropping them, so when every worker
+    runs the maintenance job only one of them archives and drops each month.
+
+    Partitioned tables cannot hand out IDs on SQLite, so queries get their IDs
+    from the ``id_allocations`` table while partitioning is enabled.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        premake_months: int | None = None,
+        max_age_days: int | None = None,
+        archive_dir: str | None = None,
+    ):
+        """Initialize the partition service.
+
+        Args:
+            engine (Engine): Engine of the primary database
+            premake_months (Optional[int]): Months created ahead of the current one.
+                Defaults to PARTITION_PREMAKE_MONTHS.
+            max_age_days (Optional[int]): Age in days after which whole months are
+                dropped, 0 keeps all months. Defaults to RETENTION_MAX_AGE_DAYS.
+            archive_dir (Optional[str]): Directory for archive files, empty to drop
+                without archiving. Defaults to RETENTION_ARCHIVE_DIR if RETENTION_ARCHIVE is set.
+
+        Raises:
+            ValueError: If the database is neither PostgreSQL nor SQLite
+        """
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        if self.dialect not in ("postgresql", "sqlite"):
+            raise ValueError(
+                f"Partitioning is not supported on {self.dialect}, "
+                "use PostgreSQL or SQLite"
+            )
+        self.premake_months = (
+            settings.PARTITION_PREMAKE_MONTHS
+            if premake_months is None
+            else premake_months
+        )
+        self.max_age_days = (
+            settings.RETENTION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        )
+        if archive_dir is None and settings.RETENTION_ARCHIVE:
+            archive_dir = settings.RETENTION_ARCHIVE_DIR
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+
+    def report(self) -> PartitionReport:
+        """Report whether the table is partitioned and into which months."""
+        with Session(self.engine) as db:
+            return PartitionReport(
+                partitioned=is_partitioned(db),
+                partitions=[partition.name for partition in list_partitions(db)],
+            )
+
+    def migrate(self, now: datetime | None = None) -> PartitionReport:
+        """Convert an unpartitioned travel_queries table into monthly partitions.
+
+        Existing rows are copied into partitions for every month from the oldest
+        query on, in one transaction. Does nothing if the table is partitioned.
+
+        Args:
+            now (Optional[datetime]): Current time. Defaults to now.
+
+        Returns:
+            PartitionReport: Report including the number of moved queries
+        """
+        now = now or datetime.now(UTC)
+        with Session(self.engine) as db:
+            if is_partitioned(db):
+                logger.info(f"{PARENT_TABLE} is already partitioned")
+                return self.report()
+            rows, oldest = db.execute(
+                select(func.count(TravelQuery.id), func.min(TravelQuery.created_at))
+            ).one()
+
+        partitions = self._months(oldest or now, now)
+        logger.info(f"Moving {rows} queries into {len(partitions)} monthly partitions")
+        if self.dialect == "sqlite":
+            self._run_sqlite(self._sqlite_migration(partitions))
+        else:
+            self._run_postgres(self._postgres_migration(partitions))
+
+        report = self.report()
+        report.created = [partition.name for partition in partitions]
+        report.migrated_rows = rows
+        logger.info(f"Partitioned {PARENT_TABLE}: {rows} queries moved")
+        return report
+
+    def maintain(self, now: datetime | None = None) -> PartitionReport:
+        """Create upcoming monthly partitions and drop expired ones.
+
+        Args:
+            now (Optional[datetime]): Current time. Defaults to now.
+
+        Returns:
+            PartitionReport: Report of the created and dropped partitions
+        """
+        now = now or datetime.now(UTC)
+        with self._maintenance_lock() as acquired:
+            if not acquired:
+                logger.info("Partition maintenance already in progress elsewhere")
+                return self.report()
+            return self._maintain(now)
+
+    def _maintain(self, now: datetime) -> PartitionReport:
+        """Create and drop partitions, holding the maintenance lock."""
+        with Session(self.engine) as db:
+            if not is_partitioned(db):
+                logger.warning(
+                    f"{PARENT_TABLE} is not partitioned, "
+                    "run python -m app.cli.partitions migrate"
+                )
+                return PartitionReport(partitioned=False)
+            existing = list_partitions(db)
+
+        report = PartitionReport(partitioned=True)
+        names = {partition.name for partition in existing}
+        created = [p for p in self._months(now, now) if p.name not in names]
+        expired = []
+        if self.max_age_days > 0:
+            cutoff = now - timedelta(days=self.max_age_days)
+            expired = [p for p in existing if p.end <= cutoff]
+        if expired and self.archive_dir is not None:
+            report.archive_path, report.dropped_rows = self._archive(expired)
+        elif expired:
+            report.dropped_rows = self._count(expired)
+
+        if created or expired:
+            if self.dialect == "sqlite":
+                kept = [p for p in existing if p not in expired] + created
+                self._run_sqlite(
+                    [
+                        *(s for p in created for s in self._sqlite_create(p.name)),
+                        *(f"DROP TABLE IF EXISTS {p.name}" for p in expired),
+                        *(_forget_stats(p) for p in expired),
+                        *self._sqlite_view(sorted(kept, key=lambda p: p.start)),
+                    ]
+                )
+            else:
+                self._run_postgres(
+                    [
+                        *(self._postgres_create(p) for p in created),
+                        *(f"DROP TABLE IF EXISTS {p.name}" for p in expired),
+                        *(_forget_stats(p) for p in expired),
+                    ]
+                )
+
+        report.created = [partition.name for partition in created]
+        report.dropped = [partition.name for partition in expired]
+        report.partitions = self.report().partitions
+        if created or expired:
+            logger.info(
+                f"Partition maintenance created {len(created)} and dropped "
+                f"{len(expired)} partitions ({report.dropped_rows} queries)"
+            )
+        return report
+
+    @contextmanager
+    def _maintenance_lock(self):
+        """Make sure only one process maintains the partitions at a time.
+
+        Every worker runs the maintenance job, and expired partitions must be
+        archived and dropped once. PostgreSQL serializes runs with a session
+        advisory lock, SQLite with a file lock next to the database file.
+
+        Yields:
+            bool: True if the lock was acquired, False if another run holds it
+        """
+        if self.dialect == "postgresql":
+            with self.engine.connect() as connection:
+                acquired = connection.scalar(
+                    text("SELECT pg_try_advisory_lock(:key)"),
+                    {"key": _MAINTENANCE_LOCK_KEY},
+                )
+                # The lock belongs to the session, not to this transaction
+                connection.commit()
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        connection.execute(
+                            text("SELECT pg_advisory_unlock(:key)"),
+                            {"key": _MAINTENANCE_LOCK_KEY},
+                        )
+                        connection.commit()
+            return
+
+        database = self.engine.url.database
+        if fcntl is None or not database or database == ":memory:":
+            yield True
+            return
+        lock_path = Path(database).with_name(f".{Path(database).name}.partitions.lock")
+        with open(lock_path, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add_columns(self, columns: list[Column]) -> None:
+        """Add new model columns to a partitioned travel_queries table.
+
+        On PostgreSQL the columns are added to the parent table, which adds them
+        to every partition. On SQLite they are added to every partition table and
+        the view and its triggers are recreated, in one transaction.
+
+        Args:
+            columns (List[Column]): Nullable columns of TravelQuery to add
+        """
+        # Imported here since schema_service builds on this module
+        from app.services.schema_service import add_column_statement
+
+        dialect = self.engine.dialect
+        if self.dialect == "postgresql":
+            self._run_postgres(
+                [add_column_statement(PARENT_TABLE, c, dialect) for c in columns]
+            )
+            return
+        with Session(self.engine) as db:
+            partitions = list_partitions(db)
+        tables = [p.name for p in partitions] + [DEFAULT_PARTITION]
+        self._run_sqlite(
+            [
+                *(add_column_statement(t, c, dialect) for t in tables for c in columns),
+                *self._sqlite_view(partitions),
+            ]
+        )
+
+    def _months(self, first: datetime, now: datetime) -> list[Partition]:
+        """Partitions from the month of ``first`` to premake_months after now."""
+        partitions = [month_partition(first)]
+        last = month_partition(now)
+        for _ in range(self.premake_months):
+            last = month_partition(last.end)
+        while partitions[-1].start < last.start:
+            partitions.append(month_partition(partitions[-1].end))
+        return partitions
+
+    def _count(self, partitions: list[Partition]) -> int:
+        """Count the queries stored in some partitions."""
+        with Session(self.engine) as db:
+            return sum(
+                db.scalar(select(func.count()).select_from(partition_table(p.name)))
+                for p in partitions
+            )
+
+    def _archive(self, partitions: list[Partition]) -> tuple[str, int]:
+        """Write the queries of some partitions to a gzip-compressed NDJSON file.
+
+        Returns:
+            Tuple[str, int]: Path of the archive file and number of archived queries
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        archive_path = self.archive_dir / (
+            f"{PARENT_TABLE}-{datetime.now(UTC):%Y%m%dT%H%M%S}-{os.getpid()}.ndjson.gz"
+        )
+        rows = 0
+        with (
+            Session(self.engine) as db,
+            gzip.open(archive_path, "at", encoding="utf-8") as archive,
+        ):
+            for partition in partitions:
+                table = partition_table(partition.name)
+                for row in db.execute(
+                    select(table).order_by(table.c.created_at, table.c.id)
+                ):
+                    archive.write(json.dumps(archive_record(row)) + "\n")
+                    rows += 1
+            # Make sure the rows are on disk before they leave the database
+            archive.flush()
+            os.fsync(archive.fileno())
+        return str(archive_path), rows
+
+    def _run_sqlite(self, statements: list[str]) -> None:
+        """Run DDL statements on SQLite in one immediate transaction."""
+        connection = self.engine.raw_connection()
+        try:
+            script = ";\n".join(["BEGIN IMMEDIATE", *statements, "COMMIT"])
+            try:
+                connection.driver_connection.executescript(script + ";")
+            except Exception:
+                if connection.driver_connection.in_transaction:
+                    connection.driver_connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.close()
+
+    def _run_postgres(self, statements: list[str]) -> None:
+        """Run DDL statements on PostgreSQL in one transaction, one process at a time."""
+        with self.engine.begin() as connection:
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}
+            )
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+
+    def _sqlite_create(self, name: str) -> list[str]:
+        """Statements creating a partition table and its indexes on SQLite."""
+        table = partition_table(name)
+        create = str(CreateTable(table).compile(dialect=self.engine.dialect)).strip()
+        statements = [create.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1)]
+        for index in table.indexes:
+            statements.append(
+                str(CreateIndex(index).compile(dialect=self.engine.dialect)).replace(
+                    "CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1
+                )
+            )
+        return statements
+
+    def _sqlite_migration(self, partitions: list[Partition]) -> list[str]:
+        """Statements moving the travel_queries table into partition tables."""
+        legacy = f"{PARENT_TABLE}_unpartitioned"
+        columns = ", ".join(f'"{column}"' for column in _COLUMNS)
+        statements = [f"ALTER TABLE {PARENT_TABLE} RENAME TO {legacy}"]
+        for name in [p.name for p in partitions] + [DEFAULT_PARTITION]:
+            statements.extend(self._sqlite_create(name))
+        for partition in partitions:
+            statements.append(
+                f"INSERT INTO {partition.name} ({columns}) "
+                f"SELECT {columns} FROM {legacy} WHERE {_in_range('created_at', partition)}"
+            )
+        statements.append(
+            f"INSERT INTO {DEFAULT_PARTITION} ({columns}) "
+            f"SELECT {columns} FROM {legacy} WHERE created_at IS NULL OR NOT ("
+            + " OR ".join(_in_range("created_at", p) for p in partitions)
+            + ")"
+        )
+        statements.append(f"DROP TABLE {legacy}")
+        return statements + self._sqlite_view(partitions)
+
+    def _sqlite_view(self, partitions: list[Partition]) -> list[str]:
+        """Statements (re)creating the travel_queries view and its triggers.
+
+        Inserts are routed by ``created_at``; rows must carry an allocated ID,
+        because the partitions cannot hand out IDs unique across all of them.
+        Updates do not move rows between partitions, so ``created_at`` is kept.
+        """
+        tables = [p.name for p in partitions] + [DEFAULT_PARTITION]
+        columns = ", ".join(f'"{column}"' for column in _COLUMNS)
+        created_at = "COALESCE(NEW.created_at, CURRENT_TIMESTAMP)"
+        values = ", ".join(
+            created_at if column == "created_at" else f'NEW."{column}"'
+            for column in _COLUMNS
+        )
+        routes = [
+            "SELECT RAISE(ABORT, 'travel_queries rows need an allocated id') "
+            "WHERE NEW.id IS NULL"
+        ]
+        for partition in partitions:
+            routes.append(
+                f"INSERT INTO {partition.name} ({columns}) SELECT {values} "
+                f"WHERE {_in_range(created_at, partition)}"
+            )
+        routes.append(
+            f"INSERT INTO {DEFAULT_PARTITION} ({columns}) SELECT {values}"
+            + (
+                " WHERE NOT ("
+                + " OR ".join(_in_range(created_at, p) for p in partitions)
+                + ")"
+                if partitions
+                else ""
+            )
+        )
+        assignments = ", ".join(
+            f'"{column}" = NEW."{column}"'
+            for column in _COLUMNS
+            if column not in ("id", "created_at")
+        )
+        updates = [
+            f"UPDATE {table} SET {assignments} WHERE id = OLD.id" for table in tables
+        ]
+        deletes = [f"DELETE FROM {table} WHERE id = OLD.id" for table in tables]
+        return [
+            f"DROP VIEW IF EXISTS {PARENT_TABLE}",
+            f"CREATE VIEW {PARENT_TABLE} AS "
+            + " UNION ALL ".join(f"SELECT {columns} FROM {table}" for table in tables),
+            _sqlite_trigger("insert", routes),
+            _sqlite_trigger("update", updates),
+            _sqlite_trigger("delete", deletes),
+        ]
+
+    def _postgres_create(self, partition: Partition) -> str:
+        """Statement creating a monthly partition on PostgreSQL."""
+        return (
+            f"CREATE TABLE IF NOT EXISTS {partition.name} PARTITION OF {PARENT_TABLE} "
+            f"(PRIMARY KEY (id)) FOR VALUES FROM ('{partition.start.isoformat()}') "
+            f"TO ('{partition.end.isoformat()}')"
+        )
+
+    def _postgres_migration(self, partitions: list[Partition]) -> list[str]:
+        """Statements moving the travel_queries table into a partitioned table.
+
+        The primary key of a partitioned table would have to include
+        ``created_at``, so ``id`` is unique per partition instead, which IDs
+        allocated from ``id_allocations`` guarantee across partitions.
+        """
+        partitioned = f"{PARENT_TABLE}_partitioned"
+        columns = ", ".join(f'"{column}"' for column in _COLUMNS)
+        return [
+            f"CREATE TABLE {partitioned} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (created_at)",
+            *(
+                self._postgres_create(p).replace(
+                    f"PARTITION OF {PARENT_TABLE} ", f"PARTITION OF {partitioned} "
+                )
+                for p in partitions
+            ),
+            f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {partitioned} "
+            "(PRIMARY KEY (id)) DEFAULT",
+            f"INSERT INTO {partitioned} ({columns}) SELECT {columns} FROM {PARENT_TABLE}",
+            f"ALTER SEQUENCE IF EXISTS {PARENT_TABLE}_id_seq "
+            f"OWNED BY {partitioned}.id",
+            f"DROP TABLE {PARENT_TABLE}",
+            f"ALTER TABLE {partitioned} RENAME TO {PARENT_TABLE}",
+            f"CREATE INDEX ix_{PARENT_TABLE}_created_at ON {PARENT_TABLE} (created_at)",
+        ]
+
+
+def _in_range(expression: str, partition: Partition) -> str:
+    """SQL condition for a timestamp expression falling into a partition."""
+    return (
+        f"({expression} >= '{partition.start:%Y-%m-%d %H:%M:%S}' "
+        f"AND {expression} < '{partition.end:%Y-%m-%d %H:%M:%S}')"
+    )
+
+
+def _forget_stats(partition: Partition) -> str:
+    """SQL removing the corridor statistics of the days a partition covers."""
+    return (
+        f"DELETE FROM {CorridorStat.__tablename__} "
+        f"WHERE day >= '{partition.start:%Y-%m-%d}' AND day < '{partition.end:%Y-%m-%d}'"
+    )
+
+
+def _sqlite_trigger(event: str, statements: list[str]) -> str:
+    """Statement creating an INSTEAD OF trigger on the travel_queries view."""
+    body = "".join(f"{statement}; " for statement in statements)
+    return (
+        f"CREATE TRIGGER {PARENT_TABLE}_{event} INSTEAD OF {event.upper()} "
+        f"ON {PARENT_TABLE} BEGIN {body}END"
+    )
+
+
+async def run_partition_job(
+    engine: Engine, on_dropped: Callable[[datetime], None] | None = None
+) -> None:
+    """Maintain the monthly partitions every PARTITION_INTERVAL_SECONDS.
+
+    Args:
+        engine (Engine): Engine of the primary database
+        on_dropped (Optional[Callable[[datetime], None]]): Called after partitions
+            were dropped, with the moment before which no queries are left
+    """
+    service = PartitionService(engine)
+    logger.info(
+        f"Partition job started: {service.premake_months} months ahead, "
+        f"max age {service.max_age_days} days"
+    )
+    while True:
+        try:
+            now = datetime.now(UTC)
+            report = await asyncio.to_thread(service.maintain, now)
+            if report.dropped and on_dropped is not None:
+                # Every month ending before the cutoff is dropped
+                cutoff = now - timedelta(days=service.max_age_days)
+                on_dropped(month_partition(cutoff).start)
+        except Exception as e:
+            logger.error(f"Partition job failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(settings.PARTITION_INTERVAL_SECONDS)
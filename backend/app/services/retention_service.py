@@ -0,0 +1,285 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.models import TravelQuery
+from app.schemas.retention import RetentionReport
+from app.services.stats_service import StatsService
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = setup_logging()
+settings = get_settings()
+
+
+class RetentionService:
+    """Service enforcing the retention policy for stored travel queries.
+
+    Queries older than ``max_age_days`` and queries beyond the newest
+    ``max_rows`` are removed oldest first. Rows are selected through the
+    ``created_at`` index and removed in chunks of ``chunk_size`` rows, each in
+    its own short transaction, so the table is never locked for long. Removed
+    rows can be archived to gzip-compressed NDJSON files first.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        max_age_days: int | None = None,
+        max_rows: int | None = None,
+        chunk_size: int | None = None,
+        archive_dir: str | None = None,
+        on_removed: Callable[[list[int]], None] | None = None,
+    ):
+        """Initialize the retention service.
+
+        Args:
+            db (Session): Database session
+            max_age_days (Optional[int]): Maximum query age in days, 0 disables the limit.
+                Defaults to RETENTION_MAX_AGE_DAYS.
+            max_rows (Optional[int]): Maximum number of stored queries, 0 disables the limit.
+                Defaults to RETENTION_MAX_ROWS.
+            chunk_size (Optional[int]): Rows removed per transaction.
+                Defaults to RETENTION_CHUNK_SIZE.
+            archive_dir (Optional[str]): Directory for archive files, empty to delete
+                without archiving. Defaults to RETENTION_ARCHIVE_DIR if RETENTION_ARCHIVE is set.
+            on_removed (Optional[Callable[[List[int]], None]]): Called with the IDs
+                of every committed chunk of removed queries
+        """
+        self.db = db
+        self.max_age_days = (
+            settings.RETENTION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        )
+        self.max_rows = settings.RETENTION_MAX_ROWS if max_rows is None else max_rows
+        self.chunk_size = chunk_size or settings.RETENTION_CHUNK_SIZE
+        if archive_dir is None and settings.RETENTION_ARCHIVE:
+            archive_dir = settings.RETENTION_ARCHIVE_DIR
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.on_removed = on_removed
+
+    def report(self) -> RetentionReport:
+        """Report how many queries the retention policy would remove.
+
+        Returns:
+            RetentionReport: Table statistics and the number of eligible queries
+        """
+        total_rows, oldest, newest = self.db.execute(
+            select(
+                func.count(TravelQuery.id),
+                func.min(TravelQuery.created_at),
+                func.max(TravelQuery.created_at),
+            )
+        ).one()
+
+        expired_by_age = 0
+        if self.max_age_days > 0:
+            cutoff = datetime.now(UTC) - timedelta(days=self.max_age_days)
+            expired_by_age = self.db.scalar(
+                select(func.count(TravelQuery.id)).where(
+                    TravelQuery.created_at < cutoff
+                )
+            )
+        excess_rows = max(total_rows - self.max_rows, 0) if self.max_rows > 0 else 0
+
+        return RetentionReport(
+            total_rows=total_rows,
+            oldest=oldest,
+            newest=newest,
+            expired_by_age=expired_by_age,
+            excess_rows=excess_rows,
+            # Both limits remove the oldest rows first, so their union is the larger set
+            eligible=max(expired_by_age, excess_rows),
+        )
+
+    def enforce(self, dry_run: bool = False) -> RetentionReport:
+        """Remove the queries that fall outside the retention policy.
+
+        Args:
+            dry_run (bool): Only report what would be removed. Defaults to False.
+
+        Returns:
+            RetentionReport: Report including the number of removed queries
+        """
+        report = self.report()
+        report.dry_run = dry_run
+        if dry_run or report.eligible == 0:
+            logger.info(f"Retention: {report.eligible} queries eligible for removal")
+            return report
+
+        with self._run_lock() as acquired:
+            if not acquired:
+                logger.info("Retention run already in progress elsewhere, skipping")
+                return report
+
+            archive = None
+            if self.archive_dir is not None:
+                self.archive_dir.mkdir(parents=True, exist_ok=True)
+                archive_path = self.archive_dir / (
+                    f"travel_queries-{datetime.now(UTC):%Y%m%dT%H%M%S}-{os.getpid()}.ndjson.gz"
+                )
+                archive = gzip.open(archive_path, "at", encoding="utf-8")
+                report.archive_path = str(archive_path)
+
+            try:
+                remaining = report.eligible
+                while remaining > 0:
+                    removed = self._remove_chunk(
+                        min(self.chunk_size, remaining), archive
+                    )
+                    if removed == 0:
+                        break
+                    report.removed += removed
+                    remaining -= removed
+                    time.sleep(settings.RETENTION_CHUNK_PAUSE)
+            finally:
+                if archive is not None:
+                    archive.close()
+
+        logger.info(
+            f"Retention removed {report.removed} queries"
+            + (f", archived to {report.archive_path}" if report.archive_path else "")
+        )
+        return report
+
+    def _remove_chunk(self, limit: int, archive) -> int:
+        """Archive and delete the oldest ``limit`` queries in one transaction.
+
+        Args:
+            limit (int): Maximum number of queries to remove
+            archive: Open text file the removed rows are written to, or None
+
+        Returns:
+            int: Number of removed queries
+        """
+        oldest_first = (TravelQuery.created_at.asc(), TravelQuery.id.asc())
+        try:
+            if archive is None:
+                rows = self.db.execute(
+                    select(
+                        TravelQuery.id,
+                        TravelQuery.created_at,
+                        TravelQuery.origin,
+                        TravelQuery.destination,
+                        TravelQuery.generation_ms,
+                    )
+                    .order_by(*oldest_first)
+                    .limit(limit)
+                ).all()
+            else:
+                rows = self.db.scalars(
+                    select(TravelQuery).order_by(*oldest_first).limit(limit)
+                ).all()
+                for row in rows:
+                    archive.write(json.dumps(archive_record(row)) + "\n")
+                # Make sure the rows are on disk before they leave the database
+                archive.flush()
+                os.fsync(archive.fileno())
+
+            ids = [row.id for row in rows]
+            if ids:
+                self.db.execute(
+                    delete(TravelQuery)
+                    .where(TravelQuery.id.in_(ids))
+                    .execution_options(synchronize_session=False)
+                )
+                StatsService(self.db).remove(rows)
+            self.db.commit()
+            self.db.expunge_all()
+            if ids and self.on_removed is not None:
+                self.on_removed(ids)
+            logger.debug(f"Retention removed chunk of {len(ids)} queries")
+            return len(ids)
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error removing retention chunk: {str(e)}", exc_info=True)
+            raise
+
+    @contextmanager
+    def _run_lock(self):
+        """Make sure only one process enforces the policy at a time."""
+        if fcntl is None:
+            yield True
+            return
+        lock_dir = self.archive_dir or Path(".")
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        with open(lock_dir / ".retention.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def archive_record(query: TravelQuery) -> dict:
+    """Convert a travel query into an archive record.
+
+    Used for the archives of both the retention job and dropped partitions, so
+    that all archive files share one format.
+
+    Args:
+        query (TravelQuery): The query to archive
+
+    Returns:
+        dict: JSON-serializable record of the query
+    """
+    return {
+        "id": query.id,
+        "query": query.query,
+        "destination": query.destination,
+        "origin": query.origin,
+        "response": query.response,
+        "created_at": query.created_at.isoformat() if query.created_at else None,
+        "generation_ms": query.generation_ms,
+    }
+
+
+async def run_retention_job(
+    session_factory: sessionmaker,
+    on_removed: Callable[[list[int]], None] | None = None,
+) -> None:
+    """Enforce the retention policy every RETENTION_INTERVAL_SECONDS.
+
+    Args:
+        session_factory (sessionmaker): Factory used to open database sessions
+        on_removed (Optional[Callable[[List[int]], None]]): Called on the event
+            loop with the IDs of every chunk of removed queries
+    """
+    loop = asyncio.get_running_loop()
+
+    def removed(ids: list[int]) -> None:
+        loop.call_soon_threadsafe(on_removed, ids)
+
+    def enforce() -> RetentionReport:
+        with session_factory() as db:
+            return RetentionService(
+                db, on_removed=removed if on_removed is not None else None
+            ).enforce()
+
+    logger.info(
+        f"Retention job started: max age {settings.RETENTION_MAX_AGE_DAYS} days, "
+        f"max rows {settings.RETENTION_MAX_ROWS}"
+    )
+    while True:
+        try:
+            await asyncio.to_thread(enforce)
+        except Exception as e:
+            logger.error(f"Retention job failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
@@ -0,0 +1,115 @@
+from sqlalchemy import Column, inspect
+from sqlalchemy.engine import Dialect, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import setup_logging
+from app.models import TravelQuery
+from app.services.partition_service import (
+    PARENT_TABLE,
+    PartitionService,
+    is_partitioned,
+)
+
+logger = setup_logging()
+
+
+def add_column_statement(table: str, column: Column, dialect: Dialect) -> str:
+    """SQL adding a model column to an existing table.
+
+    Args:
+        table (str): Name of the table
+        column (Column): The column as declared on the model
+        dialect (Dialect): Dialect of the database
+
+    Returns:
+        str: The ALTER TABLE statement
+
+    Raises:
+        ValueError: If the column is not nullable, since existing rows have no value
+    """
+    if not column.nullable:
+        raise ValueError(f"Cannot add NOT NULL column {column.name} to {table}")
+    column_type = column.type.compile(dialect=dialect)
+    if_not_exists = "IF NOT EXISTS " if dialect.name == "postgresql" else ""
+    return (
+        f'ALTER TABLE {table} ADD COLUMN {if_not_exists}"{column.name}" {column_type}'
+    )
+
+
+def _missing_columns(engine: Engine) -> list:
+    """Columns of TravelQuery the travel_queries table does not have yet."""
+    existing = {column["name"] for column in inspect(engine).get_columns(PARENT_TABLE)}
+    return [c for c in TravelQuery.__table__.columns if c.name not in existing]
+
+
+def upgrade_schema(engine: Engine) -> list[str]:
+    """Bring tables created by an earlier version up to date with the models.
+
+    ``Base.metadata.create_all`` creates missing tables but never changes
+    existing ones. This adds the columns added to TravelQuery since, to the
+    plain table or to every partition, and the indexes of an unpartitioned
+    table, such as the ``created_at`` index retention deletes by. Partitions
+    get their indexes when they are created. It is idempotent and safe to run
+    from several processes at once: changes another process made first are
+    skipped.
+
+    Args:
+        engine (Engine): Engine of the primary database
+
+    Returns:
+        List[str]: Descriptions of the changes made, empty if none were needed
+    """
+    if not inspect(engine).has_table(PARENT_TABLE):
+        return []
+    with Session(engine) as db:
+        partitioned = is_partitioned(db)
+    changes = _add_columns(engine, partitioned)
+    if not partitioned:
+        changes += _add_indexes(engine)
+    return changes
+
+
+def _add_columns(engine: Engine, partitioned: bool) -> list[str]:
+    """Add the TravelQuery columns missing from travel_queries."""
+    missing = _missing_columns(engine)
+    if not missing:
+        return []
+    names = ", ".join(column.name for column in missing)
+    logger.info(f"Adding columns {names} to {PARENT_TABLE}")
+    try:
+        if partitioned:
+            PartitionService(engine).add_columns(missing)
+        else:
+            with engine.begin() as connection:
+                for column in missing:
+                    connection.exec_driver_sql(
+                        add_column_statement(PARENT_TABLE, column, engine.dialect)
+                    )
+    except DBAPIError:
+        # Another worker may have upgraded the table at the same time
+        if _missing_columns(engine):
+            raise
+        logger.info(f"Columns {names} were added by another process")
+        return []
+    return [f"added {PARENT_TABLE}.{column.name}" for column in missing]
+
+
+def _add_indexes(engine: Engine) -> list[str]:
+    """Create the TravelQuery indexes missing from an unpartitioned table."""
+    existing = {index["name"] for index in inspect(engine).get_indexes(PARENT_TABLE)}
+    changes = []
+    for index in sorted(TravelQuery.__table__.indexes, key=lambda i: i.name):
+        if index.name in existing:
+            continue
+        logger.info(f"Creating index {index.name}, this may take a while")
+        try:
+            index.create(engine, checkfirst=True)
+        except DBAPIError:
+            names = {i["name"] for i in inspect(engine).get_indexes(PARENT_TABLE)}
+            if index.name not in names:
+                raise
+            logger.info(f"Index {index.name} was created by another process")
+            continue
+        changes.append(f"created index {index.name}")
+    return changes
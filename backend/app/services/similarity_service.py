@@ -0,0 +1,578 @@
+import asyncio
+import json
+import os
+import re
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.models import TravelQuery
+from app.utils.gazetteer import get_gazetteer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = setup_logging()
+settings = get_settings()
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_NGRAM_SIZES = (3, 4, 5)
+# Function words that say nothing about what a travel question asks
+_STOP_WORDS = frozenset(
+    """a an and any are as at be bring by can could do does for from get go going
+    how i if in is it me my need needed of on or right should the this to traveling
+    travelling travel trip visiting was we what when where which will with would you
+    your now""".split()
+)
+
+
+def _features(text: str) -> list[str]:
+    """Character n-grams of each word, padded with spaces, plus the words themselves.
+
+    Place names are left out: queries are only compared within one corridor,
+    where they carry no information but would dominate the similarity.
+    """
+    features = []
+    for word in _WORD_RE.findall(get_gazetteer().strip_places(text).lower()):
+        if word in _STOP_WORDS:
+            continue
+        features.append(word)
+        padded = f" {word} "
+        for size in _NGRAM_SIZES:
+            features.extend(padded[i : i + size] for i in range(len(padded) - size + 1))
+    return features
+
+
+def vectorize(texts: list[str], dimensions: int) -> np.ndarray:
+    """Turn texts into sublinear term-frequency vectors of hashed features.
+
+    Features are hashed with CRC32, which unlike ``hash()`` is stable across
+    processes, so vectors stay valid when the index is saved and reloaded.
+
+    Args:
+        texts (List[str]): Texts to vectorize
+        dimensions (int): Number of hash buckets
+
+    Returns:
+        np.ndarray: Float32 matrix of shape ``(len(texts), dimensions)``
+    """
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        buckets = [zlib.crc32(f.encode()) % dimensions for f in _features(text)]
+        if buckets:
+            counts = np.bincount(buckets, minlength=dimensions)
+            matrix[row] = np.log1p(counts)
+    return matrix
+
+
+def partition_key(origin: str | None, destination: str) -> str:
+    """Key of the index partition holding queries for a travel corridor."""
+    return f"{(origin or '').strip().lower()}|{destination.strip().lower()}"
+
+
+class SimilarMatch(NamedTuple):
+    """A stored answer whose query is similar to a new one."""
+
+    query_id: int
+    query: str
+    score: float
+    answer: dict[str, Any]
+
+
+class _Partition:
+    """Stored queries of one travel corridor, oldest first."""
+
+    __slots__ = ("vectors", "ids", "queries", "created", "answers")
+
+    def __init__(self, dimensions: int):
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.ids: list[int] = []
+        self.queries: list[str] = []
+        self.created: list[float] = []
+        self.answers: list[dict[str, Any]] = []
+
+
+class SimilarityService:
+    """Reuse answers to earlier queries that are paraphrases of a new one.
+
+    Queries are embedded locally as hashed character n-gram TF-IDF vectors and
+    kept in one partition per (origin, destination) pair, so only queries about
+    the same corridor are compared. Term frequencies are stored and weighted
+    with the current IDF at scoring time, which keeps stored vectors valid as
+    the vocabulary grows. All stored queries of a partition are scored in one
+    matrix product. Answers older than ``max_age_hours`` are never reused.
+
+    Every worker process saves its index to its own file next to ``path`` and
+    loading merges the files of all workers, keeping only queries that are still
+    in the database, so deletions made by other processes are not brought back.
+    The loading worker saves the merged index to its own file and deletes the
+    files it merged, so restarts do not leave files behind.
+    Queries deleted by this process are removed with :meth:`remove` and
+    :meth:`remove_created_before`.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_age_hours: float,
+        dimensions: int = 4096,
+        max_per_partition: int = 500,
+        path: str | None = None,
+    ):
+        """Initialize an empty index.
+
+        Args:
+            threshold (float): Minimum cosine similarity for reusing an answer
+            max_age_hours (float): Maximum age of a reused answer in hours
+            dimensions (int): Number of hash buckets per vector. Defaults to 4096.
+            max_per_partition (int): Queries kept per corridor. Defaults to 500.
+            path (Optional[str]): File the index is saved to and loaded from
+        """
+        self.threshold = threshold
+        self.max_age = max_age_hours * 3600
+        self.dimensions = dimensions
+        self.max_per_partition = max_per_partition
+        self.path = Path(path) if path else None
+        self._reset()
+
+    @classmethod
+    def from_settings(cls) -> "SimilarityService":
+        """Create an index configured from the application settings."""
+        return cls(
+            threshold=settings.SIMILARITY_THRESHOLD,
+            max_age_hours=settings.SIMILARITY_MAX_AGE_HOURS,
+            dimensions=settings.SIMILARITY_DIMENSIONS,
+            max_per_partition=settings.SIMILARITY_MAX_PER_PARTITION,
+            path=settings.SIMILARITY_INDEX_PATH,
+        )
+
+    def _reset(self) -> None:
+        """Empty the index."""
+        self._partitions: dict[str, _Partition] = {}
+        self._doc_freq = np.zeros(self.dimensions, dtype=np.float32)
+        self._docs = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return self._docs
+
+    def _idf_squared(self) -> np.ndarray:
+        idf = np.log((1 + self._docs) / (1 + self._doc_freq)) + 1
+        return idf * idf
+
+    def add(
+        self,
+        query_id: int,
+        query: str,
+        destination: str,
+        origin: str | None,
+        answer: dict[str, Any],
+        created: float | None = None,
+    ) -> None:
+        """Store a generated answer so that paraphrases of its query can reuse it.
+
+        Args:
+            query_id (int): ID of the stored travel query
+            query (str): The user's question
+            destination (str): The destination country
+            origin (Optional[str]): The origin country
+            answer (dict): The generated travel information
+            created (Optional[float]): Creation time as a UNIX timestamp, now by default
+        """
+        key = partition_key(origin, destination)
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _Partition(self.dimensions)
+        self._expire(partition, time.time())
+        if len(partition.ids) >= self.max_per_partition:
+            self._remove_oldest(
+                partition, len(partition.ids) - self.max_per_partition + 1
+            )
+
+        vector = vectorize([query], self.dimensions)
+        partition.vectors = np.vstack([partition.vectors, vector])
+        partition.ids.append(query_id)
+        partition.queries.append(query)
+        partition.created.append(created if created is not None else time.time())
+        partition.answers.append(answer)
+        self._doc_freq += vector[0] > 0
+        self._docs += 1
+        self._dirty = True
+
+    def lookup(
+        self, query: str, destination: str, origin: str | None
+    ) -> SimilarMatch | None:
+        """Find a fresh stored answer to a paraphrase of the query.
+
+        Args:
+            query (str): The user's question
+            destination (str): The destination country
+            origin (Optional[str]): The origin country
+
+        Returns:
+            Optional[SimilarMatch]: The most similar match above the threshold
+        """
+        return self.lookup_many([(query, destination, origin)])[0]
+
+    def lookup_many(
+        self, queries: list[tuple[str, str, str | None]]
+    ) -> list[SimilarMatch | None]:
+        """Find stored answers for a batch of queries.
+
+        Queries are grouped by partition and each group is scored against the
+        partition with a single matrix product.
+
+        Args:
+            queries (List[Tuple[str, str, Optional[str]]]): ``(query, destination,
+                origin)`` triples
+
+        Returns:
+            List[Optional[SimilarMatch]]: Best match above the threshold per query
+        """
+        results: list[SimilarMatch | None] = [None] * len(queries)
+        groups: dict[str, list[int]] = {}
+        for position, (_, destination, origin) in enumerate(queries):
+            groups.setdefault(partition_key(origin, destination), []).append(position)
+
+        now = time.time()
+        idf_squared = self._idf_squared()
+        for key, positions in groups.items():
+            partition = self._partitions.get(key)
+            if partition is None or not partition.ids:
+                continue
+            fresh = np.asarray(partition.created) >= now - self.max_age
+            if not fresh.any():
+                continue
+
+            vectors = vectorize([queries[p][0] for p in positions], self.dimensions)
+            weighted = vectors * idf_squared
+            query_norms = np.sqrt(np.einsum("ij,ij->i", weighted, vectors))
+            stored_norms = np.sqrt((partition.vectors**2) @ idf_squared)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = (weighted @ partition.vectors.T) / np.outer(
+                    query_norms, stored_norms
+                )
+            scores = np.where(fresh & np.isfinite(scores), scores, -1.0)
+
+            best = scores.argmax(axis=1)
+            for row, position in enumerate(positions):
+                column = best[row]
+                score = float(scores[row, column])
+                if score >= self.threshold:
+                    results[position] = SimilarMatch(
+                        partition.ids[column],
+                        partition.queries[column],
+                        score,
+                        partition.answers[column],
+                    )
+
+        hits = sum(result is not None for result in results)
+        metrics.increment("similarity_lookups_total", hits, result="hit")
+        metrics.increment(
+            "similarity_lookups_total", len(results) - hits, result="miss"
+        )
+        return results
+
+    def _expire(self, partition: _Partition, now: float) -> None:
+        """Drop answers from a partition that are too old to be reused."""
+        expired = 0
+        while expired < len(partition.created) and (
+            partition.created[expired] < now - self.max_age
+        ):
+            expired += 1
+        if expired:
+            self._remove_oldest(partition, expired)
+
+    def remove(self, query_ids: Iterable[int]) -> int:
+        """Remove deleted queries from the index.
+
+        Args:
+            query_ids (Iterable[int]): IDs of the deleted travel queries
+
+        Returns:
+            int: Number of removed entries
+        """
+        ids = np.fromiter(query_ids, dtype=np.int64)
+        if not ids.size:
+            return 0
+        return sum(
+            self._remove_where(partition, np.isin(partition.ids, ids))
+            for partition in self._partitions.values()
+        )
+
+    def remove_created_before(self, moment: datetime) -> int:
+        """Remove the queries created before a moment, e.g. of a dropped partition.
+
+        Args:
+            moment (datetime): Queries created before it are removed
+
+        Returns:
+            int: Number of removed entries
+        """
+        return sum(
+            self._remove_where(
+                partition, np.asarray(partition.created) < moment.timestamp()
+            )
+            for partition in self._partitions.values()
+        )
+
+    def _remove_where(self, partition: _Partition, removed: np.ndarray) -> int:
+        """Remove the entries of a partition selected by a boolean mask."""
+        count = int(removed.sum()) if len(partition.ids) else 0
+        if not count:
+            return 0
+        kept = np.flatnonzero(~removed)
+        self._doc_freq -= (partition.vectors[removed] > 0).sum(axis=0)
+        self._docs -= count
+        partition.vectors = partition.vectors[kept]
+        partition.ids = [partition.ids[i] for i in kept]
+        partition.queries = [partition.queries[i] for i in kept]
+        partition.created = [partition.created[i] for i in kept]
+        partition.answers = [partition.answers[i] for i in kept]
+        self._dirty = True
+        return count
+
+    def _remove_oldest(self, partition: _Partition, count: int) -> None:
+        """Remove the ``count`` oldest entries of a partition."""
+        self._doc_freq -= (partition.vectors[:count] > 0).sum(axis=0)
+        self._docs -= count
+        partition.vectors = partition.vectors[count:]
+        del partition.ids[:count]
+        del partition.queries[:count]
+        del partition.created[:count]
+        del partition.answers[:count]
+        self._dirty = True
+
+    def _worker_path(self) -> Path:
+        """File this worker process saves the index to."""
+        return self.path.with_name(f"{self.path.stem}.{os.getpid()}{self.path.suffix}")
+
+    def _saved_paths(self) -> list[Path]:
+        """Files saved by any worker, and by versions sharing one file."""
+        pattern = f"{self.path.stem}.*{self.path.suffix}"
+        paths = sorted(self.path.parent.glob(pattern))
+        if self.path.exists():
+            paths.append(self.path)
+        return paths
+
+    def save(self) -> None:
+        """Write the index to this worker's file, replacing it atomically."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        path = self._worker_path()
+        keys = list(self._partitions)
+        meta = {
+            "dimensions": self.dimensions,
+            "partitions": [
+                {
+                    "key": key,
+                    "ids": self._partitions[key].ids,
+                    "queries": self._partitions[key].queries,
+                    "created": self._partitions[key].created,
+                    "answers": self._partitions[key].answers,
+                }
+                for key in keys
+            ],
+        }
+        arrays = {
+            f"vectors_{i}": self._partitions[key].vectors for i, key in enumerate(keys)
+        }
+        temp_path = path.with_name(f"{path.name}.tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(temp_path, path)
+        self._dirty = False
+        logger.debug(f"Saved similarity index with {self._docs} queries to {path}")
+
+    def load(self, session_factory: sessionmaker | None = None) -> bool:
+        """Load the index by merging the files saved by all workers.
+
+        Queries saved by several workers are loaded once, and queries too old to
+        be reused are left out. Files holding nothing but such queries are
+        deleted. The merged index is saved to this worker's file and the other
+        merged files are deleted. Workers starting together merge one at a
+        time.
+
+        Args:
+            session_factory (Optional[sessionmaker]): Factory used to open
+                database sessions. If given, queries that are no longer in the
+                database are left out.
+
+        Returns:
+            bool: True if at least one file matching the configured dimensions
+                was loaded
+        """
+        if self.path is None:
+            return False
+        with self._merge_lock():
+            merged = self._merge(session_factory)
+            if merged is None:
+                return False
+            self.save()
+        own_path = self._worker_path()
+        for path in merged:
+            if path != own_path:
+                path.unlink(missing_ok=True)
+        logger.info(
+            f"Loaded similarity index with {self._docs} queries "
+            f"from {len(merged)} files"
+        )
+        return True
+
+    @contextmanager
+    def _merge_lock(self) -> Iterator[None]:
+        """Hold a file lock next to the index while merging and deleting files."""
+        if fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_name(f".{self.path.name}.lock")
+        with open(lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _merge(self, session_factory: sessionmaker | None) -> list[Path] | None:
+        """Fill the index from the saved files.
+
+        Returns:
+            Optional[List[Path]]: The files merged, None if there was none
+        """
+        cutoff = time.time() - self.max_age
+        entries: dict[str, dict[int, tuple]] = {}
+        merged = []
+        for path in self._saved_paths():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    logger.info(f"Removed expired similarity index {path}")
+                    continue
+                with np.load(path, allow_pickle=False) as data:
+                    meta = json.loads(str(data["meta"]))
+                    if meta["dimensions"] != self.dimensions:
+                        logger.warning(f"Similarity index {path} has other dimensions")
+                        continue
+                    for i, stored in enumerate(meta["partitions"]):
+                        partition = entries.setdefault(stored["key"], {})
+                        for row, entry in enumerate(
+                            zip(
+                                stored["created"],
+                                stored["queries"],
+                                stored["answers"],
+                                strict=True,
+                            )
+                        ):
+                            if entry[0] >= cutoff:
+                                partition[stored["ids"][row]] = (
+                                    *entry,
+                                    data[f"vectors_{i}"][row],
+                                )
+            except FileNotFoundError:
+                continue
+            merged.append(path)
+        if not merged:
+            return None
+
+        known = None
+        if session_factory is not None:
+            known = _existing_ids(
+                session_factory, [i for stored in entries.values() for i in stored]
+            )
+        for key, stored in entries.items():
+            ids = sorted(
+                (i for i in stored if known is None or i in known),
+                key=lambda i: stored[i][0],
+            )[-self.max_per_partition :]
+            if not ids:
+                continue
+            partition = self._partitions[key] = _Partition(self.dimensions)
+            partition.vectors = np.array(
+                [stored[i][3] for i in ids], dtype=np.float32
+            ).reshape(len(ids), self.dimensions)
+            partition.ids = ids
+            partition.created = [stored[i][0] for i in ids]
+            partition.queries = [stored[i][1] for i in ids]
+            partition.answers = [stored[i][2] for i in ids]
+            self._doc_freq += (partition.vectors > 0).sum(axis=0)
+            self._docs += len(ids)
+        return merged
+
+    def rebuild(self, session_factory: sessionmaker) -> None:
+        """Fill the index from the travel queries still fresh enough to reuse.
+
+        Args:
+            session_factory (sessionmaker): Factory used to open database sessions
+        """
+        cutoff = datetime.now(UTC) - timedelta(seconds=self.max_age)
+        with session_factory() as db:
+            rows = db.execute(
+                select(TravelQuery)
+                .where(TravelQuery.created_at >= cutoff)
+                .order_by(TravelQuery.created_at)
+            ).scalars()
+            for row in rows:
+                created = row.created_at
+                if created.tzinfo is None:
+                    created = created.replace(tzinfo=UTC)
+                self.add(
+                    row.id,
+                    row.query,
+                    row.destination,
+                    row.origin,
+                    row.response,
+                    created.timestamp(),
+                )
+        logger.info(f"Rebuilt similarity index with {self._docs} queries")
+
+    def load_or_rebuild(self, session_factory: sessionmaker) -> None:
+        """Load the saved index, or rebuild it from the database if there is none."""
+        try:
+            if self.load(session_factory):
+                return
+        except Exception as e:
+            logger.error(f"Failed to load similarity index: {str(e)}", exc_info=True)
+            self._reset()
+        self.rebuild(session_factory)
+
+    async def run_save_job(self) -> None:
+        """Save the index every SIMILARITY_SAVE_INTERVAL seconds if it changed."""
+        while True:
+            await asyncio.sleep(settings.SIMILARITY_SAVE_INTERVAL)
+            if self._dirty:
+                try:
+                    self.save()
+                except Exception as e:
+                    logger.error(
+                        f"Failed to save similarity index: {str(e)}", exc_info=True
+                    )
+
+
+def _existing_ids(session_factory: sessionmaker, ids: list[int]) -> set[int]:
+    """Return the IDs of travel queries still in the database."""
+    existing = set()
+    with session_factory() as db:
+        for start in range(0, len(ids), 500):
+            existing.update(
+                db.scalars(
+                    select(TravelQuery.id).where(
+                        TravelQuery.id.in_(ids[start : start + 500])
+                    )
+                )
+            )
+    return existing
@@ -0,0 +1,230 @@
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import UTC, date, datetime
+from typing import Any
+
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.models import CorridorStat, TravelQuery
+
+logger = setup_logging()
+
+# Columns statistics can be grouped by
+STATS_GROUPS = ("day", "origin", "destination")
+
+
+def query_day(created_at: datetime | None) -> date:
+    """UTC day a query created at ``created_at`` is counted on."""
+    if created_at is None:
+        return datetime.now(UTC).date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(UTC)
+    return created_at.date()
+
+
+def _fields(row: Any) -> tuple[datetime | None, str | None, str, int | None]:
+    """Creation time, origin, destination and generation latency of a query."""
+    if isinstance(row, dict):
+        return (
+            row.get("created_at"),
+            row.get("origin"),
+            row["destination"],
+            row.get("generation_ms"),
+        )
+    return row.created_at, row.origin, row.destination, row.generation_ms
+
+
+class StatsService:
+    """Service maintaining and reading the corridor_stats rollup.
+
+    Every insert and delete of travel queries applies its difference to the
+    rollup in the same transaction, so the rollup matches the queries without
+    ever scanning them. ``rebuild`` recomputes it from the queries, e.g. after
+    rows were changed outside the application.
+    """
+
+    def __init__(self, db: Session):
+        """Initialize the stats service with a database session.
+
+        Args:
+            db (Session): Database session
+        """
+        self.db = db
+
+    def add(self, rows: Iterable[Any]) -> None:
+        """Count inserted queries. The caller commits.
+
+        Args:
+            rows (Iterable[Any]): TravelQuery objects, rows or column dicts
+        """
+        self._apply(rows, 1)
+
+    def remove(self, rows: Iterable[Any]) -> None:
+        """Uncount deleted queries. The caller commits.
+
+        Args:
+            rows (Iterable[Any]): TravelQuery objects, rows or column dicts
+        """
+        self._apply(rows, -1)
+
+    def _apply(self, rows: Iterable[Any], sign: int) -> None:
+        """Add the counts of some queries to the rollup, or subtract them."""
+        deltas: dict[tuple[date, str, str], list[int]] = defaultdict(lambda: [0, 0, 0])
+        for row in rows:
+            created_at, origin, destination, generation_ms = _fields(row)
+            delta = deltas[(query_day(created_at), origin or "", destination)]
+            delta[0] += sign
+            if generation_ms is not None:
+                delta[1] += sign
+                delta[2] += sign * generation_ms
+
+        for (day, origin, destination), (queries, generated, total) in deltas.items():
+            key = (
+                (CorridorStat.day == day)
+                & (CorridorStat.origin == origin)
+                & (CorridorStat.destination == destination)
+            )
+            values = {
+                "queries": CorridorStat.queries + queries,
+                "generated": CorridorStat.generated + generated,
+                "generation_ms_total": CorridorStat.generation_ms_total + total,
+            }
+            if self.db.execute(update(CorridorStat).where(key).values(values)).rowcount:
+                if sign < 0:
+                    self.db.execute(
+                        delete(CorridorStat).where(key & (CorridorStat.queries <= 0))
+                    )
+                continue
+            if sign < 0:
+                logger.warning(
+                    f"No corridor stats for {origin or '-'} to {destination} on "
+                    f"{day}, run python -m app.cli.stats rebuild"
+                )
+                continue
+            row = {
+                "day": day,
+                "origin": origin,
+                "destination": destination,
+                "queries": queries,
+                "generated": generated,
+                "generation_ms_total": total,
+            }
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(CorridorStat).values(row))
+            except IntegrityError:
+                # Another transaction inserted the row first
+                self.db.execute(update(CorridorStat).where(key).values(values))
+        metrics.increment("corridor_stats_updates_total", len(deltas))
+
+    def query(
+        self,
+        since: date,
+        until: date,
+        group_by: tuple[str, ...] = ("origin", "destination"),
+        origin: str | None = None,
+        destination: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Sum up the rollup over a range of days.
+
+        Args:
+            since (date): First day to include
+            until (date): Last day to include
+            group_by (Tuple[str, ...]): Columns from STATS_GROUPS to group by
+            origin (Optional[str]): Only count queries from this origin
+            destination (Optional[str]): Only count queries to this destination
+            limit (Optional[int]): Maximum number of groups. Defaults to all.
+
+        Returns:
+            List[Dict[str, Any]]: One entry per group, busiest first, with the
+                grouped columns, ``queries`` and ``avg_generation_ms``
+        """
+        columns = [getattr(CorridorStat, group) for group in group_by]
+        queries = func.sum(CorridorStat.queries)
+        statement = (
+            select(
+                *columns,
+                queries,
+                func.sum(CorridorStat.generated),
+                func.sum(CorridorStat.generation_ms_total),
+            )
+            .where(CorridorStat.day >= since, CorridorStat.day <= until)
+            .group_by(*columns)
+            .order_by(queries.desc(), *columns)
+        )
+        if origin is not None:
+            statement = statement.where(CorridorStat.origin == origin)
+        if destination is not None:
+            statement = statement.where(CorridorStat.destination == destination)
+        if limit is not None:
+            statement = statement.limit(limit)
+
+        results = []
+        for *groups, count, generated, total in self.db.execute(statement):
+            result = dict(zip(group_by, groups, strict=True))
+            if "origin" in result:
+                result["origin"] = result["origin"] or None
+            result["queries"] = count
+            result["avg_generation_ms"] = (
+                round(total / generated, 1) if generated else None
+            )
+            results.append(result)
+        return results
+
+    def rebuild(self) -> int:
+        """Recompute the whole rollup from the stored queries.
+
+        On PostgreSQL the rollup is locked against concurrent updates until the
+        rebuild commits, so inserts and deletes running meanwhile are counted
+        exactly once.
+
+        Returns:
+            int: Number of rollup rows written
+        """
+        bind = self.db.get_bind()
+        CorridorStat.__table__.create(bind, checkfirst=True)
+        dialect = bind.dialect.name
+        try:
+            if dialect == "postgresql":
+                self.db.execute(
+                    text(f"LOCK TABLE {CorridorStat.__tablename__} IN EXCLUSIVE MODE")
+                )
+                created_at = func.timezone("UTC", TravelQuery.created_at)
+            else:
+                created_at = TravelQuery.created_at
+            day = func.date(created_at)
+            origin = func.coalesce(TravelQuery.origin, "")
+            self.db.execute(delete(CorridorStat))
+            self.db.execute(
+                insert(CorridorStat).from_select(
+                    [
+                        "day",
+                        "origin",
+                        "destination",
+                        "queries",
+                        "generated",
+                        "generation_ms_total",
+                    ],
+                    select(
+                        day,
+                        origin,
+                        TravelQuery.destination,
+                        func.count(),
+                        func.count(TravelQuery.generation_ms),
+                        func.coalesce(func.sum(TravelQuery.generation_ms), 0),
+                    ).group_by(day, origin, TravelQuery.destination),
+                )
+            )
+            rows = self.db.scalar(select(func.count()).select_from(CorridorStat))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error rebuilding corridor stats: {str(e)}", exc_info=True)
+            raise
+        logger.info(f"Rebuilt corridor stats, {rows} rows")
+        return rows
@@ -0,0 +1,325 @@
+import math
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.models import TokenUsage
+
+logger = setup_logging()
+settings = get_settings()
+
+# PostgreSQL advisory lock serializing reservations across workers
+_RESERVATION_LOCK_KEY = 0x746F_6B6E
+# Seconds between two purges of calls that left the window
+_PURGE_INTERVAL = 60
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a call would take a client over its token budget.
+
+    Attributes:
+        client (str): Client the budget belongs to
+        retry_after (int): Seconds until enough of the window has expired
+    """
+
+    def __init__(self, client: str, retry_after: int):
+        super().__init__(
+            f"Token budget exhausted for {client}, retry after {retry_after}s"
+        )
+        self.client = client
+        self.retry_after = retry_after
+
+
+class TokenRequestTooLarge(Exception):
+    """Raised when a single call needs more tokens than the client's whole budget.
+
+    Such a call can never succeed, however long the client waits.
+
+    Attributes:
+        client (str): Client the budget belongs to
+        tokens (int): Tokens the call would reserve
+        budget (int): The client's budget per window
+    """
+
+    def __init__(self, client: str, tokens: int, budget: int):
+        super().__init__(
+            f"Request needs {tokens} tokens, more than the budget of {budget} "
+            f"tokens per window for {client}"
+        )
+        self.client = client
+        self.tokens = tokens
+        self.budget = budget
+
+
+def estimate_tokens(text: str | None) -> int:
+    """Estimate the number of model tokens in a piece of text.
+
+    Used to reserve tokens before a call, and to account calls whose response
+    reports no usageMetadata, with TOKEN_CHARS_PER_TOKEN characters per token.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / settings.TOKEN_CHARS_PER_TOKEN)
+
+
+def _parse_overrides(value: str) -> dict[str, int]:
+    """Parse ``client=budget`` pairs separated by commas."""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        client, _, budget = item.rpartition("=")
+        try:
+            overrides[client.strip()] = int(budget)
+        except ValueError:
+            logger.warning(f"Ignoring invalid token budget override: {item}")
+    return overrides
+
+
+@dataclass
+class Reservation:
+    """Tokens set aside for a call until its actual usage is known."""
+
+    client: str
+    prompt_tokens: int
+    completion_tokens: int
+    id: int | None = None
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class TokenBudgetService:
+    """Account model token usage per client and enforce budgets per window.
+
+    Before a call, :meth:`reserve` sets aside an estimate (the prompt plus the
+    maximum completion length) and rejects the call if the client's usage in the
+    rolling window plus outstanding reservations would exceed its budget. After
+    the call, :meth:`commit` replaces the reservation with the actual usage.
+    A budget of 0 only records usage.
+
+    Calls are kept in the ``token_usage`` table, so all workers share one budget
+    per client. The window is divided into ``buckets`` time slots and calls leave
+    it a slot at a time. Reservations are serialized by the database: a write
+    lock on SQLite, an advisory lock on PostgreSQL. A reservation left by a
+    worker that died counts until it leaves the window.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        default_budget: int,
+        window_seconds: int,
+        buckets: int,
+        overrides: dict[str, int] | None = None,
+    ):
+        """Initialize the token budget.
+
+        Args:
+            session_factory (sessionmaker): Factory used to open database sessions
+            default_budget (int): Tokens per window for clients without an override,
+                0 for unlimited
+            window_seconds (int): Length of the rolling window in seconds
+            buckets (int): Number of time slots the window is divided into
+            overrides (Optional[Dict[str, int]]): Budgets for specific client IDs
+        """
+        self.session_factory = session_factory
+        self.default_budget = default_budget
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.slot_seconds = window_seconds / buckets
+        self.overrides = overrides or {}
+        self._purged = 0.0
+
+    @classmethod
+    def from_settings(cls, session_factory: sessionmaker) -> "TokenBudgetService":
+        """Create a token budget configured from the application settings."""
+        return cls(
+            session_factory,
+            default_budget=settings.TOKEN_BUDGET_PER_WINDOW,
+            window_seconds=settings.TOKEN_BUDGET_WINDOW_SECONDS,
+            buckets=settings.TOKEN_BUDGET_BUCKETS,
+            overrides=_parse_overrides(settings.TOKEN_BUDGET_OVERRIDES),
+        )
+
+    def budget_for(self, client: str) -> int:
+        """Return the token budget per window of a client, 0 if unlimited."""
+        return self.overrides.get(client, self.default_budget)
+
+    def _slot(self, now: float) -> int:
+        return int(now // self.slot_seconds)
+
+    def _oldest_slot(self, now: float) -> int:
+        return self._slot(now) - self.buckets + 1
+
+    def reserve(
+        self, client: str, prompt_tokens: int, completion_tokens: int
+    ) -> Reservation:
+        """Set aside the estimated tokens of a call.
+
+        Args:
+            client (str): Client the call is accounted to
+            prompt_tokens (int): Estimated prompt tokens
+            completion_tokens (int): Maximum completion tokens
+
+        Returns:
+            Reservation: Reservation to pass to commit or release
+
+        Raises:
+            TokenRequestTooLarge: If the call alone exceeds the client's budget
+            TokenBudgetExceeded: If the call would take the client over its budget
+        """
+        now = time.time()
+        reservation = Reservation(client, prompt_tokens, completion_tokens)
+        budget = self.budget_for(client)
+        if budget and reservation.tokens > budget:
+            metrics.increment("token_budget_rejected_total", client=client)
+            raise TokenRequestTooLarge(client, reservation.tokens, budget)
+        with self.session_factory() as db:
+            if budget and db.get_bind().dialect.name == "postgresql":
+                db.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    {"key": _RESERVATION_LOCK_KEY},
+                )
+            # On SQLite the insert takes the write lock before usage is summed
+            row = TokenUsage(
+                client=client, slot=self._slot(now), reserved_tokens=reservation.tokens
+            )
+            db.add(row)
+            db.flush()
+            if budget:
+                used = db.scalar(
+                    select(
+                        func.coalesce(
+                            func.sum(
+                                TokenUsage.prompt_tokens
+                                + TokenUsage.completion_tokens
+                                + TokenUsage.reserved_tokens
+                            ),
+                            0,
+                        )
+                    ).where(
+                        TokenUsage.client == client,
+                        TokenUsage.slot >= self._oldest_slot(now),
+                    )
+                )
+                excess = used - budget
+                if excess > 0:
+                    retry_after = self._retry_after(db, client, excess, now)
+                    db.rollback()
+                    metrics.increment("token_budget_rejected_total", client=client)
+                    logger.warning(f"Token budget of {budget} exhausted for {client}")
+                    raise TokenBudgetExceeded(client, retry_after)
+            db.commit()
+            reservation.id = row.id
+        return reservation
+
+    def commit(
+        self, reservation: Reservation, prompt_tokens: int, completion_tokens: int
+    ) -> None:
+        """Replace a reservation with the actual usage of the call.
+
+        Args:
+            reservation (Reservation): Reservation returned by reserve
+            prompt_tokens (int): Prompt tokens actually used
+            completion_tokens (int): Completion tokens actually used
+        """
+        now = time.time()
+        with self.session_factory() as db:
+            db.execute(
+                update(TokenUsage)
+                .where(TokenUsage.id == reservation.id)
+                .values(
+                    slot=self._slot(now),
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    reserved_tokens=0,
+                    calls=1,
+                )
+            )
+            if now - self._purged > _PURGE_INTERVAL:
+                self._purged = now
+                db.execute(
+                    delete(TokenUsage).where(TokenUsage.slot < self._oldest_slot(now))
+                )
+            db.commit()
+
+        client = reservation.client
+        metrics.increment("tokens_total", prompt_tokens, client=client, kind="prompt")
+        metrics.increment(
+            "tokens_total", completion_tokens, client=client, kind="completion"
+        )
+        metrics.observe(
+            "token_estimate_error",
+            reservation.tokens - prompt_tokens - completion_tokens,
+        )
+
+    def release(self, reservation: Reservation) -> None:
+        """Drop a reservation for a call that never reached the model."""
+        with self.session_factory() as db:
+            db.execute(delete(TokenUsage).where(TokenUsage.id == reservation.id))
+            db.commit()
+
+    def _retry_after(self, db: Session, client: str, excess: int, now: float) -> int:
+        """Seconds until enough slots expire to free ``excess`` tokens."""
+        used_per_slot = db.execute(
+            select(
+                TokenUsage.slot,
+                func.sum(TokenUsage.prompt_tokens + TokenUsage.completion_tokens),
+            )
+            .where(
+                TokenUsage.client == client,
+                TokenUsage.slot >= self._oldest_slot(now),
+            )
+            .group_by(TokenUsage.slot)
+            .order_by(TokenUsage.slot)
+        )
+        freed = 0
+        for slot, used in used_per_slot:
+            freed += used
+            if freed >= excess:
+                expires = (slot + self.buckets) * self.slot_seconds
+                return max(1, math.ceil(expires - now))
+        return self.window_seconds
+
+    def usage(self) -> list[dict]:
+        """Return the usage of every client seen in the window, heaviest first."""
+        now = time.time()
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(
+                    TokenUsage.client,
+                    func.sum(TokenUsage.prompt_tokens),
+                    func.sum(TokenUsage.completion_tokens),
+                    func.sum(TokenUsage.calls),
+                    func.sum(TokenUsage.reserved_tokens),
+                )
+                .where(TokenUsage.slot >= self._oldest_slot(now))
+                .group_by(TokenUsage.client)
+            ).all()
+        report = []
+        for client, prompt, completion, calls, reserved in rows:
+            budget = self.budget_for(client)
+            used = prompt + completion
+            report.append(
+                {
+                    "client": client,
+                    "prompt_tokens": prompt,
+                    "completion_tokens": completion,
+                    "total_tokens": used,
+                    "calls": calls,
+                    "reserved_tokens": reserved,
+                    "budget": budget or None,
+                    "remaining": (max(0, budget - used - reserved) if budget else None),
+                }
+            )
+        report.sort(key=lambda entry: entry["total_tokens"], reverse=True)
+        return report
+
+
+token_budget = TokenBudgetService.from_settings(SessionLocal)
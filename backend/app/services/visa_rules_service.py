@@ -0,0 +1,313 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.services.gemini_service import GENERATED_FIELDS
+from app.utils.gazetteer import get_gazetteer
+
+logger = setup_logging()
+settings = get_settings()
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "visa_rules.json"
+
+# Words a plain "does a citizen of X need a visa for Y" question is made of, once
+# the places are taken out. Any other word makes the question free text.
+_PLAIN_WORDS = frozenset(
+    {
+        "a",
+        "am",
+        "an",
+        "any",
+        "are",
+        "as",
+        "citizen",
+        "citizens",
+        "do",
+        "does",
+        "entry",
+        "for",
+        "from",
+        "get",
+        "go",
+        "going",
+        "have",
+        "holder",
+        "holders",
+        "holiday",
+        "i",
+        "if",
+        "in",
+        "into",
+        "is",
+        "it",
+        "me",
+        "my",
+        "national",
+        "nationals",
+        "need",
+        "needed",
+        "needs",
+        "of",
+        "passport",
+        "passports",
+        "require",
+        "required",
+        "requirement",
+        "requirements",
+        "the",
+        "to",
+        "tourism",
+        "tourist",
+        "travel",
+        "traveling",
+        "travelling",
+        "trip",
+        "vacation",
+        "visa",
+        "visas",
+        "visit",
+        "visiting",
+        "we",
+        "what",
+        "which",
+        "with",
+    }
+)
+_VISA_WORDS = frozenset({"visa", "visas", "entry"})
+
+
+class VisaRule(NamedTuple):
+    """Entry requirement of one corridor.
+
+    Attributes:
+        requirement (str): Key of the requirement template, e.g. "eta"
+        stay (Optional[str]): Longest allowed stay, e.g. "90 days"
+        authorization (Optional[str]): Name of the travel authorization, e.g. "ESTA"
+        processing (Optional[str]): Processing time, overriding the template's
+    """
+
+    requirement: str
+    stay: str | None = None
+    authorization: str | None = None
+    processing: str | None = None
+
+
+class VisaRules(NamedTuple):
+    """A loaded visa rules dataset.
+
+    Attributes:
+        version (str): Version of the dataset
+        requirements (Dict[str, Dict[str, Any]]): Answer templates by requirement
+        stay (str): Template of the sentence on the longest allowed stay
+        advisories (Tuple[str, ...]): Advisory templates shared by all answers
+        embassy (str): Template of the embassy information
+        rules (Dict[str, VisaRule]): Rules by origin and destination ISO codes
+            concatenated, e.g. "USJP"
+    """
+
+    version: str
+    requirements: dict[str, dict[str, Any]]
+    stay: str
+    advisories: tuple[str, ...]
+    embassy: str
+    rules: dict[str, VisaRule]
+
+
+def parse_rules(data: dict[str, Any]) -> VisaRules:
+    """Build the in-memory index of a visa rules dataset.
+
+    Rules name lists of origins and destinations and are expanded to one entry
+    per corridor; identical rules share one VisaRule. Every rule is rendered once,
+    so a broken template or rule is found here rather than while answering.
+
+    Args:
+        data (Dict[str, Any]): The parsed JSON dataset
+
+    Returns:
+        VisaRules: The dataset, indexed by corridor
+
+    Raises:
+        ValueError: If the dataset is malformed
+    """
+    try:
+        dataset = VisaRules(
+            version=str(data["version"]),
+            requirements=data["requirements"],
+            stay=data["stay"],
+            advisories=tuple(data["advisories"]),
+            embassy=data["embassy"],
+            rules={},
+        )
+        shared: dict[VisaRule, VisaRule] = {}
+        for number, entry in enumerate(data["rules"], start=1):
+            rule = VisaRule(
+                sys.intern(entry["requirement"]),
+                entry.get("stay"),
+                entry.get("authorization"),
+                entry.get("processing"),
+            )
+            rule = shared.setdefault(rule, rule)
+            for origin in entry["origin"]:
+                for destination in entry["destination"]:
+                    if origin == destination:
+                        raise ValueError(f"rule {number} maps {origin} to itself")
+                    dataset.rules[sys.intern(origin + destination)] = rule
+            _render(dataset, rule, "Origin", "Destination")
+    except (KeyError, TypeError, IndexError) as e:
+        raise ValueError(f"Malformed visa rules dataset: {e!r}") from e
+    return dataset
+
+
+def _render(dataset: VisaRules, rule: VisaRule, origin: str, destination: str) -> dict:
+    """Render the generated fields of an answer from a rule."""
+    template = dataset.requirements[rule.requirement]
+    values = {
+        "origin": origin,
+        "destination": destination,
+        "stay": rule.stay,
+        "authorization": rule.authorization,
+    }
+    requirements = template["summary"].format(**values)
+    if rule.stay:
+        requirements += " " + dataset.stay.format(**values)
+    return {
+        "visaRequirements": requirements,
+        "documents": [line.format(**values) for line in template["documents"]],
+        "advisories": [line.format(**values) for line in dataset.advisories],
+        "estimatedProcessingTime": rule.processing or template["processing"],
+        "embassyInformation": dataset.embassy.format(**values),
+    }
+
+
+def is_plain_visa_question(query: str, origin: str, destination: str) -> bool:
+    """Check whether a query asks nothing but whether a visa is needed.
+
+    Args:
+        query (str): The user's question
+        origin (str): ISO code of the origin country
+        destination (str): ISO code of the destination country
+
+    Returns:
+        bool: True if the question only asks about visas for this corridor
+    """
+    gazetteer = get_gazetteer()
+    mentioned_origin, mentioned_destination = gazetteer.extract(query)
+    if mentioned_origin not in (None, origin):
+        return False
+    if mentioned_destination not in (None, destination):
+        return False
+    words = gazetteer.strip_places(query).lower().split()
+    return bool(_VISA_WORDS.intersection(words)) and _PLAIN_WORDS.issuperset(words)
+
+
+class VisaRulesService:
+    """Service answering plain visa questions from a local rules dataset.
+
+    The dataset (JSON, see app/data/visa_rules.json) is loaded into memory and
+    indexed by corridor. Questions that ask nothing but whether a visa is needed,
+    for a corridor the dataset covers, are answered without calling the model;
+    everything else is left to GeminiService. The file is checked for changes
+    every ``reload_interval`` seconds and reloaded in place. A dataset that fails
+    to load is logged and the previous one is kept.
+    """
+
+    def __init__(self, path: str | Path, reload_interval: float):
+        """Initialize the visa rules service.
+
+        Args:
+            path (Union[str, Path]): Path of the dataset
+            reload_interval (float): Seconds between checks for a changed dataset,
+                0 to never reload
+        """
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self.rules: VisaRules | None = None
+        self._signature: tuple[int, int] | None = None
+
+    @classmethod
+    def from_settings(cls) -> "VisaRulesService":
+        """Create a service configured from the VISA_RULES_* settings."""
+        return cls(
+            settings.VISA_RULES_PATH or DATA_PATH, settings.VISA_RULES_RELOAD_INTERVAL
+        )
+
+    def load(self) -> bool:
+        """Load the dataset if it changed since it was last loaded.
+
+        Returns:
+            bool: True if a new dataset was loaded
+        """
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return False
+            # A broken file is reported once, not on every check
+            self._signature = signature
+            with open(self.path, encoding="utf-8") as f:
+                rules = parse_rules(json.load(f))
+        except (OSError, ValueError) as e:
+            metrics.increment("visa_rules_reload_total", outcome="error")
+            logger.error(f"Failed to load visa rules from {self.path}: {str(e)}")
+            return False
+        # Readers see either the old or the new dataset, never a mix
+        self.rules = rules
+        metrics.increment("visa_rules_reload_total", outcome="loaded")
+        metrics.set_gauge("visa_rules_corridors", len(rules.rules))
+        logger.info(
+            f"Loaded visa rules {rules.version} for {len(rules.rules)} corridors"
+        )
+        return True
+
+    async def run_reload_job(self) -> None:
+        """Reload the dataset whenever the file changes, until cancelled."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await asyncio.to_thread(self.load)
+
+    def answer(
+        self, query: str, destination: str, origin: str | None
+    ) -> dict[str, Any] | None:
+        """Answer a travel question from the rules, if it is a plain visa question.
+
+        Args:
+            query (str): The user's travel-related question
+            destination (str): The destination country
+            origin (Optional[str]): The origin country
+
+        Returns:
+            Optional[Dict[str, Any]]: A complete answer tagged with source "rules",
+                or None if the question is free text or the corridor is not covered
+        """
+        rules = self.rules
+        gazetteer = get_gazetteer()
+        home = gazetteer.lookup(origin) if origin else None
+        away = gazetteer.lookup(destination)
+        rule = (
+            rules.rules.get(home.iso2 + away.iso2) if rules and home and away else None
+        )
+        if rule is None:
+            metrics.increment("visa_rules_total", outcome="no_rule")
+            return None
+        if not is_plain_visa_question(query, home.iso2, away.iso2):
+            metrics.increment("visa_rules_total", outcome="free_text")
+            return None
+
+        metrics.increment("visa_rules_total", outcome="answered")
+        answered_at = datetime.now(UTC).isoformat()
+        return {
+            "destination": destination,
+            "origin": origin,
+            **_render(rules, rule, home.name, away.name),
+            "timestamp": answered_at,
+            "fieldTimestamps": dict.fromkeys(GENERATED_FIELDS, answered_at),
+            "source": "rules",
+            "rulesVersion": rules.version,
+        }
@@ -0,0 +1,460 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+from app.core.metrics import metrics
+from app.models import IdAllocation, TravelQuery
+from app.services.partition_service import max_query_id
+from app.services.stats_service import StatsService
+
+logger = setup_logging()
+settings = get_settings()
+
+_SPOOL_PREFIX = "write-behind-"
+_SPOOL_SUFFIX = ".ndjson"
+# Dead-letter files match the spool pattern, so they are replayed on the next start
+_FAILED_PREFIX = f"{_SPOOL_PREFIX}failed-"
+# Columns telling a replayed row from a different row that took the same ID
+_CONTENT_COLUMNS = ("query", "destination", "origin", "response")
+
+
+class IdAllocator:
+    """Hand out travel query IDs before the corresponding rows are inserted.
+
+    IDs are reserved from the ``id_allocations`` table in blocks, so the
+    database is only touched once every ``block_size`` allocations and several
+    worker processes can allocate concurrently without handing out the same ID.
+    """
+
+    def __init__(self, session_factory: sessionmaker, block_size: int = 100):
+        """Initialize the allocator.
+
+        Args:
+            session_factory (sessionmaker): Factory used to open database sessions
+            block_size (int): Number of IDs reserved per database round trip
+        """
+        self.session_factory = session_factory
+        self.block_size = block_size
+        self._next = 0
+        self._ceiling = 0
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> int:
+        """Return the next free travel query ID.
+
+        Returns:
+            int: An ID that no other allocator will hand out
+        """
+        async with self._lock:
+            if self._next >= self._ceiling:
+                self._next, self._ceiling = await asyncio.to_thread(self._reserve_block)
+            query_id = self._next
+            self._next += 1
+            return query_id
+
+    def reserve_one(self) -> int:
+        """Reserve a single ID right away, from a thread outside the event loop.
+
+        Returns:
+            int: An ID that no other allocator will hand out
+        """
+        query_id, _ = self._reserve_block(1)
+        return query_id
+
+    def _reserve_block(self, size: int | None = None) -> tuple[int, int]:
+        """Reserve a new block of IDs in the database.
+
+        The block never starts below ``max(travel_queries.id) + 1`` so rows
+        inserted through the regular autoincrement path are not overwritten.
+
+        Args:
+            size (Optional[int]): Number of IDs to reserve. Defaults to block_size.
+
+        Returns:
+            Tuple[int, int]: First ID of the block and the first ID after it
+        """
+        size = size or self.block_size
+        name = TravelQuery.__tablename__
+        for _ in range(3):
+            with self.session_factory() as db:
+                floor = (max_query_id(db) or 0) + 1
+                result = db.execute(
+                    update(IdAllocation)
+                    .where(IdAllocation.name == name)
+                    .values(
+                        next_value=case(
+                            (IdAllocation.next_value < floor, floor),
+                            else_=IdAllocation.next_value,
+                        )
+                        + size
+                    )
+                )
+                if result.rowcount == 0:
+                    try:
+                        db.add(IdAllocation(name=name, next_value=floor + size))
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()
+                        continue
+                    ceiling = floor + size
+                else:
+                    ceiling = db.scalar(
+                        select(IdAllocation.next_value).where(IdAllocation.name == name)
+                    )
+                    db.commit()
+                logger.debug(
+                    f"Reserved travel query IDs {ceiling - size}-{ceiling - 1}"
+                )
+                return ceiling - size, ceiling
+        raise RuntimeError("Failed to reserve a block of travel query IDs")
+
+
+class WriteBehindService:
+    """Service that persists travel queries asynchronously in micro-batches.
+
+    Requests hand their rows to :meth:`submit` and return immediately. A
+    background worker drains the queue and inserts rows in batches of up to
+    ``batch_size`` rows, waiting at most ``flush_interval`` seconds for a batch
+    to fill up.
+
+    Crash safety: every submitted row is appended to a per-process spool file
+    before it is queued. After each committed batch the spool is truncated if
+    nothing is pending, or rewritten with only the pending rows once committed
+    rows make up more than half of it, so it stays bounded under steady
+    traffic. A batch that still fails after five attempts is moved to a
+    dead-letter file. Spool and dead-letter files left behind are replayed on
+    the next start. Rows carry their final ID, so replaying is idempotent; a
+    different row found under the same ID is kept and the replayed row is
+    stored under a new ID, with an error logged.
+
+    Backpressure: when the queue is full, :meth:`submit` waits up to
+    ``enqueue_timeout`` seconds for space and then writes the row itself, so a
+    slow database slows requests down instead of growing memory without bound.
+    """
+
+    def __init__(self, session_factory: sessionmaker):
+        """Initialize the service from the application settings.
+
+        Args:
+            session_factory (sessionmaker): Factory used to open database sessions
+        """
+        self.session_factory = session_factory
+        self.allocator = IdAllocator(
+            session_factory, block_size=settings.WRITE_BEHIND_ID_BLOCK_SIZE
+        )
+        self.batch_size = settings.WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = settings.WRITE_BEHIND_FLUSH_INTERVAL
+        self.enqueue_timeout = settings.WRITE_BEHIND_ENQUEUE_TIMEOUT
+        self.spool_dir = Path(settings.WRITE_BEHIND_SPOOL_DIR)
+        self._queue: asyncio.Queue | None = None
+        self._pending: dict[int, dict[str, Any]] = {}
+        self._spool = None
+        self._spooled = 0
+        self._failed_batches = 0
+        self._written = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the background worker is accepting rows."""
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        """Replay leftover spool files and start the background worker."""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(self._replay_spools)
+        spool_path = self.spool_dir / f"{_SPOOL_PREFIX}{os.getpid()}{_SPOOL_SUFFIX}"
+        self._spool = open(spool_path, "a", encoding="utf-8")
+        self._spooled = 0
+        self._queue = asyncio.Queue(maxsize=settings.WRITE_BEHIND_QUEUE_SIZE)
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Write-behind persistence started, spooling to {spool_path}")
+
+    async def stop(self) -> None:
+        """Drain queued rows and stop the background worker.
+
+        Rows that cannot be written within the drain timeout stay in the spool
+        file and are replayed on the next start.
+        """
+        if not self.running:
+            return
+        logger.info(f"Draining {self._queue.qsize()} queued write-behind rows")
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(
+                self._worker, timeout=settings.WRITE_BEHIND_DRAIN_TIMEOUT
+            )
+        except TimeoutError:
+            logger.error(
+                f"Write-behind drain timed out, {len(self._pending)} rows left in spool"
+            )
+        finally:
+            self._spool.close()
+            if not self._pending:
+                Path(self._spool.name).unlink(missing_ok=True)
+            self._spool = None
+            self._worker = None
+
+    async def next_id(self) -> int:
+        """Reserve the ID for a row that will be submitted later."""
+        return await self.allocator.next_id()
+
+    async def submit(self, row: dict[str, Any]) -> None:
+        """Queue a travel query row for insertion.
+
+        Args:
+            row (dict): Column values for the row, including its pre-allocated ``id``
+        """
+        self._write_spool(row)
+        self._pending[row["id"]] = row
+        try:
+            await asyncio.wait_for(self._queue.put(row), timeout=self.enqueue_timeout)
+        except TimeoutError:
+            logger.warning(
+                f"Write-behind queue full, writing query {row['id']} synchronously"
+            )
+            await asyncio.to_thread(self._insert_rows, [row])
+            self._mark_written([row])
+
+    def get_pending(self, query_id: int) -> dict[str, Any] | None:
+        """Return a submitted row that has not been committed yet.
+
+        Args:
+            query_id (int): ID of the travel query
+
+        Returns:
+            Optional[dict]: The queued row, or None if it is not pending
+        """
+        return self._pending.get(query_id)
+
+    async def wait_written(self, query_id: int, timeout: float) -> bool:
+        """Wait until a submitted row is no longer pending.
+
+        Lets requests that change a stored query work on the row in the
+        database rather than on a queued copy that the flush would overwrite.
+
+        Args:
+            query_id (int): ID of the travel query
+            timeout (float): Maximum number of seconds to wait
+
+        Returns:
+            bool: True once the row is not pending, False if it still is after
+                the timeout
+        """
+
+        async def written() -> None:
+            while query_id in self._pending:
+                await self._written.wait()
+
+        try:
+            await asyncio.wait_for(written(), timeout=timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    async def _run(self) -> None:
+        """Collect rows into batches and write them until stopped."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        """Write a batch, retrying with backoff while the database is unavailable."""
+        delay = 0.1
+        for attempt in range(5):
+            try:
+                await asyncio.to_thread(self._insert_rows, batch)
+                self._mark_written(batch)
+                return
+            except Exception as e:
+                logger.error(
+                    f"Write-behind flush of {len(batch)} rows failed (attempt {attempt + 1}): {str(e)}",
+                    exc_info=True,
+                )
+                await asyncio.sleep(delay)
+                delay *= 2
+        path = self._dead_letter(batch)
+        logger.error(
+            f"Giving up on {len(batch)} write-behind rows, moved to {path} "
+            "to be replayed on the next start"
+        )
+        metrics.increment("write_behind_dead_letter_rows_total", len(batch))
+        self._mark_written(batch)
+
+    def _dead_letter(self, batch: list[dict[str, Any]]) -> Path:
+        """Write a batch that could not be inserted to a dead-letter file."""
+        self._failed_batches += 1
+        path = self.spool_dir / (
+            f"{_FAILED_PREFIX}{os.getpid()}-{self._failed_batches}{_SPOOL_SUFFIX}"
+        )
+        with open(path, "a", encoding="utf-8") as dead_letter:
+            dead_letter.writelines(_spool_line(row) for row in batch)
+            dead_letter.flush()
+            os.fsync(dead_letter.fileno())
+        return path
+
+    def _insert_rows(self, rows: list[dict[str, Any]]) -> None:
+        """Insert rows that are not in the database yet.
+
+        A row whose ID exists with the same contents was written before and is
+        skipped. A row whose ID was taken by a different row, e.g. one inserted
+        without an allocated ID, is stored under a newly allocated ID.
+
+        Args:
+            rows (List[dict]): Column values including pre-allocated IDs
+        """
+        with self.session_factory() as db:
+            existing = self._existing_rows(db, [row["id"] for row in rows])
+            new_rows, collided = [], []
+            for row in rows:
+                stored = existing.get(row["id"])
+                if stored is None:
+                    new_rows.append(row)
+                elif stored != tuple(row[c] for c in _CONTENT_COLUMNS):
+                    collided.append(row)
+            if collided:
+                # End the read transaction, SQLite would block the allocation
+                db.rollback()
+                new_rows += [self._reallocate(row) for row in collided]
+            if new_rows:
+                db.execute(insert(TravelQuery), new_rows)
+                StatsService(db).add(new_rows)
+            db.commit()
+        logger.debug(f"Write-behind flushed {len(new_rows)} rows")
+
+    def _reallocate(self, row: dict[str, Any]) -> dict[str, Any]:
+        """Give a row whose ID is taken by a different row a new ID."""
+        new_id = self.allocator.reserve_one()
+        logger.error(
+            f"Write-behind query ID {row['id']} is taken by a different query, "
+            f"storing query {row['query']!r} under ID {new_id} instead"
+        )
+        metrics.increment("write_behind_id_collisions_total")
+        return dict(row, id=new_id)
+
+    @staticmethod
+    def _existing_rows(db: Session, ids: list[int]) -> dict[int, tuple]:
+        """Return the contents of the rows that already exist under the given IDs."""
+        columns = [getattr(TravelQuery, c) for c in _CONTENT_COLUMNS]
+        return {
+            query_id: tuple(values)
+            for query_id, *values in db.execute(
+                select(TravelQuery.id, *columns).where(TravelQuery.id.in_(ids))
+            )
+        }
+
+    def _mark_written(self, rows: list[dict[str, Any]]) -> None:
+        """Forget committed rows and shrink the spool to the rows still pending."""
+        for row in rows:
+            self._pending.pop(row["id"], None)
+        # Wake up the waiters of wait_written, later ones wait for the next batch
+        self._written.set()
+        self._written = asyncio.Event()
+        if self._spool is None:
+            return
+        if not self._pending:
+            self._spool.truncate(0)
+            self._spooled = 0
+        elif self._spooled > 2 * len(self._pending):
+            self._compact_spool()
+
+    def _compact_spool(self) -> None:
+        """Replace the spool file with one holding only the pending rows."""
+        path = Path(self._spool.name)
+        compacted = path.with_name(path.name + ".tmp")
+        with open(compacted, "w", encoding="utf-8") as spool:
+            spool.writelines(_spool_line(row) for row in self._pending.values())
+            spool.flush()
+            if settings.WRITE_BEHIND_FSYNC:
+                os.fsync(spool.fileno())
+        os.replace(compacted, path)
+        self._spool.close()
+        self._spool = open(path, "a", encoding="utf-8")
+        self._spooled = len(self._pending)
+        logger.debug(f"Compacted write-behind spool to {self._spooled} rows")
+
+    def _write_spool(self, row: dict[str, Any]) -> None:
+        """Append a row to the spool file before it is queued."""
+        self._spool.write(_spool_line(row))
+        self._spool.flush()
+        if settings.WRITE_BEHIND_FSYNC:
+            os.fsync(self._spool.fileno())
+        self._spooled += 1
+
+    def _replay_spools(self) -> None:
+        """Insert rows from spool files left behind by processes that are gone."""
+        for path in sorted(self.spool_dir.glob(f"{_SPOOL_PREFIX}*{_SPOOL_SUFFIX}")):
+            pid = path.name[len(_SPOOL_PREFIX) : -len(_SPOOL_SUFFIX)]
+            if pid.isdigit() and int(pid) != os.getpid() and _process_alive(int(pid)):
+                continue
+
+            rows = []
+            if not path.exists():
+                # Replayed by another process starting at the same time
+                continue
+            with open(path, encoding="utf-8") as spool:
+                for line in spool:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping torn record in {path}")
+                        continue
+                    record["created_at"] = datetime.fromisoformat(record["created_at"])
+                    record.setdefault("generation_ms", None)
+                    rows.append(record)
+
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    self._insert_rows(rows[start : start + self.batch_size])
+            except Exception as e:
+                logger.error(
+                    f"Failed to replay write-behind rows from {path}, "
+                    f"kept for the next start: {str(e)}",
+                    exc_info=True,
+                )
+                continue
+            path.unlink(missing_ok=True)
+            logger.info(f"Replayed {len(rows)} write-behind rows from {path}")
+
+
+def _spool_line(row: dict[str, Any]) -> str:
+    """Serialize a row as one line of a spool file."""
+    return json.dumps(dict(row, created_at=row["created_at"].isoformat())) + "\n"
+
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a process with the given PID is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
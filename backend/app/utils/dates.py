@@ -0,0 +1,19 @@
+from datetime import UTC, datetime
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Convert a time to UTC for comparison with stored query timestamps.
+
+    SQLite stores timestamps without their UTC offset and compares them as text,
+    so a bound with another offset would be off by that offset. Times without a
+    timezone are taken to be UTC.
+
+    Args:
+        moment (datetime): The time to convert
+
+    Returns:
+        datetime: The same moment in UTC
+    """
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=UTC)
+    return moment.astimezone(UTC)
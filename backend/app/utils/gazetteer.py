@@ -0,0 +1,317 @@
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from app.core.logging_config import setup_logging
+
+logger = setup_logging()
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "gazetteer.json"
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+_END = ""
+
+# Words around a place name that tell whether it is where the traveller comes from
+# or where they are going.
+_ORIGIN_BEFORE = frozenset({"from", "leaving", "departing"})
+_DESTINATION_BEFORE = frozenset(
+    {"to", "into", "visit", "visiting", "enter", "entering", "for", "towards"}
+)
+_ORIGIN_HOLDERS = frozenset(
+    {
+        "citizen",
+        "citizens",
+        "national",
+        "nationals",
+        "resident",
+        "residents",
+        "passport",
+        "passports",
+        "holder",
+        "holders",
+    }
+)
+_DESTINATION_AFTER = frozenset(
+    {"visa", "visas", "evisa", "embassy", "consulate", "border", "immigration"}
+)
+
+
+class Country(NamedTuple):
+    """A country known to the gazetteer."""
+
+    iso2: str
+    iso3: str
+    name: str
+
+
+class PlaceMatch(NamedTuple):
+    """A gazetteer phrase found in a piece of text.
+
+    ``start`` and ``end`` are token offsets, ``kind`` is one of ``name``,
+    ``alias``, ``demonym`` or ``city``.
+    """
+
+    country: Country
+    kind: str
+    start: int
+    end: int
+
+
+def _fold(text: str) -> str:
+    """Strip accents so that e.g. "Côte d'Ivoire" matches "Cote d'Ivoire"."""
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _tokenize(text: str) -> list[str]:
+    """Split text into accent-folded, case-preserving word tokens."""
+    return _TOKEN_RE.findall(_fold(text))
+
+
+def _plural(demonym: str) -> str | None:
+    """Return the plural form of a demonym, or None if it does not take an -s."""
+    if demonym.endswith(("s", "sh", "ch", "ese", "x", "z")):
+        return None
+    return demonym + "s"
+
+
+class Gazetteer:
+    """In-memory gazetteer of countries, their aliases, demonyms and major cities.
+
+    All phrases are stored in a token trie, so :meth:`find` locates every place
+    mentioned in a text in a single left-to-right pass, preferring the longest
+    phrase at each position ("South Sudan" over "Sudan", "Mexico City" over
+    "Mexico"). Matching works on whole words only, which keeps phrases like
+    "to get a visa" from being mistaken for places.
+    """
+
+    def __init__(self, data: dict):
+        """Build the lookup structures from gazetteer data.
+
+        Args:
+            data (dict): Parsed contents of ``app/data/gazetteer.json``
+        """
+        self.countries: dict[str, Country] = {}
+        self._trie: dict = {}
+        self._exact: dict[str, Country] = {}
+        self._codes: dict[str, Country] = {}
+        self._case_sensitive = set(data.get("case_sensitive", []))
+        self._max_phrase_tokens = 0
+
+        for entry in data["countries"]:
+            country = Country(entry["iso2"], entry["iso3"], entry["name"])
+            self.countries[country.iso2] = country
+            self._codes[country.iso2] = country
+            self._codes[country.iso3] = country
+
+            phrases = [(country.name, "name")]
+            phrases += [(alias, "alias") for alias in entry.get("aliases", [])]
+            for demonym in entry.get("demonyms", []):
+                phrases.append((demonym, "demonym"))
+                if plural := _plural(demonym):
+                    phrases.append((plural, "demonym"))
+            phrases += [(city, "city") for city in entry.get("cities", [])]
+
+            for phrase, kind in phrases:
+                self._add(phrase, kind, country)
+
+        logger.info(
+            f"Gazetteer loaded with {len(self.countries)} countries "
+            f"and {len(self._exact)} phrases"
+        )
+
+    def _add(self, phrase: str, kind: str, country: Country) -> None:
+        """Insert a phrase into the trie and the exact-match index."""
+        tokens = _tokenize(phrase)
+        if not tokens:
+            return
+        key = " ".join(tokens).lower()
+        self._exact.setdefault(key, country)
+
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token.lower(), {})
+        if _END in node:
+            if node[_END][0] != country:
+                logger.debug(f"Ambiguous gazetteer phrase {phrase!r}, keeping first")
+            return
+        exact_form = tuple(tokens) if phrase in self._case_sensitive else None
+        node[_END] = (country, kind, exact_form)
+        self._max_phrase_tokens = max(self._max_phrase_tokens, len(tokens))
+
+    def lookup(self, value: str) -> Country | None:
+        """Resolve a country name, alias, demonym, city or ISO code.
+
+        ISO codes are only recognised in upper case, so that words like "to",
+        "in" or "no" are not taken for Tonga, India or Norway.
+
+        Args:
+            value (str): Place as entered by a user, e.g. "japan", "JPN" or "Tokyo"
+
+        Returns:
+            Optional[Country]: The country, or None if the value is not recognised
+        """
+        country = self._codes.get(value.strip())
+        if country is not None:
+            return country
+        tokens = _tokenize(value)
+        country = self._exact.get(" ".join(tokens).lower())
+        if country is not None:
+            return country
+        # "Tokyo, Japan" and similar resolve when every place in them agrees
+        found = {match.country for match in self._scan(tokens)}
+        return found.pop() if len(found) == 1 else None
+
+    def find(self, text: str) -> list[PlaceMatch]:
+        """Find all places mentioned in a text.
+
+        Args:
+            text (str): Free text such as a travel question
+
+        Returns:
+            List[PlaceMatch]: Non-overlapping matches in order of appearance
+        """
+        return self._scan(_tokenize(text))
+
+    def strip_places(self, text: str) -> str:
+        """Remove all place mentions from a text, keeping the other words.
+
+        Args:
+            text (str): Free text such as a travel question
+
+        Returns:
+            str: The remaining words joined by spaces
+        """
+        tokens = _tokenize(text)
+        keep = [True] * len(tokens)
+        for match in self._scan(tokens):
+            keep[match.start : match.end] = [False] * (match.end - match.start)
+        return " ".join(token for token, kept in zip(tokens, keep, strict=True) if kept)
+
+    def _scan(self, tokens: list[str]) -> list[PlaceMatch]:
+        """Leftmost-longest trie matching over a token list."""
+        lowered = [token.lower() for token in tokens]
+        matches = []
+        i = 0
+        while i < len(lowered):
+            node = self._trie
+            best = None
+            j = i
+            while j < len(lowered) and j - i < self._max_phrase_tokens:
+                node = node.get(lowered[j])
+                if node is None:
+                    break
+                j += 1
+                terminal = node.get(_END)
+                if terminal is not None and (
+                    terminal[2] is None or tuple(tokens[i:j]) == terminal[2]
+                ):
+                    best = (terminal, j)
+            if best is None:
+                i += 1
+                continue
+            (country, kind, _), end = best
+            matches.append(PlaceMatch(country, kind, i, end))
+            i = end
+        return matches
+
+    def extract(self, text: str) -> tuple[str | None, str | None]:
+        """Extract the origin and destination countries from a travel question.
+
+        Demonyms ("Kenyan citizens") and places preceded by "from" or followed
+        by "passport"/"citizens" are taken as the origin. Places preceded by
+        "to"/"visiting" or followed by "visa"/"embassy" are taken as the
+        destination. If no place is cued as the destination, the first other
+        place is. Uncued places are never taken as the origin: in "Thailand or
+        Vietnam" neither is where the traveller comes from.
+
+        Args:
+            text (str): Free text such as a travel question
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: ISO 3166-1 alpha-2 codes of
+                the origin and destination, None where not found
+        """
+        raw_tokens = _tokenize(text)
+        tokens = [token.lower() for token in raw_tokens]
+        origin = destination = None
+        unassigned = []
+
+        for match in self._scan(raw_tokens):
+            before = tokens[match.start - 1] if match.start > 0 else ""
+            before2 = tokens[match.start - 2] if match.start > 1 else ""
+            after = tokens[match.end] if match.end < len(tokens) else ""
+
+            if match.kind == "demonym":
+                # "Kenyan citizens", "for Kenyans", but "a Japanese visa"
+                role = "destination" if after in _DESTINATION_AFTER else "origin"
+            elif before in _ORIGIN_BEFORE or (
+                before == "of" and before2 in _ORIGIN_HOLDERS
+            ):
+                role = "origin"
+            elif after in _ORIGIN_HOLDERS:
+                role = "origin"
+            elif before in _DESTINATION_BEFORE or after in _DESTINATION_AFTER:
+                role = "destination"
+            else:
+                unassigned.append(match.country.iso2)
+                continue
+
+            if role == "origin" and origin is None:
+                origin = match.country.iso2
+            elif role == "destination" and destination is None:
+                destination = match.country.iso2
+
+        if destination is None:
+            destination = next((code for code in unassigned if code != origin), None)
+
+        return origin, destination
+
+
+@lru_cache
+def get_gazetteer() -> Gazetteer:
+    """Get cached gazetteer instance."""
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return Gazetteer(json.load(f))
+
+
+def _lookup_place(value: str) -> Country | None:
+    """Resolve a value that names a single place, such as a form field.
+
+    Unlike in free text, a whole value of two or three letters is an ISO code in
+    any case, so "jp" and "jpn" resolve to Japan.
+    """
+    code = value.strip()
+    if len(code) in (2, 3) and code.isalpha():
+        country = get_gazetteer().lookup(code.upper())
+        if country is not None:
+            return country
+    return get_gazetteer().lookup(value)
+
+
+def canonical_country(value: str | None) -> str | None:
+    """Return the canonical country name for a place, or the input unchanged.
+
+    Args:
+        value (Optional[str]): Place as entered by a user
+
+    Returns:
+        Optional[str]: Canonical country name if recognised, else the stripped input
+    """
+    if value is None:
+        return None
+    country = _lookup_place(value)
+    return country.name if country else value.strip()
+
+
+def country_code(value: str | None) -> str | None:
+    """Return the ISO 3166-1 alpha-2 code for a place, or None if unknown."""
+    if not value:
+        return None
+    country = _lookup_place(value)
+    return country.iso2 if country else None
@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from app.core.metrics import metrics
+
+
+class TTLCache:
+    """In-process mapping with least-recently-used eviction and expiring entries.
+
+    Holds at most ``max_size`` entries; adding one more evicts the entry that was
+    read or written least recently. Entries also expire ``ttl`` seconds after they
+    were written. Evictions are counted in ``cache_evictions_total{cache,reason}``
+    and the size is reported in the ``cache_entries{cache}`` gauge.
+
+    The cache is per process and not thread-safe; use it from the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the cache.
+
+        Args:
+            name (str): Name of the cache in metrics
+            max_size (int): Maximum number of entries
+            ttl (float): Seconds an entry lives after it was written
+            clock (Callable[[], float]): Source of the current time in seconds.
+                Defaults to time.monotonic.
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value of a live entry and mark it as recently used.
+
+        Args:
+            key (Hashable): Key of the entry
+            default (Any): Value returned for missing or expired entries
+
+        Returns:
+            Any: The cached value, or ``default``
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires <= self._clock():
+            self._evict(key, "expired")
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Add or replace an entry, evicting the least recently used if full.
+
+        Args:
+            key (Hashable): Key of the entry
+            value (Any): Value to cache
+        """
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._evict(next(iter(self._entries)), "size")
+        metrics.set_gauge("cache_entries", len(self._entries), cache=self.name)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value, or ``default`` if it is missing."""
+        entry = self._entries.pop(key, None)
+        metrics.set_gauge("cache_entries", len(self._entries), cache=self.name)
+        if entry is None or entry[0] <= self._clock():
+            return default
+        return entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._clock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, key: Hashable, reason: str) -> None:
+        del self._entries[key]
+        metrics.increment("cache_evictions_total", cache=self.name, reason=reason)
+        metrics.set_gauge("cache_entries", len(self._entries), cache=self.name)
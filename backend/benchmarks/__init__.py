@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Travel Query application, run from the backend directory with
+``python -m benchmarks.<name>``
+"""
@@ -0,0 +1,173 @@
+"""Compare corridor statistics from the rollup with scanning the queries.
+
+Seeds a throwaway SQLite database with travel queries spread over the past
+months and their corridor_stats rollup, and reports
+the latency of "top destinations this week" and "queries per corridor per day"
+read from the rollup and computed with GROUP BY over travel_queries. Also
+reports what the rollup update adds to inserting one query.
+
+Usage:
+    python -m benchmarks.corridor_stats
+    python -m benchmarks.corridor_stats --rows 2000000 --months 12
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.models import TravelQuery
+from app.services.stats_service import StatsService
+
+COUNTRIES = [
+    "Japan",
+    "Peru",
+    "Chile",
+    "France",
+    "Kenya",
+    "India",
+    "Brazil",
+    "Canada",
+    "Germany",
+    "Mexico",
+    "Egypt",
+    "Spain",
+]
+
+
+def seed(url: str, rows: int, months: int, now: datetime):
+    """Create a database with ``rows`` queries spread evenly over ``months``.
+
+    A few corridors get most of the queries, as in production. The rollup is
+    built once at the end, which gives the same result as counting every insert.
+    """
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    step = timedelta(days=30 * months) / rows
+    start = now - step * rows
+    generator = random.Random(0)
+    weights = [1 / rank for rank in range(1, len(COUNTRIES) + 1)]
+    with engine.begin() as conn:
+        for offset in range(0, rows, 5000):
+            conn.execute(
+                insert(TravelQuery),
+                [
+                    {
+                        "id": i + 1,
+                        "query": f"Do I need a visa? #{i}",
+                        "destination": generator.choices(COUNTRIES, weights)[0],
+                        "origin": generator.choices(COUNTRIES, weights[::-1])[0],
+                        "response": {"visaRequirements": "Visa required. " * 8},
+                        "created_at": start + step * i,
+                        "generation_ms": generator.randint(2000, 9000),
+                    }
+                    for i in range(offset, min(rows, offset + 5000))
+                ],
+            )
+    with Session(engine) as db:
+        StatsService(db).rebuild()
+    return engine
+
+
+def _time(function, repeat: int) -> float:
+    """Median milliseconds of ``repeat`` calls."""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    directory = tempfile.mkdtemp(prefix="corridor_stats-")
+    now = datetime.now(UTC)
+    started = time.perf_counter()
+    engine = seed(
+        f"sqlite:///{os.path.join(directory, 'stats.db')}", args.rows, args.months, now
+    )
+    print(f"Seeded {args.rows} queries in {time.perf_counter() - started:.1f}s")
+
+    until = now.date()
+    since = until - timedelta(days=6)
+    week_ago = datetime.combine(since, datetime.min.time(), tzinfo=UTC)
+    day = func.date(TravelQuery.created_at)
+    scans = {
+        "top destinations, 7 days": (
+            ("destination",),
+            select(TravelQuery.destination, func.count())
+            .where(TravelQuery.created_at >= week_ago)
+            .group_by(TravelQuery.destination)
+            .order_by(func.count().desc())
+            .limit(10),
+        ),
+        "per corridor per day, 7 days": (
+            ("day", "origin", "destination"),
+            select(
+                day,
+                TravelQuery.origin,
+                TravelQuery.destination,
+                func.count(),
+                func.avg(TravelQuery.generation_ms),
+            )
+            .where(TravelQuery.created_at >= week_ago)
+            .group_by(day, TravelQuery.origin, TravelQuery.destination),
+        ),
+        "per corridor, all time": (
+            ("origin", "destination"),
+            select(TravelQuery.origin, TravelQuery.destination, func.count())
+            .group_by(TravelQuery.origin, TravelQuery.destination)
+            .order_by(func.count().desc()),
+        ),
+    }
+
+    print(f"\nMedian of {args.repeat}")
+    print(f"{'report':<32}{'scan ms':>10}{'rollup ms':>12}")
+    with Session(engine) as db:
+        service = StatsService(db)
+        for name, (groups, statement) in scans.items():
+            first = since if "7 days" in name else until - timedelta(days=400)
+            scan = _time(lambda s=statement: db.execute(s).all(), args.repeat)
+            rollup = _time(
+                lambda g=groups, f=first: service.query(f, until, g), args.repeat
+            )
+            print(f"{name:<32}{scan:>10.1f}{rollup:>12.2f}")
+
+    row = {
+        "query": "Do I need a visa?",
+        "destination": "Japan",
+        "origin": "Kenya",
+        "response": {},
+        "generation_ms": 4000,
+    }
+
+    def insert_query(with_stats: bool) -> None:
+        with Session(engine) as db:
+            query = TravelQuery(**row, created_at=datetime.now(UTC))
+            db.add(query)
+            if with_stats:
+                StatsService(db).add([query])
+            db.commit()
+
+    plain = _time(lambda: insert_query(False), args.repeat * 10)
+    counted = _time(lambda: insert_query(True), args.repeat * 10)
+    print(f"\n{'insert one query':<32}{plain:>10.2f}{counted:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Measure origin/destination extraction throughput over a corpus of queries.
+
+Compares the gazetteer trie matcher with the regular expressions it replaced.
+The corpus is read from a file (one query per line), from the ``query`` column
+of ``travel_queries``, or generated from templates when neither is given.
+
+Usage:
+    python -m benchmarks.gazetteer_throughput
+    python -m benchmarks.gazetteer_throughput --corpus queries.txt
+    python -m benchmarks.gazetteer_throughput --from-db --repeat 5
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.utils.gazetteer import get_gazetteer
+
+_TEMPLATES = [
+    "Do I need a visa to travel from {origin} to {destination}?",
+    "visa for {origin_demonym} citizens visiting {destination}",
+    "What documents do {origin_demonym} passport holders need for {destination}?",
+    "I am flying to {city} next month, do I need to get a visa?",
+    "How long does a {destination} tourist visa take from {origin}?",
+    "travel advisories for {destination}",
+    "Is it safe to visit {city} with kids in December?",
+    "Can I work remotely in {destination} on a {origin} passport",
+]
+
+
+def legacy_extract(query: str) -> tuple[str | None, str]:
+    """The regular expression extraction used before the gazetteer."""
+    origin_destination_regex = r"(?:from|travel(?:ing)? from)\s+([a-zA-Z\s]+)\s+(?:to|visit(?:ing)?)\s+([a-zA-Z\s]+)"
+    destination_regex = r"(?:to|visit(?:ing)?)\s+([a-zA-Z\s]+)"
+
+    origin = None
+    destination = None
+
+    origin_destination_match = re.search(origin_destination_regex, query, re.IGNORECASE)
+    if origin_destination_match:
+        origin = origin_destination_match.group(1).strip()
+        destination = origin_destination_match.group(2).strip()
+    else:
+        destination_match = re.search(destination_regex, query, re.IGNORECASE)
+        if destination_match:
+            destination = destination_match.group(1).strip()
+
+    if not destination:
+        destination = "Unknown destination"
+
+    return origin, destination
+
+
+def synthetic_corpus(size: int, seed: int = 7) -> list[str]:
+    """Generate travel questions from templates and the gazetteer data."""
+    import json
+
+    from app.utils.gazetteer import DATA_PATH
+
+    with open(DATA_PATH, encoding="utf-8") as f:
+        countries = json.load(f)["countries"]
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        origin, destination = rng.sample(countries, 2)
+        corpus.append(
+            rng.choice(_TEMPLATES).format(
+                origin=origin["name"],
+                origin_demonym=(origin["demonyms"] or [origin["name"]])[0],
+                destination=destination["name"],
+                city=(destination["cities"] or [destination["name"]])[0],
+            )
+        )
+    return corpus
+
+
+def load_corpus(args: argparse.Namespace) -> list[str]:
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    if args.from_db:
+        from app.core.database import SessionLocal
+        from app.models import TravelQuery
+
+        with SessionLocal() as db:
+            return [row.query for row in db.query(TravelQuery.query)]
+    return synthetic_corpus(args.size)
+
+
+def run(name: str, extract, corpus: list[str], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in corpus:
+            extract(query)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"{name:<12} {len(corpus) / best:>12,.0f} queries/s"
+        f" {best / len(corpus) * 1e6:>8.2f} us/query"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="file with one query per line")
+    parser.add_argument("--from-db", action="store_true", help="use stored queries")
+    parser.add_argument(
+        "--size", type=int, default=100_000, help="synthetic corpus size"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    gazetteer = get_gazetteer()
+    print(f"Corpus: {len(corpus):,} queries, {sum(map(len, corpus)):,} characters")
+    run("regex", legacy_extract, corpus, args.repeat)
+    run("gazetteer", gazetteer.extract, corpus, args.repeat)
+
+    resolved = sum(1 for query in corpus if gazetteer.extract(query)[1])
+    print(
+        f"Gazetteer resolved a destination for {resolved / len(corpus):.1%} of queries"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare payload size and latency of full, summary and sparse history listings.
+
+Seeds a throwaway SQLite database with travel queries whose answers are about
+the size of real Gemini answers, then requests ``/api/v1/history`` in each
+shape through the ASGI app and reports the response size and latency.
+
+Usage:
+    python -m benchmarks.history_fieldsets
+    python -m benchmarks.history_fieldsets --rows 5000 --repeat 50
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+SHAPES = {
+    "full": {},
+    "summary": {"view": "summary"},
+    "fields=id,destination": {"fields": "id,destination"},
+}
+WORDS = (
+    "passport visa embassy application fee days business tourist consulate "
+    "insurance return ticket proof of funds accommodation biometric appointment"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _answer(rng: random.Random, destination: str, origin: str) -> dict:
+    """A stored answer of typical size (about 2 KB of JSON)."""
+    return {
+        "destination": destination,
+        "origin": origin,
+        "visaRequirements": _text(rng, 60),
+        "documents": [_text(rng, 8) for _ in range(6)],
+        "advisories": [_text(rng, 20) for _ in range(4)],
+        "estimatedProcessingTime": _text(rng, 6),
+        "embassyInformation": _text(rng, 30),
+        "timestamp": datetime.now(UTC).isoformat(),
+    }
+
+
+def seed(rows: int) -> None:
+    """Fill the database of the app with generated travel queries."""
+    from app.core.database import engine
+    from app.models import TravelQuery
+
+    rng = random.Random(7)
+    countries = ["Japan", "France", "Kenya", "Brazil", "Canada", "India", "Egypt"]
+    start = datetime.now(UTC) - timedelta(days=30)
+    with engine.begin() as conn:
+        conn.execute(TravelQuery.__table__.delete())
+        for offset in range(0, rows, 1000):
+            batch = []
+            for i in range(offset, min(rows, offset + 1000)):
+                origin, destination = rng.sample(countries, 2)
+                batch.append(
+                    {
+                        "query": f"Do I need a visa for {destination}? {_text(rng, 5)}",
+                        "destination": destination,
+                        "origin": origin,
+                        "response": _answer(rng, destination, origin),
+                        "created_at": start + timedelta(minutes=i),
+                    }
+                )
+            conn.execute(TravelQuery.__table__.insert(), batch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # The app keeps its SQLite database and logs in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="history_fieldsets-"))
+    os.environ["DB_TYPE"] = "sqlite"
+    from fastapi.testclient import TestClient
+
+    from app.api.v1.endpoints import travel
+    from app.main import app
+
+    logging.disable(logging.WARNING)
+    travel.history_rate_limiter.max_requests = sys.maxsize
+    seed(args.rows)
+
+    print(f"{args.rows} stored queries, {args.repeat} requests per shape")
+    print(f"{'shape':<24}{'bytes':>12}{'p50 ms':>10}{'p90 ms':>10}")
+    with TestClient(app) as client:
+        for shape, params in SHAPES.items():
+            client.get("/api/v1/history", params=params)
+            latencies = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = client.get("/api/v1/history", params=params)
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+            latencies.sort()
+            print(
+                f"{shape:<24}{len(response.content):>12}"
+                f"{statistics.median(latencies):>10.1f}"
+                f"{latencies[int(len(latencies) * 0.9) - 1]:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
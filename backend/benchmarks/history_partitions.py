@@ -0,0 +1,149 @@
+"""Compare history reads and expiry on a single and a month-partitioned table.
+
+Seeds two throwaway SQLite databases with the same travel queries spread over
+the past months, partitions one of them with ``PartitionService.migrate``, and
+reports the latency of newest-first history listings (``HistoryService``) and
+of removing the oldest month: chunked deletes through the retention service on
+the single table, dropping the partition on the other.
+
+Usage:
+    python -m benchmarks.history_partitions
+    python -m benchmarks.history_partitions --rows 500000 --months 24
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import Base
+from app.models import TravelQuery
+from app.services.history_service import HistoryService
+from app.services.partition_service import PartitionService, month_partition
+from app.services.retention_service import RetentionService
+
+ANSWER = {
+    "destination": "Japan",
+    "origin": "Kenya",
+    "visaRequirements": "Tourist visa required for stays over 90 days. " * 8,
+    "documents": ["Passport valid for six months", "Return ticket"] * 3,
+    "advisories": ["Exercise normal precautions"] * 4,
+    "estimatedProcessingTime": "5 business days",
+    "embassyInformation": "Embassy of Japan, Nairobi. " * 4,
+}
+
+
+def seed(url: str, rows: int, months: int, now: datetime):
+    """Create a database with ``rows`` queries spread evenly over ``months``."""
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    step = timedelta(days=30 * months) / rows
+    start = now - step * rows
+    with engine.begin() as conn:
+        for offset in range(0, rows, 5000):
+            conn.execute(
+                TravelQuery.__table__.insert(),
+                [
+                    {
+                        "id": i + 1,
+                        "query": f"Do I need a visa for Japan? #{i}",
+                        "destination": "Japan",
+                        "origin": "Kenya",
+                        "response": ANSWER,
+                        "created_at": start + step * i,
+                    }
+                    for i in range(offset, min(rows, offset + 5000))
+                ],
+            )
+    return engine
+
+
+def _time(function, repeat: int) -> float:
+    """Median milliseconds of ``repeat`` calls."""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    settings = get_settings()
+    settings.PARTITIONING_ENABLED = True
+    settings.RETENTION_CHUNK_PAUSE = 0
+    directory = tempfile.mkdtemp(prefix="history_partitions-")
+    now = datetime.now(UTC)
+    engines = {}
+    for layout in ("single", "partitioned"):
+        started = time.perf_counter()
+        engines[layout] = seed(
+            f"sqlite:///{os.path.join(directory, layout)}.db",
+            args.rows,
+            args.months,
+            now,
+        )
+        if layout == "partitioned":
+            PartitionService(engines[layout], premake_months=1).migrate(now)
+        print(f"Seeded {layout} table in {time.perf_counter() - started:.1f}s")
+
+    week_ago = now - timedelta(days=7)
+    listings = {
+        "newest 50": {"limit": 50},
+        "summary, newest 500": {"limit": 500, "fields": ("id", "created_at")},
+        "last 7 days": {"since": week_ago},
+    }
+    print(f"\n{args.rows} queries over {args.months} months, median of {args.repeat}")
+    print(f"{'operation':<24}{'single ms':>12}{'partitioned ms':>16}")
+    for name, params in listings.items():
+        results = []
+        for layout in ("single", "partitioned"):
+            with Session(engines[layout]) as db:
+                service = HistoryService(db)
+                results.append(
+                    _time(lambda s=service, p=params: s.list_queries(**p), args.repeat)
+                )
+        print(f"{name:<24}{results[0]:>12.1f}{results[1]:>16.1f}")
+
+    with Session(engines["single"]) as db:
+        oldest = db.scalar(select(func.min(TravelQuery.created_at)))
+    cutoff = month_partition(oldest).end
+    max_age_days = (now - cutoff).days
+    started = time.perf_counter()
+    with Session(engines["single"]) as db:
+        removed = (
+            RetentionService(db, max_age_days=max_age_days, archive_dir="")
+            .enforce()
+            .removed
+        )
+    single = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    report = PartitionService(
+        engines["partitioned"],
+        premake_months=1,
+        max_age_days=max_age_days,
+        archive_dir="",
+    ).maintain(now)
+    partitioned = (time.perf_counter() - started) * 1000
+    print(
+        f"{'expire oldest month':<24}{single:>12.1f}{partitioned:>16.1f}"
+        f"   ({removed} and {report.dropped_rows} queries)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Compare one model call per destination with combined itinerary calls.
+
+Answers a trip through several countries with a fake model whose latency
+follows a simple serving model: a time to first token that grows with the
+prompt, plus a fixed time per output token. Reports model calls, prompt and
+completion tokens and wall time for one ``get_travel_info`` call per
+destination (one after the other, as a client firing ``/query`` per
+destination does, and in parallel) and for ``get_itinerary_info`` at several
+group sizes.
+
+Usage:
+    python -m benchmarks.itinerary_calls
+    python -m benchmarks.itinerary_calls --destinations 6 --per-token-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+
+COUNTRIES = [
+    "Japan",
+    "France",
+    "Peru",
+    "Chile",
+    "Brazil",
+    "Canada",
+    "India",
+    "Egypt",
+    "Morocco",
+    "Vietnam",
+]
+QUERY = "What do Kenyan citizens need to visit these countries as tourists?"
+
+
+def _answer(destination: str, origin: str) -> dict:
+    """An answer of typical size (about 450 tokens)."""
+    filler = "passport visa embassy application days tourist consulate insurance"
+    return {
+        "destination": destination,
+        "origin": origin,
+        "visaRequirements": f"{destination}: " + " ".join([filler] * 8),
+        "documents": [filler for _ in range(6)],
+        "advisories": [" ".join([filler] * 2) for _ in range(4)],
+        "estimatedProcessingTime": "5 to 10 business days",
+        "embassyInformation": " ".join([filler] * 4),
+    }
+
+
+class FakeModel:
+    """Model stand-in with prompt- and output-dependent latency."""
+
+    def __init__(self, ttft: float, prefill_per_token: float, per_token: float):
+        self.ttft = ttft
+        self.prefill_per_token = prefill_per_token
+        self.per_token = per_token
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    async def generate_content_async(self, prompt: str, generation_config: dict):
+        from app.services.gemini_client import GenerateContentResponse
+        from app.services.token_budget_service import estimate_tokens
+
+        combined = re.search(r"each of these destinations: (.*)\.\n", prompt)
+        if combined:
+            text = json.dumps(
+                {d: _answer(d, "Kenya") for d in combined.group(1).split(", ")}
+            )
+        else:
+            destination = re.search(r" to (.*)\.\n", prompt).group(1)
+            text = json.dumps(_answer(destination, "Kenya"))
+
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(
+            text
+        )
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        await asyncio.sleep(
+            self.ttft
+            + prompt_tokens * self.prefill_per_token
+            + completion_tokens * self.per_token
+        )
+        return GenerateContentResponse(text)
+
+
+async def _singles(service, destinations: list[str], parallel: bool) -> None:
+    calls = [
+        service.get_travel_info(QUERY, destination, "Kenya")
+        for destination in destinations
+    ]
+    if parallel:
+        await asyncio.gather(*calls)
+    else:
+        for call in calls:
+            await call
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.services.gemini_service import GeminiService
+
+    service = GeminiService()
+    destinations = COUNTRIES[: args.destinations]
+
+    scenarios = [
+        ("singles, sequential", lambda: _singles(service, destinations, False)),
+        ("singles, parallel", lambda: _singles(service, destinations, True)),
+    ]
+    for group in sorted({2, 3, len(destinations)}):
+        if group <= len(destinations):
+            scenarios.append(
+                (
+                    f"itinerary, {group} per call",
+                    lambda group=group: _itinerary(service, destinations, group),
+                )
+            )
+
+    print(
+        f"{len(destinations)} destinations, TTFT {args.ttft_ms:.0f}ms "
+        f"+ {args.prefill_us:.0f}us/prompt token + {args.per_token_ms:.0f}ms/output token"
+    )
+    print(
+        f"{'scenario':<26}{'calls':>7}{'prompt tok':>12}{'output tok':>12}{'wall s':>9}"
+    )
+    for name, scenario in scenarios:
+        model = FakeModel(
+            args.ttft_ms / 1000, args.prefill_us / 1e6, args.per_token_ms / 1000
+        )
+        service.model = model
+        started = time.perf_counter()
+        await scenario()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<26}{model.calls:>7}{model.prompt_tokens:>12}"
+            f"{model.completion_tokens:>12}{elapsed:>9.2f}"
+        )
+
+
+async def _itinerary(service, destinations: list[str], group: int) -> None:
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    settings.ITINERARY_MAX_OUTPUT_TOKENS = (
+        settings.ITINERARY_TOKENS_PER_DESTINATION * group
+    )
+    answers = await service.get_itinerary_info(QUERY, destinations, "Kenya")
+    assert list(answers) == destinations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--destinations", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--prefill-us", type=float, default=200)
+    parser.add_argument("--per-token-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
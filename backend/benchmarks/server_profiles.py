@@ -0,0 +1,169 @@
+"""Compare request throughput and latency of the server launch profiles.
+
+Each profile is started on a free port, warmed up, and then driven with a fixed
+number of concurrent keep-alive connections for a fixed duration:
+
+- ``single``: one uvicorn process on the asyncio loop with the h11 parser, as
+  ``run.sh production`` used to start it
+- ``single-uvloop``: one uvicorn process on uvloop with httptools
+- ``production``: gunicorn with ``gunicorn.conf.py`` (``run.sh production``)
+
+Usage:
+    python -m benchmarks.server_profiles
+    python -m benchmarks.server_profiles --profile production --concurrency 128
+    python -m benchmarks.server_profiles --path /api/v1/history --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+PROFILES = {
+    "single": [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app.main:app",
+        "--loop",
+        "asyncio",
+        "--http",
+        "h11",
+        "--host",
+        "{host}",
+        "--port",
+        "{port}",
+    ],
+    "single-uvloop": [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app.main:app",
+        "--loop",
+        "uvloop",
+        "--http",
+        "httptools",
+        "--host",
+        "{host}",
+        "--port",
+        "{port}",
+    ],
+    "production": [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "app.main:app",
+        "-c",
+        "gunicorn.conf.py",
+    ],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(profile: str, host: str, port: int) -> subprocess.Popen:
+    """Start a profile and wait until it answers requests."""
+    command = [part.format(host=host, port=port) for part in PROFILES[profile]]
+    env = {**os.environ, "HOST": host, "PORT": str(port)}
+    server = subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{profile} exited with code {server.returncode}")
+        try:
+            httpx.get(f"http://{host}:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{profile} did not start within 60s")
+
+
+async def _load(url: str, concurrency: int, duration: float) -> tuple[list, int]:
+    """Send requests over ``concurrency`` connections for ``duration`` seconds."""
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        stop = time.monotonic() + duration
+
+        async def user() -> None:
+            nonlocal errors
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def run_profile(
+    profile: str, path: str, concurrency: int, duration: float, warmup: float
+) -> dict:
+    """Benchmark one profile and return its throughput and latency figures."""
+    host, port = "127.0.0.1", _free_port()
+    server = _start(profile, host, port)
+    try:
+        url = f"http://{host}:{port}{path}"
+        asyncio.run(_load(url, concurrency, warmup))
+        latencies, errors = asyncio.run(_load(url, concurrency, duration))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    latencies.sort()
+    return {
+        "profile": profile,
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profile",
+        action="append",
+        choices=list(PROFILES),
+        help="profile to run, all by default",
+    )
+    parser.add_argument("--path", default="/", help="endpoint to request")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'profile':<15}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for profile in args.profile or list(PROFILES):
+        result = run_profile(
+            profile, args.path, args.concurrency, args.duration, args.warmup
+        )
+        print(
+            f"{result['profile']:<15}{result['requests']:>10}{result['rps']:>10.0f}"
+            f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            + (f"  ({result['errors']} errors)" if result["errors"] else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Measure precision and latency of near-duplicate answer reuse.
+
+Builds a similarity index with one stored question per intent for a set of
+travel corridors, then looks up paraphrases of the stored intents (which should
+reuse the stored answer of the same intent) and questions with intents that
+were never stored (which should not reuse anything). Reports, per threshold, how
+many paraphrases were served from the index and how many reuses returned the
+answer to a different intent, plus lookup latency one by one and batched.
+
+Usage:
+    python -m benchmarks.similarity_reuse
+    python -m benchmarks.similarity_reuse --corridors 200 --batch 64
+"""
+
+import argparse
+import random
+import time
+
+from app.services.similarity_service import SimilarityService
+from app.utils.gazetteer import get_gazetteer
+
+INTENTS = {
+    "visa": [
+        "Do {demonym} citizens need a visa for {destination}?",
+        "visa for {demonyms} visiting {destination}",
+        "Is a visa required to travel from {origin} to {destination}?",
+        "do I need a visa to go to {destination} on a {origin} passport",
+        "{destination} visa requirements for {origin} nationals",
+    ],
+    "documents": [
+        "What documents do I need to enter {destination} from {origin}?",
+        "required documents for {demonym} travellers to {destination}",
+        "which papers should a {demonym} bring when visiting {destination}",
+        "documents needed for {destination} trip from {origin}",
+    ],
+    "processing": [
+        "How long does a {destination} visa take for {origin} citizens?",
+        "{destination} visa processing time from {origin}",
+        "how many days to get a {destination} visa as a {demonym}",
+        "processing time of a {destination} tourist visa for {demonyms}",
+    ],
+    "safety": [
+        "Is it safe to travel to {destination} right now?",
+        "travel advisories for {destination}",
+        "current safety warnings for {demonym} visitors in {destination}",
+        "any travel warnings for {destination} this month",
+    ],
+    "embassy": [
+        "Where is the {destination} embassy in {origin}?",
+        "{destination} embassy contact in {origin}",
+        "how do I contact the {destination} consulate from {origin}",
+        "embassy of {destination} address for {demonym} applicants",
+    ],
+    "work": [
+        "Can I work remotely in {destination} on a {origin} passport?",
+        "digital nomad visa {destination} for {demonyms}",
+        "is remote work allowed for {demonym} tourists in {destination}",
+    ],
+    "transit": [
+        "Do I need a transit visa for a layover in {destination}?",
+        "airport transit in {destination} for {demonym} passport holders",
+        "layover in {destination} coming from {origin}, visa needed?",
+    ],
+}
+HELD_OUT = ("work", "transit")
+
+
+def _corridors(count: int, seed: int) -> list[tuple[str, str, str]]:
+    """Pick (origin, demonym, destination) triples from the gazetteer."""
+    import json
+
+    from app.utils.gazetteer import DATA_PATH
+
+    with open(DATA_PATH, encoding="utf-8") as f:
+        entries = [e for e in json.load(f)["countries"] if e.get("demonyms")]
+    rng = random.Random(seed)
+    corridors = []
+    for _ in range(count):
+        origin, destination = rng.sample(entries, 2)
+        corridors.append((origin["name"], origin["demonyms"][0], destination["name"]))
+    return corridors
+
+
+def build_cases(corridors, seed: int):
+    """Return the stored questions and the labelled lookups."""
+    rng = random.Random(seed)
+    stored, lookups = [], []
+    for origin, demonym, destination in corridors:
+        # "Kenyans", but "Japanese" and "Swiss" stay as they are
+        plural = (
+            demonym if demonym.endswith(("s", "sh", "ch", "ese")) else demonym + "s"
+        )
+        values = {
+            "origin": origin,
+            "demonym": demonym,
+            "demonyms": plural,
+            "destination": destination,
+        }
+        for intent, templates in INTENTS.items():
+            shuffled = rng.sample(templates, len(templates))
+            if intent in HELD_OUT:
+                lookups += [
+                    (t.format(**values), destination, origin, intent) for t in shuffled
+                ]
+                continue
+            stored.append((shuffled[0].format(**values), destination, origin, intent))
+            lookups += [
+                (t.format(**values), destination, origin, intent) for t in shuffled[1:]
+            ]
+    return stored, lookups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corridors", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--dimensions", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    get_gazetteer()
+    stored, lookups = build_cases(_corridors(args.corridors, args.seed), args.seed)
+    index = SimilarityService(
+        threshold=0.0, max_age_hours=24, dimensions=args.dimensions
+    )
+    intents = {}
+    for query_id, (query, destination, origin, intent) in enumerate(stored):
+        index.add(query_id, query, destination, origin, {"intent": intent})
+        intents[query_id] = intent
+
+    triples = [(q, d, o) for q, d, o, _ in lookups]
+    start = time.perf_counter()
+    for triple in triples:
+        index.lookup(*triple)
+    single_us = (time.perf_counter() - start) / len(triples) * 1e6
+    start = time.perf_counter()
+    matches = []
+    for i in range(0, len(triples), args.batch):
+        matches += index.lookup_many(triples[i : i + args.batch])
+    batch_us = (time.perf_counter() - start) / len(triples) * 1e6
+
+    paraphrases = sum(intent not in HELD_OUT for *_, intent in lookups)
+    novel = len(lookups) - paraphrases
+    print(
+        f"{len(stored)} stored questions, {paraphrases} paraphrases, "
+        f"{novel} questions with unseen intents"
+    )
+    print(f"{'threshold':>9}{'reused':>9}{'precision':>11}{'novel reused':>14}")
+    for threshold in (0.3, 0.4, 0.5, 0.6, 0.7, 0.8):
+        reused = correct = novel_reused = 0
+        for match, (*_, intent) in zip(matches, lookups, strict=True):
+            if match is None or match.score < threshold:
+                continue
+            if intent in HELD_OUT:
+                novel_reused += 1
+                continue
+            reused += 1
+            correct += intents[match.query_id] == intent
+        precision = correct / reused if reused else 1.0
+        print(
+            f"{threshold:>9.1f}{reused / paraphrases:>9.1%}{precision:>11.1%}"
+            f"{novel_reused / novel:>14.1%}"
+        )
+    print(f"lookup latency: {single_us:.0f} us one by one, {batch_us:.0f} us batched")
+
+
+if __name__ == "__main__":
+    main()
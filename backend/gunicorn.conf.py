@@ -0,0 +1,43 @@
+"""Gunicorn configuration for the production profile (``./run.sh production``).
+
+Worker count, keep-alive, backlog, recycling and timeouts come from Settings, so
+they can be tuned through the environment like the rest of the application.
+"""
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging
+
+logger = setup_logging()
+settings = get_settings()
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.worker_count
+worker_class = "app.core.workers.ProductionUvicornWorker"
+
+# Import the app once in the master so workers share its memory copy-on-write
+# and a broken app fails at startup instead of in every worker.
+preload_app = True
+
+keepalive = settings.SERVER_KEEPALIVE
+backlog = settings.SERVER_BACKLOG
+
+# Recycle workers after a jittered number of requests to cap memory growth
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    """Give every worker its own connections and client state."""
+    from app.main import reset_after_fork
+
+    reset_after_fork()
+    logger.info(f"Worker {worker.pid} ready")
+
+
+def when_ready(server):
+    logger.info(f"Serving on {bind} with {workers} workers")
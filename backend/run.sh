@@ -8,7 +8,8 @@ export ENVIRONMENT=$ENV
 
 # Run the application
 if [ "$ENV" = "production" ]; then
-    uvicorn app.main:app --host 0.0.0.0 --port 8000
+    # Multiple workers on uvloop/httptools, configured in gunicorn.conf.py
+    exec gunicorn app.main:app -c gunicorn.conf.py
 else
     uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
-fi 
\ No newline at end of file
+fi
@@ -0,0 +1,23 @@
+"""Test configuration.
+
+Settings are read from the environment when app.core.config is imported, and
+the SQLite database and write-behind spool live in the working directory, so
+both are set up here before any test module imports the app.
+"""
+
+import os
+import tempfile
+
+os.chdir(tempfile.mkdtemp(prefix="travel-tests-"))
+os.environ.update(
+    {
+        "DB_TYPE": "sqlite",
+        "GEMINI_API_KEY": "test",
+        "GEMINI_WARMUP_CONNECTIONS": "0",
+        "WRITE_BEHIND_ENABLED": "true",
+        "SIMILARITY_ENABLED": "false",
+        "VISA_RULES_ENABLED": "false",
+        "PARTITIONING_ENABLED": "false",
+        "RETENTION_ENABLED": "false",
+    }
+)
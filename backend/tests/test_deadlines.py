@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.api.v1.endpoints import travel
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.main import app
+from app.models.travel_query import TravelQuery
+
+settings = get_settings()
+
+QUERY = {"query": "What should I pack?", "destination": "Japan", "origin": "USA"}
+
+
+class SlowModel:
+    """Fake model that takes longer to answer than any test waits."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+@pytest.fixture
+def model(monkeypatch):
+    slow = SlowModel()
+    monkeypatch.setattr(travel.gemini_service, "model", slow)
+    return slow
+
+
+def stored_rows() -> int:
+    with SessionLocal() as db:
+        return db.query(TravelQuery).count()
+
+
+async def post_with_deadline(timeout: float) -> httpx.Response:
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.post(
+                "/api/v1/query",
+                json=QUERY,
+                headers={settings.QUERY_DEADLINE_HEADER: str(timeout)},
+            )
+
+
+async def post_and_disconnect(model: SlowModel) -> list[dict]:
+    """Send a query over raw ASGI and disconnect once the model is called."""
+    body = json.dumps(QUERY).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/v1/query",
+        "raw_path": b"/api/v1/query",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("test", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await model.started.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    async with app.router.lifespan_context(app):
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+    return sent
+
+
+def test_deadline_cancels_generation(model):
+    rows = stored_rows()
+    cancelled = metrics.get("generation_cancelled_total", reason="deadline")
+
+    response = asyncio.run(post_with_deadline(0.2))
+
+    assert response.status_code == 504
+    assert model.cancelled
+    assert metrics.get("generation_cancelled_total", reason="deadline") == (
+        cancelled + 1
+    )
+    assert stored_rows() == rows
+    assert not travel.write_behind_service._pending
+
+
+def test_disconnect_cancels_generation(model):
+    rows = stored_rows()
+    cancelled = metrics.get("generation_cancelled_total", reason="disconnect")
+
+    sent = asyncio.run(post_and_disconnect(model))
+
+    assert sent[0]["status"] == 499
+    assert model.cancelled
+    assert metrics.get("generation_cancelled_total", reason="disconnect") == (
+        cancelled + 1
+    )
+    assert stored_rows() == rows
+    assert not travel.write_behind_service._pending
@@ -0,0 +1,45 @@
+import asyncio
+import json
+from datetime import UTC, datetime
+
+import httpx
+import pytest
+
+from app.core.database import SessionLocal
+from app.main import app
+from app.models.travel_query import TravelQuery
+from app.utils.gazetteer import canonical_country, country_code
+
+
+@pytest.mark.parametrize("value", ["Japan", "japan", "JP", "jp", "JPN", "jpn", "Tokyo"])
+def test_country_resolves_in_any_form(value):
+    assert canonical_country(value) == "Japan"
+    assert country_code(value) == "JP"
+
+
+def test_unknown_place_is_kept():
+    assert canonical_country(" Atlantis ") == "Atlantis"
+    assert country_code("xx") is None
+
+
+def test_export_filters_by_lowercase_code():
+    with SessionLocal() as db:
+        db.add(
+            TravelQuery(
+                id=900001,
+                query="Do I need a visa for Japan?",
+                destination="Japan",
+                origin="Kenya",
+                response={},
+                created_at=datetime.now(UTC),
+            )
+        )
+        db.commit()
+
+    async def export():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            response = await c.get("/api/v1/history/export?destination=jp")
+            return [json.loads(line) for line in response.text.splitlines()]
+
+    assert 900001 in {row["id"] for row in asyncio.run(export())}
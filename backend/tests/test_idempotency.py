@@ -0,0 +1,74 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import IdempotencyKey
+from app.services.idempotency_service import IdempotencyConflict, IdempotencyService
+
+RESULT = {"query": {"id": 1}, "headers": {}}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _workers(session_factory, count=2):
+    """Services sharing one database, as the workers of a deployment do."""
+    return [
+        IdempotencyService(session_factory, ttl_seconds=60, claim_timeout=10)
+        for _ in range(count)
+    ]
+
+
+def test_result_is_replayed_by_another_worker(session_factory):
+    first, second = _workers(session_factory)
+    assert asyncio.run(first.claim("client", "key", "body")) is None
+    first.complete("client", "key", RESULT)
+
+    assert asyncio.run(second.claim("client", "key", "body")) == RESULT
+    # Keys are scoped to the client
+    assert asyncio.run(second.claim("other", "key", "body")) is None
+
+
+def test_key_reused_with_another_body_conflicts(session_factory):
+    first, second = _workers(session_factory)
+    asyncio.run(first.claim("client", "key", "body"))
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(second.claim("client", "key", "other body"))
+
+
+def test_waiting_request_runs_once_the_key_is_abandoned(session_factory):
+    first, second = _workers(session_factory)
+
+    async def scenario():
+        assert await first.claim("client", "key", "body") is None
+        waiting = asyncio.create_task(second.claim("client", "key", "body"))
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+        first.abandon("client", "key")
+        return await asyncio.wait_for(waiting, timeout=2)
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_claim_of_a_dead_worker_is_taken_over(session_factory):
+    first, second = _workers(session_factory)
+    asyncio.run(first.claim("client", "key", "body"))
+    with session_factory() as db:
+        db.execute(
+            update(IdempotencyKey).values(
+                created_at=datetime.now(UTC) - timedelta(seconds=11)
+            )
+        )
+        db.commit()
+
+    assert asyncio.run(second.claim("client", "key", "body")) is None
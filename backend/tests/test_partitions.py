@@ -0,0 +1,107 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.models import TravelQuery
+from app.services.partition_service import PartitionService, list_partitions
+
+NOW = datetime(2026, 6, 15, tzinfo=UTC)
+OLD_ROWS = 20
+# Drops February and March 2026, the months ending before April 16th
+MAX_AGE_DAYS = 60
+EXPIRED = {"travel_queries_p202602", "travel_queries_p202603"}
+
+
+def _engines():
+    yield pytest.param("sqlite", id="sqlite")
+    yield pytest.param(
+        "postgresql",
+        id="postgresql",
+        marks=pytest.mark.skipif(
+            not os.getenv("TEST_POSTGRES_URL"),
+            reason="TEST_POSTGRES_URL is not set to a scratch database",
+        ),
+    )
+
+
+@pytest.fixture(params=list(_engines()))
+def engine(request, tmp_path):
+    if request.param == "sqlite":
+        engine = create_engine(f"sqlite:///{tmp_path / 'partitions.db'}")
+    else:
+        engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(bind=engine)
+    rows = [
+        {
+            "id": i + 1,
+            "query": f"Do I need a visa? #{i}",
+            "destination": "Japan",
+            "origin": "Kenya",
+            "response": {},
+            "created_at": datetime(2026, 2, 1 + i, tzinfo=UTC),
+        }
+        for i in range(OLD_ROWS)
+    ]
+    rows.append({**rows[0], "id": OLD_ROWS + 1, "created_at": NOW})
+    with engine.begin() as connection:
+        connection.execute(TravelQuery.__table__.insert(), rows)
+    PartitionService(engine, premake_months=1).migrate(NOW)
+    yield engine
+    engine.dispose()
+
+
+def service(engine, tmp_path) -> PartitionService:
+    return PartitionService(
+        engine,
+        premake_months=1,
+        max_age_days=MAX_AGE_DAYS,
+        archive_dir=str(tmp_path / "archive"),
+    )
+
+
+def archived_rows(tmp_path) -> int:
+    return sum(
+        sum(1 for _ in gzip.open(path, "rt"))
+        for path in (tmp_path / "archive").glob("*.ndjson.gz")
+    )
+
+
+def remaining_partitions(engine) -> set[str]:
+    with Session(engine) as db:
+        return {partition.name for partition in list_partitions(db)}
+
+
+def test_concurrent_maintenance_drops_and_archives_once(engine, tmp_path):
+    with ThreadPoolExecutor(4) as pool:
+        reports = list(
+            pool.map(lambda _: service(engine, tmp_path).maintain(NOW), range(4))
+        )
+
+    dropped = [name for report in reports for name in report.dropped]
+    assert sorted(dropped) == sorted(EXPIRED)
+    assert archived_rows(tmp_path) == OLD_ROWS
+    assert not EXPIRED & remaining_partitions(engine)
+
+
+def test_maintenance_skips_while_another_run_holds_the_lock(engine, tmp_path):
+    with service(engine, tmp_path)._maintenance_lock() as acquired:
+        assert acquired
+        report = service(engine, tmp_path).maintain(NOW)
+
+    assert report.dropped == []
+    assert EXPIRED <= remaining_partitions(engine)
+    assert service(engine, tmp_path).maintain(NOW).dropped
+
+
+def test_dropping_an_already_dropped_partition_succeeds(engine, tmp_path):
+    assert service(engine, tmp_path).maintain(NOW).dropped
+    assert service(engine, tmp_path).maintain(NOW).dropped == []
@@ -0,0 +1,31 @@
+import os
+
+from app.services.similarity_service import SimilarityService
+
+ANSWER = {"visaRequirements": "Visa on arrival"}
+
+
+def _index(path):
+    return SimilarityService(threshold=0.7, max_age_hours=1, dimensions=64, path=path)
+
+
+def test_load_merges_worker_files_into_its_own(monkeypatch, tmp_path):
+    path = tmp_path / "similarity_index.npz"
+    # Two workers of an earlier run, each with its own file
+    for pid, query_id in ((101, 1), (102, 2)):
+        monkeypatch.setattr(os, "getpid", lambda pid=pid: pid)
+        index = _index(path)
+        index.add(query_id, f"Do I need a visa? #{query_id}", "Japan", "Kenya", ANSWER)
+        index.save()
+
+    monkeypatch.setattr(os, "getpid", lambda: 201)
+    index = _index(path)
+    assert index.load()
+
+    assert len(index) == 2
+    assert [p.name for p in tmp_path.glob("*.npz")] == ["similarity_index.201.npz"]
+    # Restarting again still finds everything in the one file left
+    monkeypatch.setattr(os, "getpid", lambda: 301)
+    restarted = _index(path)
+    assert restarted.load()
+    assert len(restarted) == 2
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import Base
+from app.main import app
+from app.models import TokenUsage
+from app.services.token_budget_service import TokenBudgetExceeded, TokenBudgetService
+
+settings = get_settings()
+
+BUDGET = 1000
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tokens.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _workers(session_factory, count=2):
+    """Budgets sharing one database, as the workers of a deployment do."""
+    return [
+        TokenBudgetService(
+            session_factory, default_budget=BUDGET, window_seconds=60, buckets=6
+        )
+        for _ in range(count)
+    ]
+
+
+def test_workers_share_the_budget(session_factory):
+    first, second = _workers(session_factory)
+    reservation = first.reserve("ip:10.0.0.1", 100, 500)
+    first.commit(reservation, 100, 300)
+
+    second.reserve("ip:10.0.0.1", 100, 500)
+    with pytest.raises(TokenBudgetExceeded):
+        first.reserve("ip:10.0.0.1", 100, 100)
+    # Other clients have budgets of their own
+    first.reserve("ip:10.0.0.2", 100, 500)
+
+    usage = {entry["client"]: entry for entry in second.usage()}
+    assert usage["ip:10.0.0.1"]["total_tokens"] == 400
+    assert usage["ip:10.0.0.1"]["calls"] == 1
+    assert usage["ip:10.0.0.1"]["reserved_tokens"] == 600
+    assert usage["ip:10.0.0.1"]["remaining"] == 0
+
+
+def test_released_and_expired_reservations_free_the_budget(session_factory):
+    first, second = _workers(session_factory)
+    first.release(first.reserve("ip:10.0.0.1", 100, 800))
+    first.reserve("ip:10.0.0.1", 100, 800)
+    # The reservation of a worker that died leaves with its slot
+    with session_factory() as db:
+        db.execute(update(TokenUsage).values(slot=TokenUsage.slot - 6))
+        db.commit()
+
+    second.reserve("ip:10.0.0.1", 100, 800)
+
+
+@pytest.mark.parametrize(
+    "token, status", [(None, 403), ("wrong", 401), ("secret", 200)]
+)
+def test_usage_and_metrics_require_the_admin_token(monkeypatch, token, status):
+    if token is not None:
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    headers = {settings.ADMIN_HEADER: token} if token else {}
+
+    async def get(path):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await c.get(path, headers=headers)
+
+    for path in ("/api/v1/usage", "/api/v1/metrics"):
+        assert asyncio.run(get(path)).status_code == status
@@ -68,9 +68,14 @@ export const fetchWithErrorHandling = async <T>(
 };
 
 // API Functions
-export async function createTravelQuery(data: { query: string; destination: string; origin?: string }): Promise<TravelQuery> {
+// Reuse the same idempotencyKey when retrying a query so it is only answered once
+export async function createTravelQuery(
+  data: { query: string; destination: string; origin?: string },
+  idempotencyKey: string = crypto.randomUUID()
+): Promise<TravelQuery> {
   return fetchWithErrorHandling<TravelQuery>('/query', {
     method: 'POST',
+    headers: { 'Idempotency-Key': idempotencyKey },
     body: JSON.stringify(data),
   });
 }